@@ -6,13 +6,37 @@ from collections import defaultdict
 from dotenv import load_dotenv
 load_dotenv()
 import os
+import diskcache
+from utils.background import ThreadedDiskcacheManager
+from utils.bulk_import import register_upload_route
+from utils.export import register_export_route
+from utils.metrics import register_metrics_route
+from utils.startup import mark, register_startup_report, start_warm_up
+
+# Background callbacks (table load/save) run on threads of this process;
+# results and progress are exchanged through a local disk cache, no broker needed
+background_callback_manager = ThreadedDiskcacheManager(
+    diskcache.Cache(os.getenv("DASH_CACHE_DIR", ".dash_cache"))
+)
 
 app = Dash(__name__, 
            use_pages=True,
            external_stylesheets=[dbc.themes.BOOTSTRAP],
-           suppress_callback_exceptions=True)
+           suppress_callback_exceptions=True,
+           background_callback_manager=background_callback_manager)
 
 app.title = "📖 Databricks Apps Cookbook 🔍"
+# WSGI entry point for gunicorn (gunicorn.conf.py)
+server = app.server
+
+# File uploads for bulk import stream to disk instead of through a callback
+register_upload_route(app.server)
+# Table exports stream from the warehouse to the browser without a callback payload
+register_export_route(app.server)
+# Prometheus metrics; the phase breakdown is also on the Performance page (METRICS_DEBUG_PANEL)
+register_metrics_route(app.server)
+# Import times and time to first response, logged once and on /metrics (utils/startup.py)
+register_startup_report(app.server)
 
 def create_sidebar():
     nav_items = []
@@ -65,7 +89,8 @@ def create_sidebar():
             'Retrieve a secret'
         ],
         'Settings': [
-            'Configuration'
+            'Configuration',
+            'Performance'
         ]
     }
     
@@ -88,7 +113,8 @@ def create_sidebar():
         'Get current user': 'material-symbols:fingerprint',
         'Retrieve a secret': 'material-symbols:key',
         'External connections': 'material-symbols:link',
-        'Configuration': 'material-symbols:settings'
+        'Configuration': 'material-symbols:settings',
+        'Performance': 'material-symbols:speed'
     }
     
     # Group pages by category
@@ -156,6 +182,9 @@ app.layout = html.Div([
         ], className="g-0")
     ], fluid=True, className="vh-100 p-0")
 ])
+mark("app_ready")
 
 if __name__ == '__main__':
+    # Under gunicorn the warm-up starts in the worker instead (gunicorn.conf.py)
+    start_warm_up()
     app.run_server(debug=True)
@@ -0,0 +1,29 @@
+// Clientside helper for bulk import on the Edit Table page. The chosen file is
+// posted to the upload route as multipart form data, so it streams to disk on
+// the server instead of travelling base64-encoded through a callback.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    bulkImport: {
+        // Resolves to {upload_id, filename, format, bytes} or {error}
+        upload: async function (n_clicks) {
+            const input = document.getElementById('import-file');
+            if (!n_clicks || !input) {
+                return window.dash_clientside.no_update;
+            }
+            if (!input.files || !input.files.length) {
+                return {error: 'Choose a CSV or Parquet file first.'};
+            }
+            const config = JSON.parse(document.getElementById('_dash-config').textContent);
+            const form = new FormData();
+            form.append('file', input.files[0]);
+            try {
+                const response = await fetch(config.requests_pathname_prefix + 'api/import/upload', {
+                    method: 'POST',
+                    body: form,
+                });
+                return await response.json();
+            } catch (e) {
+                return {error: 'Upload failed: ' + e};
+            }
+        }
+    }
+});
@@ -0,0 +1,267 @@
+// Clientside helpers for the Edit Table page. Grid edits are turned into
+// small cell deltas in the browser; the server keeps the staged table.
+// New rows are staged here too: each column of schema-store is compiled into
+// a validator and a coercer that follow utils/encoding.py (column_kind and
+// parse_value), so bad values are refused before anything reaches the server,
+// and a staged row travels as one delta instead of the whole grid.
+(function () {
+    const ROW_ID = '__row_id';
+    // utils/encoding.py KIND_ALIASES and TRUE_STRINGS
+    const KIND_ALIASES = {
+        tinyint: 'int', byte: 'int', smallint: 'int', short: 'int',
+        int: 'int', integer: 'int', bigint: 'int', long: 'int',
+        decimal: 'decimal', dec: 'decimal', numeric: 'decimal',
+        double: 'double', float: 'double', real: 'double',
+        boolean: 'boolean', bool: 'boolean',
+        date: 'date',
+        timestamp: 'timestamp', timestamp_ntz: 'timestamp', timestamp_ltz: 'timestamp',
+    };
+    const TRUE_STRINGS = ['true', '1', 'yes', 'y'];
+    const FALSE_STRINGS = ['false', '0', 'no', 'n'];
+    // Largest value per integer type (the smallest is -limit - 1)
+    const INT_LIMITS = {
+        tinyint: '127', byte: '127', smallint: '32767', short: '32767',
+        int: '2147483647', integer: '2147483647', bigint: '9223372036854775807', long: '9223372036854775807',
+    };
+    const DATETIME = /^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?)?\s*(?:Z|[+-]\d{2}:?\d{2})?$/i;
+
+    function isBlank(value) {
+        return value === null || value === undefined || String(value).trim() === '';
+    }
+
+    function compileColumn(col) {
+        // {'name', 'type', 'nullable'} -> {name, kind, nullable, check(value), coerce(value)}
+        const type = String(col.type || '').toLowerCase().trim();
+        const base = type.split('(')[0].split('<')[0].trim();
+        const kind = KIND_ALIASES[base] || 'string';
+        const spec = {name: col.name, kind: kind, nullable: col.nullable !== false};
+        let digits = null;
+        if (kind === 'decimal') {
+            // DECIMAL(p, s) holds p - s digits before the point; DECIMAL is DECIMAL(10, 0)
+            const m = type.match(/\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\)/);
+            digits = m ? Number(m[1]) - Number(m[2] || 0) : 10;
+        }
+        spec.check = function (value) {
+            if (isBlank(value)) {
+                return spec.nullable ? null : 'is required (NOT NULL)';
+            }
+            const text = String(value).trim();
+            if (kind === 'int') {
+                const number = Number(text);
+                if (!Number.isFinite(number) || !Number.isInteger(number)) {
+                    return 'expects a whole number';
+                }
+                const limit = BigInt(INT_LIMITS[base]);
+                const whole = /^[+-]?\d+$/.test(text) ? BigInt(text) : BigInt(number);
+                if (whole > limit || whole < -limit - 1n) {
+                    return 'is out of range for ' + base;
+                }
+                return null;
+            }
+            if (kind === 'decimal' || kind === 'double') {
+                const number = Number(text);
+                if (!Number.isFinite(number)) {
+                    return 'expects a number';
+                }
+                if (digits !== null) {
+                    const whole = Math.trunc(Math.abs(number));
+                    if (whole !== 0 && Math.floor(Math.log10(whole)) + 1 > digits) {
+                        return 'allows at most ' + digits + ' digit' + (digits === 1 ? '' : 's') + ' before the decimal point';
+                    }
+                }
+                return null;
+            }
+            if (kind === 'boolean') {
+                if (typeof value === 'boolean') {
+                    return null;
+                }
+                const lower = text.toLowerCase();
+                return TRUE_STRINGS.includes(lower) || FALSE_STRINGS.includes(lower) ? null : 'expects true or false';
+            }
+            if (kind === 'date' || kind === 'timestamp') {
+                const m = text.match(DATETIME);
+                const valid = m && (function () {
+                    const day = new Date(Date.UTC(Number(m[1]), Number(m[2]) - 1, Number(m[3])));
+                    return day.getUTCMonth() === Number(m[2]) - 1 && day.getUTCDate() === Number(m[3])
+                        && Number(m[4] || 0) < 24 && Number(m[5] || 0) < 60 && Number(m[6] || 0) < 60;
+                })();
+                if (!valid) {
+                    return kind === 'date' ? 'expects a date (YYYY-MM-DD)' : 'expects a timestamp (YYYY-MM-DD HH:MM:SS)';
+                }
+            }
+            return null;
+        };
+        spec.coerce = function (value) {
+            // parse_value: blank -> null, numbers and booleans typed, everything else text
+            if (isBlank(value)) {
+                return null;
+            }
+            if (typeof value !== 'string') {
+                return value;
+            }
+            const text = value.trim();
+            if (kind === 'int') {
+                // Whole numbers beyond 2^53 stay text so they are not rounded
+                const number = Number(text);
+                return Number.isSafeInteger(number) ? number : text;
+            }
+            if (kind === 'decimal') {
+                // Same for decimals with more significant digits than a double keeps
+                return text.replace(/[^0-9]/g, '').replace(/^0+/, '').length > 15 ? text : Number(text);
+            }
+            if (kind === 'double') {
+                return Number(text);
+            }
+            if (kind === 'boolean') {
+                return TRUE_STRINGS.includes(text.toLowerCase());
+            }
+            return kind === 'string' ? value : text;
+        };
+        return spec;
+    }
+
+    let compiledFrom = null;
+    let compiled = {};
+
+    function columnSpecs(schema) {
+        // Recompiled only when schema-store holds a different schema
+        if (schema !== compiledFrom) {
+            compiled = {};
+            (schema || []).forEach(function (col) { compiled[col.name] = compileColumn(col); });
+            compiledFrom = schema;
+        }
+        return compiled;
+    }
+
+    function alert(message, color) {
+        return {namespace: 'dash_bootstrap_components', type: 'Alert', props: {children: message, color: color}};
+    }
+
+    function unacked(queue, ack) {
+        // The queue without entries the server acked (seq <= ack), and the next seq
+        const state = queue || {pending: [], next_seq: 1};
+        return {
+            pending: (state.pending || []).filter(function (e) { return e.seq > (ack || 0); }),
+            seq: Math.max(state.next_seq || 1, (ack || 0) + 1),
+            next_row: state.next_row || 0,
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        tableEdit: {
+            // Appends the cells changed and rows deleted by the last grid edit to the
+            // unacknowledged queue; entries the server acked (seq <= ack) are dropped.
+            // A value its column refuses is put back in the grid and never queued.
+            collectDeltas: function (timestamp, data, previous, queue, ack, schema) {
+                const no_update = window.dash_clientside.no_update;
+                if (!timestamp || !previous) {
+                    return [no_update, no_update, no_update];
+                }
+                const specs = columnSpecs(schema);
+                const current = {};
+                (data || []).forEach(function (row) { current[row[ROW_ID]] = row; });
+                const state = unacked(queue, ack);
+                const pending = state.pending;
+                let seq = state.seq;
+                const before = pending.length;
+                const rejected = [];
+                const restore = {};
+                previous.forEach(function (old) {
+                    const id = old[ROW_ID];
+                    const row = current[id];
+                    if (row === undefined) {
+                        pending.push({seq: seq++, id: id, deleted: true});
+                        return;
+                    }
+                    // Unedited rows keep their object identity
+                    if (row === old) {
+                        return;
+                    }
+                    Object.keys(row).forEach(function (col) {
+                        if (col === ROW_ID || row[col] === old[col]) {
+                            return;
+                        }
+                        const spec = specs[col];
+                        const error = spec ? spec.check(row[col]) : null;
+                        if (error) {
+                            rejected.push(col + ' ' + error + ' (got "' + row[col] + '")');
+                            restore[id] = Object.assign(restore[id] || {}, {[col]: old[col]});
+                            return;
+                        }
+                        pending.push({seq: seq++, id: id, column: col, value: spec ? spec.coerce(row[col]) : row[col]});
+                    });
+                });
+                let grid = no_update;
+                let status = no_update;
+                if (rejected.length) {
+                    grid = data.map(function (row) {
+                        const fix = restore[row[ROW_ID]];
+                        return fix ? Object.assign({}, row, fix) : row;
+                    });
+                    status = alert('Edit not applied: ' + rejected.join('; '), 'warning');
+                }
+                if (pending.length === before && pending.length === ((queue || {}).pending || []).length) {
+                    return [no_update, grid, status];
+                }
+                return [{pending: pending, next_seq: seq, next_row: state.next_row}, grid, status];
+            },
+
+            // Marks new-row fields whose text their column would refuse; blanks in
+            // NOT NULL columns are only reported when the row is added
+            validateFields: function (values, ids, schema) {
+                const specs = columnSpecs(schema);
+                const errors = (ids || []).map(function (id, i) {
+                    const spec = specs[id.name];
+                    return spec && !isBlank(values[i]) ? spec.check(values[i]) : null;
+                });
+                return [errors.map(function (e) { return Boolean(e); }), errors.map(function (e) { return e || ''; })];
+            },
+
+            // Add Row: validates and coerces the form, appends the row to the grid
+            // and queues it as one delta under an id of the browser's choosing
+            stageRow: function (n_clicks, values, ids, schema, queue, ack, loaded, data) {
+                const no_update = window.dash_clientside.no_update;
+                const fields = (ids || []).map(function () { return no_update; });
+                if (!n_clicks || !loaded) {
+                    return [no_update, no_update, fields, no_update];
+                }
+                const specs = columnSpecs(schema);
+                const row = {};
+                const problems = [];
+                (ids || []).forEach(function (id, i) {
+                    const spec = specs[id.name];
+                    const error = spec ? spec.check(values[i]) : null;
+                    if (error) {
+                        problems.push(id.name + ' ' + error);
+                    } else {
+                        row[id.name] = spec ? spec.coerce(values[i]) : values[i];
+                    }
+                });
+                if (problems.length) {
+                    return [no_update, no_update, fields, alert('Row not staged: ' + problems.join('; '), 'warning')];
+                }
+                const state = unacked(queue, ack);
+                // Ids continue after the ones the server handed out at load
+                const next = Math.max(state.next_row, loaded.next_row_id || 0);
+                const id = loaded.server_side ? 'new-' + next : next;
+                state.pending.push({seq: state.seq, id: id, row: row});
+                const record = Object.assign({}, row, {[ROW_ID]: id});
+                return [
+                    (data || []).concat([record]),
+                    {pending: state.pending, next_seq: state.seq + 1, next_row: next + 1},
+                    fields.map(function () { return ''; }),
+                    alert('Row staged. Click Save Changes to commit.', 'info'),
+                ];
+            },
+
+            // Follows an export download link; the attachment leaves the page in place
+            startDownload: function (url) {
+                if (!url) {
+                    return window.dash_clientside.no_update;
+                }
+                window.location.assign(url);
+                return url;
+            }
+        }
+    });
+})();
@@ -0,0 +1,51 @@
+# benchmarks/data.py
+# Synthetic tables for the benchmarks: an `id` primary key plus columns cycling
+# through a type mix, with about 5% NULLs in every non-key column.
+import numpy as np
+import pyarrow as pa
+
+# Databricks column types per mix
+MIXES = {
+    "numeric": ["bigint", "double", "decimal(18,2)", "int"],
+    "text": ["string"],
+    "mixed": ["bigint", "string", "double", "date", "timestamp", "boolean", "decimal(18,2)", "string"],
+}
+NULL_FRACTION = 0.05
+WORDS = np.array(["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"])
+
+
+def _column(dtype: str, rows: int, rng: np.random.Generator) -> pa.Array:
+    mask = rng.random(rows) < NULL_FRACTION
+    if dtype in ("bigint", "int"):
+        values = rng.integers(0, 1_000_000, rows)
+        return pa.array(values, type=pa.int64() if dtype == "bigint" else pa.int32(), mask=mask)
+    if dtype == "double":
+        return pa.array(rng.normal(1000, 250, rows), mask=mask)
+    if dtype.startswith("decimal"):
+        text = np.char.mod("%.2f", rng.integers(0, 10_000_000, rows) / 100)
+        return pa.array(text.tolist(), type=pa.string(), mask=mask).cast(pa.decimal128(18, 2))
+    if dtype == "boolean":
+        return pa.array(rng.random(rows) < 0.5, mask=mask)
+    if dtype == "date":
+        days = np.datetime64("2020-01-01") + rng.integers(0, 2000, rows).astype("timedelta64[D]")
+        return pa.array(days, type=pa.date32(), mask=mask)
+    if dtype == "timestamp":
+        seconds = np.datetime64("2020-01-01T00:00:00", "us") + rng.integers(0, 10 ** 8, rows).astype("timedelta64[s]")
+        return pa.array(seconds, type=pa.timestamp("us"), mask=mask)
+    words = np.char.add(np.char.add(WORDS[rng.integers(0, len(WORDS), rows)], "-"),
+                        rng.integers(0, 100_000, rows).astype(str))
+    return pa.array(words.tolist(), type=pa.string(), mask=mask)
+
+
+def make_table(rows: int, columns: int, mix: str = "mixed", seed: int = 0):
+    # Returns (pa.Table, {column: Databricks type}); `id` is the first column
+    rng = np.random.default_rng(seed)
+    types = {"id": "bigint"}
+    arrays = [pa.array(np.arange(rows, dtype=np.int64))]
+    kinds = MIXES[mix]
+    for i in range(max(columns - 1, 0)):
+        dtype = kinds[i % len(kinds)]
+        name = f"c{i + 1}_{dtype.split('(')[0]}"
+        types[name] = dtype
+        arrays.append(_column(dtype, rows, rng))
+    return pa.Table.from_arrays(arrays, names=list(types)), types
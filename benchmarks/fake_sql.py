@@ -0,0 +1,240 @@
+# benchmarks/fake_sql.py
+# Local stand-in for databricks.sql backed by an in-process DuckDB database.
+# It speaks the subset of Databricks SQL the app sends: :name parameters,
+# backtick identifiers, three-part table names, DESCRIBE HISTORY,
+# system.information_schema.columns with primary keys, INSERT OVERWRITE,
+# INSERT INTO ... REPLACE WHERE and the app's MERGE INTO shape. Cursors return
+# Arrow through fetchall_arrow / fetchmany_arrow like the real connector.
+import os
+import re
+import threading
+
+import duckdb
+import pyarrow as pa
+
+# Databricks type -> DuckDB type for CREATE TABLE; others pass through
+DUCKDB_TYPES = {
+    "string": "VARCHAR", "int": "INTEGER", "bigint": "BIGINT", "double": "DOUBLE", "float": "FLOAT",
+    "boolean": "BOOLEAN", "date": "DATE", "timestamp": "TIMESTAMP", "timestamp_ntz": "TIMESTAMP",
+}
+
+_BACKTICKS = re.compile(r"`((?:[^`]|``)*)`")
+_PARAMS = re.compile(r"(?<![:\w$]):([A-Za-z_]\w*)")
+_REPLACE_WHERE = re.compile(r"^INSERT INTO (\S+) REPLACE WHERE (.*?) ((?:VALUES|SELECT) .*)$", re.S)
+_INSERT_OVERWRITE = re.compile(r"^INSERT OVERWRITE (\S+) (.*)$", re.S)
+_MERGE = re.compile(r"^MERGE INTO (\S+) AS t USING (.*) AS s ON (.*?) WHEN ", re.S)
+_MERGE_KEY = re.compile(r"t\.(\"(?:[^\"]|\"\")*\") IS NOT DISTINCT FROM s\.")
+_DESCRIBE_HISTORY = re.compile(r"^DESCRIBE HISTORY (\S+)", re.I)
+
+
+class FakeDatabase:
+    # One DuckDB database plus the Unity Catalog metadata the app queries
+    def __init__(self):
+        self.db = duckdb.connect()
+        self._lock = threading.Lock()
+        self.tables = {}     # "catalog.schema.table" -> {'columns', 'key_columns', 'partition_columns'}
+        self.versions = {}   # "catalog.schema.table" -> Delta version stand-in
+        self.statements = 0
+
+    def create_table(self, table_name: str, data: pa.Table, types: dict, key_columns=(), partition_columns=()):
+        # types: {column: Databricks type}; data is loaded as the table contents
+        catalog, schema, table = table_name.lower().split(".")
+        with self._lock:
+            con = self.db.cursor()
+            attached = {r[0] for r in con.execute("SELECT database_name FROM duckdb_databases()").fetchall()}
+            if catalog not in attached:
+                con.execute(f'ATTACH \':memory:\' AS "{catalog}"')
+            con.execute(f'CREATE SCHEMA IF NOT EXISTS "{catalog}"."{schema}"')
+            columns = ", ".join(f'"{c}" {DUCKDB_TYPES.get(types[c].lower(), types[c])}' for c in data.column_names)
+            con.execute(f'CREATE OR REPLACE TABLE "{catalog}"."{schema}"."{table}" ({columns})')
+            con.register("__bench_data", data)
+            con.execute(f'INSERT INTO "{catalog}"."{schema}"."{table}" SELECT * FROM __bench_data')
+            con.unregister("__bench_data")
+            self.tables[table_name.lower()] = {
+                'columns': [{"name": c, "type": types[c], "nullable": c not in key_columns} for c in data.column_names],
+                'key_columns': list(key_columns),
+                'partition_columns': list(partition_columns),
+            }
+            self.versions[table_name.lower()] = 0
+
+    def bump_version(self, table_name: str):
+        with self._lock:
+            name = table_name.replace("`", "").replace('"', "").lower()
+            if name in self.versions:
+                self.versions[name] += 1
+
+    def information_schema_rows(self, params) -> list:
+        # Rows shaped like schema_cache.COLUMNS_WITH_KEYS_QUERY
+        rows = []
+        for name, meta in sorted(self.tables.items()):
+            catalog, schema, table = name.split(".")
+            if (catalog, schema) != (params.get("catalog"), params.get("schema")):
+                continue
+            if params.get("table") not in (None, table):
+                continue
+            for column in meta['columns']:
+                key = meta['key_columns'].index(column['name']) + 1 if column['name'] in meta['key_columns'] else None
+                part = (meta['partition_columns'].index(column['name'])
+                        if column['name'] in meta['partition_columns'] else None)
+                rows.append((table, column['name'], column['type'], "YES" if column['nullable'] else "NO", key, part))
+        return rows
+
+
+def _quote(match) -> str:
+    return '"' + match.group(1).replace("``", "`").replace('"', '""') + '"'
+
+
+def translate(statement: str) -> str:
+    # Databricks SQL spelling -> DuckDB spelling
+    statement = _BACKTICKS.sub(_quote, statement)
+    statement = _PARAMS.sub(r"$\1", statement)
+    statement = statement.replace("<=>", "IS NOT DISTINCT FROM")
+    return re.sub(r"\bAS timestamp_ntz\b", "AS TIMESTAMP", statement, flags=re.I)
+
+
+class FakeCursor:
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.con = database.db.cursor()
+        self.description = None
+        self._rows = None        # canned result (metadata queries)
+        self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.con.close()
+
+    def cancel(self):
+        self.con.interrupt()
+
+    def _canned(self, rows, names):
+        self._rows = list(rows)
+        self.description = [(n, None, None, None, None, None, None) for n in names]
+
+    def execute(self, operation: str, parameters=None):
+        self.database.statements += 1
+        self._rows, self._reader = None, None
+        params = dict(parameters or {})
+        text = operation.strip()
+        if "information_schema.columns" in text:
+            return self._canned(self.database.information_schema_rows(params),
+                                ["table_name", "column_name", "data_type", "is_nullable", "ordinal_position",
+                                 "partition_index"])
+        history = _DESCRIBE_HISTORY.match(text)
+        if history:
+            name = history.group(1).replace("`", "").lower()
+            if name not in self.database.versions:
+                raise RuntimeError(f"DESCRIBE HISTORY is only supported for Delta tables: {name}")
+            return self._canned([(self.database.versions[name],)], ["version"])
+        if "table_changes(" in text:
+            raise RuntimeError("Change data feed is not enabled for this table")
+        text = translate(text)
+        replace = _REPLACE_WHERE.match(text)
+        if replace:
+            table, predicate, source = replace.groups()
+            self._run(f"DELETE FROM {table} WHERE {predicate}", params)
+            self._run(f"INSERT INTO {table} {source}", params)
+            return self._written(table)
+        overwrite = _INSERT_OVERWRITE.match(text)
+        if overwrite:
+            table, rest = overwrite.groups()
+            self._run(f"DELETE FROM {table}", params)
+            self._run(f"INSERT INTO {table} {rest}", params)
+            return self._written(table)
+        merge = _MERGE.match(text)
+        if merge:
+            return self._merge(text, merge, params)
+        self._run(text, params)
+        if text.upper().startswith(("INSERT INTO", "DELETE FROM", "TRUNCATE TABLE")):
+            self._written(text.split()[2])
+
+    def _run(self, statement: str, params):
+        # DuckDB rejects named parameters the statement does not use
+        used = {k: v for k, v in params.items() if re.search(rf"\${re.escape(k)}\b", statement)}
+        result = self.con.execute(statement, used or None)
+        self.description = result.description
+
+    def _written(self, table: str):
+        self.description = None
+        self.database.bump_version(table)
+
+    def _merge(self, text: str, match, params):
+        # Emulates merge_statement(): every source key is removed from the target,
+        # then rows whose op is 'U' or 'I' are inserted
+        table, source, _ = match.groups()
+        source = source.replace("FROM VALUES ", "FROM (VALUES ", 1).replace(" AS src(", ") AS src(", 1)
+        keys = _MERGE_KEY.findall(match.group(3))
+        columns = re.search(r"THEN INSERT \((.*?)\) VALUES", text, re.S).group(1)
+        op = re.search(r"s\.(\"[^\"]+\") IN \('U', 'I'\)", text).group(1)
+        self._run(f"CREATE OR REPLACE TEMP TABLE __merge_src AS SELECT * FROM {source} AS s", params)
+        target = table.split(".")[-1]
+        on = " AND ".join(f"{target}.{k} IS NOT DISTINCT FROM s.{k}" for k in keys)
+        self._run(f"DELETE FROM {table} WHERE EXISTS (SELECT 1 FROM __merge_src AS s WHERE {on})", {})
+        self._run(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM __merge_src WHERE {op} IN ('U', 'I')", {})
+        self._run("DROP TABLE __merge_src", {})
+        self._written(table)
+
+    def fetchall(self):
+        if self._rows is not None:
+            rows, self._rows = self._rows, []
+            return rows
+        return self.con.fetchall()
+
+    def fetchone(self):
+        if self._rows is not None:
+            return self._rows.pop(0) if self._rows else None
+        return self.con.fetchone()
+
+    def fetchall_arrow(self) -> pa.Table:
+        if self._reader is not None:
+            return self._reader.read_all()
+        return self.con.fetch_arrow_table()
+
+    def fetchmany_arrow(self, size: int) -> pa.Table:
+        if self._reader is None:
+            self._reader = self.con.fetch_record_batch(size)
+        try:
+            return pa.Table.from_batches([self._reader.read_next_batch()])
+        except StopIteration:
+            return self._reader.schema.empty_table()
+
+
+class FakeConnection:
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.open = True
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self.database)
+
+    def close(self):
+        self.open = False
+
+
+class FakeSqlModule:
+    # Drop-in for `from databricks import sql`: sql.connect(...) -> FakeConnection
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.connections = 0
+
+    def connect(self, **kwargs) -> FakeConnection:
+        self.connections += 1
+        return FakeConnection(self.database)
+
+
+def install(database: FakeDatabase = None) -> FakeSqlModule:
+    # Points utils.connections at the fake connector and gives it PAT-style
+    # credentials, so no workspace or SDK auth is involved. Call it before the
+    # first connection is borrowed.
+    from utils import connections
+
+    os.environ.setdefault("DATABRICKS_HOST", "https://benchmark.local")
+    os.environ.setdefault("DATABRICKS_TOKEN", "benchmark-token")
+    module = FakeSqlModule(database or FakeDatabase())
+    connections.sql = module
+    return module
@@ -0,0 +1,386 @@
+# benchmarks/load_test.py
+# Multi-session load test. Each simulated analyst has its own session id and
+# drives the Tables page callbacks through /_dash-update-component the way the
+# browser does: Load Table, a few Add Row clicks (staged in the browser, so each
+# one is the delta sync that carries the new row), then Save Changes with cell
+# edits (background callbacks are polled until they finish). Concurrency is
+# stepped up level by level; every level reports p50/p95/p99 latency per
+# callback, throughput, errors, and the worker's memory and SQL connections
+# scraped from /metrics.
+#
+#   python -m benchmarks.load_test --sessions 1,4,16,32 --iterations 3 --output load.json
+#
+# Without --url the app is started with benchmarks/serve.py on a free port.
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import requests
+
+from benchmarks.serve import BENCH_HTTP_PATH, table_names
+
+UPDATE_ROUTE = "_dash-update-component"
+DEPENDENCIES_ROUTE = "_dash-dependencies"
+# Input that triggers each simulated callback
+TRIGGERS = {
+    "load_table": "load-button-edit.n_clicks",
+    "add_row": "edit-deltas.data",
+    "save_changes": "save-button-edit.n_clicks",
+}
+# Gauges sampled from /metrics while a level runs; the maximum is reported
+SAMPLED_GAUGES = ("bti_process_resident_bytes", "bti_process_threads", "bti_sql_pool_in_use",
+                  "bti_sql_pool_idle")
+REPORTED_COUNTERS = ("bti_sql_pool_connects", "bti_sql_pool_checkouts", "bti_sql_pool_wait_seconds_total",
+                     "bti_single_flight_shared", "bti_snapshot_cache_hits", "bti_snapshot_cache_misses",
+                     "bti_write_queue_commits", "bti_write_queue_coalesced", "bti_write_queue_retries")
+
+
+class CallbackFailed(Exception):
+    pass
+
+
+def percentile(values, q: float):
+    # Nearest-rank percentile; None for no samples
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(q / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def _outputs(callback_id: str):
+    # "..a.children...b.data@hash.." -> [{'id': 'a', 'property': 'children'}, ...]
+    multi = callback_id.startswith("..")
+    parts = callback_id.strip(".").split("...") if multi else [callback_id]
+    outputs = []
+    for part in parts:
+        component, prop = part.rsplit(".", 1)
+        outputs.append({"id": component, "property": prop})
+    return outputs if multi else outputs[0]
+
+
+class DashClient:
+    # Speaks the renderer's callback protocol for one session
+    def __init__(self, base_url: str, dependencies: dict, poll_interval: float):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.dependencies = dependencies
+        self.poll_interval = poll_interval
+        self.http = requests.Session()
+
+    def call(self, name: str, values: dict, timeout: float = 300.0) -> dict:
+        # values: {"component.prop": value}; pattern-matching (ALL) entries take a
+        # list of {'id', 'property', 'value'}. Returns the response's component props.
+        spec = self.dependencies[name]
+        body = {
+            "output": spec["output"],
+            "outputs": _outputs(spec["output"]),
+            "inputs": [self._item(d, values) for d in spec["inputs"]],
+            "state": [self._item(d, values) for d in spec["state"]],
+            "changedPropIds": [TRIGGERS[name]],
+        }
+        url = self.base_url + UPDATE_ROUTE
+        response = self.http.post(url, json=body, timeout=timeout)
+        started = time.monotonic()
+        job = None
+        while True:
+            if response.status_code == 204:
+                return {}
+            if response.status_code != 200:
+                raise CallbackFailed(f"{name}: HTTP {response.status_code}")
+            payload = response.json()
+            if "cacheKey" in payload:
+                # Background callback: poll with the job's cache key like the renderer
+                job = {"cacheKey": payload["cacheKey"], "job": payload["job"]}
+            elif "response" in payload:
+                return payload["response"]
+            elif job is None:
+                raise CallbackFailed(f"{name}: unexpected response {str(payload)[:200]}")
+            if time.monotonic() - started > timeout:
+                raise CallbackFailed(f"{name}: no result after {timeout:.0f}s")
+            time.sleep(self.poll_interval)
+            response = self.http.post(url, json=body, params=job, timeout=timeout)
+
+    @staticmethod
+    def _item(dependency, values):
+        # Pattern-matching ids arrive as JSON strings, e.g. '{"name":["ALL"],"type":"new-field"}'
+        component, prop = dependency["id"], dependency["property"]
+        if component.startswith("{"):
+            return values.get(f"{component}.{prop}", [])
+        return {"id": component, "property": prop, "value": values.get(f"{component}.{prop}")}
+
+
+def find_callbacks(base_url: str) -> dict:
+    response = requests.get(base_url.rstrip("/") + "/" + DEPENDENCIES_ROUTE, timeout=30)
+    response.raise_for_status()
+    found = {}
+    for spec in response.json():
+        if spec.get("clientside_function"):
+            continue
+        for name, trigger in TRIGGERS.items():
+            if [f"{d['id']}.{d['property']}" for d in spec["inputs"]] == [trigger]:
+                found[name] = spec
+    missing = set(TRIGGERS) - set(found)
+    if missing:
+        raise SystemExit(f"Callbacks not found on the server: {', '.join(sorted(missing))}")
+    return found
+
+
+def _danger(response: dict) -> str | None:
+    # Failures come back as dbc.Alert(color="danger"), or "warning" for an expired
+    # session or a refused save, in a status output
+    for props in response.values():
+        for value in props.values():
+            if isinstance(value, dict) and value.get("type") == "Alert":
+                alert = value.get("props", {})
+                if alert.get("color") in ("danger", "warning"):
+                    return str(alert.get("children"))[:200]
+    return None
+
+
+class Session:
+    def __init__(self, client: DashClient, table: str, add_rows: int, edits: int, record):
+        self.client = client
+        self.table = table
+        self.add_rows = add_rows
+        self.edits = edits
+        self.record = record
+        self.session_id = str(uuid.uuid4())
+        self.config = {"host": None, "token": None, "http_path": BENCH_HTTP_PATH}
+        self.clicks = {name: 0 for name in TRIGGERS}
+        self.seq = 0
+        # Keys for added rows, distinct per session so saves don't collide
+        self.next_id = (uuid.uuid4().int >> 80) * 1000
+
+    def _timed(self, name: str, values: dict) -> dict:
+        # Button triggers carry a click count; the add_row trigger is the delta
+        # queue itself, passed in by the caller
+        if TRIGGERS[name].endswith(".n_clicks"):
+            self.clicks[name] += 1
+            values = {**values, TRIGGERS[name]: self.clicks[name]}
+        started = time.perf_counter()
+        error = None
+        response = {}
+        try:
+            response = self.client.call(name, values)
+            error = _danger(response)
+        except (CallbackFailed, requests.RequestException, ValueError) as e:
+            error = str(e)
+        self.record(name, time.perf_counter() - started, error)
+        return response
+
+    def run_once(self):
+        loaded = self._timed("load_table", {
+            "table-name-input.value": self.table, "app-config.data": self.config, "paging-mode.value": "browser",
+            "session-id.data": self.session_id, "load-columns-select.value": None,
+        })
+        schema = loaded.get("schema-store", {}).get("data")
+        loaded_store = loaded.get("loaded-table-store", {}).get("data")
+        key_columns = loaded.get("key-columns-select", {}).get("value") or ["id"]
+        if not schema:
+            return
+        editable = [c["name"] for c in schema if c["name"] not in key_columns]
+        # Row ids continue after the snapshot, like assets/table_edit.js stageRow
+        row_id = (loaded_store or {}).get("next_row_id") or 0
+        for _ in range(self.add_rows):
+            self.next_id += 1
+            self.seq += 1
+            row = {c["name"]: self.next_id if c["name"] in key_columns else None for c in schema}
+            self._timed("add_row", {
+                "edit-deltas.data": {"pending": [{"seq": self.seq, "id": row_id, "row": row}]},
+                "session-id.data": self.session_id,
+            })
+            row_id += 1
+        pending = []
+        for i in range(self.edits if editable else 0):
+            self.seq += 1
+            pending.append({"seq": self.seq, "id": i * 7, "column": editable[0], "value": str(i)})
+        self._timed("save_changes", {
+            "session-id.data": self.session_id, "edit-deltas.data": {"pending": pending},
+            "table-name-input.value": self.table, "app-config.data": self.config, "schema-store.data": schema,
+            "loaded-table-store.data": loaded_store, "key-columns-select.value": key_columns,
+        })
+
+
+def scrape(base_url: str) -> dict:
+    # Unlabelled samples from /metrics
+    try:
+        text = requests.get(base_url.rstrip("/") + "/metrics", timeout=10).text
+    except requests.RequestException:
+        return {}
+    values = {}
+    for line in text.splitlines():
+        if line.startswith("#") or "{" in line:
+            continue
+        name, _, value = line.partition(" ")
+        try:
+            values[name] = float(value)
+        except ValueError:
+            pass
+    return values
+
+
+def run_level(base_url: str, dependencies: dict, sessions: int, iterations: int, tables: list, args) -> dict:
+    lock = threading.Lock()
+    samples = {name: [] for name in TRIGGERS}
+    errors = {name: [] for name in TRIGGERS}
+
+    def record(name, seconds, error):
+        with lock:
+            samples[name].append(seconds)
+            if error:
+                errors[name].append(error)
+
+    peaks = {}
+    stop = threading.Event()
+
+    def sample_gauges():
+        while not stop.is_set():
+            values = scrape(base_url)
+            for name in SAMPLED_GAUGES:
+                if name in values:
+                    peaks[name] = max(peaks.get(name, 0), values[name])
+            stop.wait(args.sample_interval)
+
+    def run_session(i):
+        client = DashClient(base_url, dependencies, args.poll_interval)
+        session = Session(client, tables[i % len(tables)], args.add_rows, args.edits, record)
+        for _ in range(iterations):
+            session.run_once()
+
+    before = scrape(base_url)
+    sampler = threading.Thread(target=sample_gauges, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run_session, args=(i,)) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+    after = scrape(base_url)
+
+    callbacks = {}
+    for name, values in samples.items():
+        callbacks[name] = {
+            "count": len(values),
+            "errors": len(errors[name]),
+            "p50_ms": _ms(percentile(values, 50)),
+            "p95_ms": _ms(percentile(values, 95)),
+            "p99_ms": _ms(percentile(values, 99)),
+            "max_ms": _ms(max(values) if values else None),
+            "first_error": errors[name][0] if errors[name] else None,
+        }
+    total = sum(len(v) for v in samples.values())
+    return {
+        "sessions": sessions,
+        "iterations": iterations,
+        "seconds": round(elapsed, 3),
+        "callbacks_per_second": round(total / elapsed, 2) if elapsed else None,
+        "sessions_completed_per_second": round(sessions * iterations / elapsed, 3) if elapsed else None,
+        "callbacks": callbacks,
+        "peak": {name: peaks.get(name) for name in SAMPLED_GAUGES},
+        "delta": {name: round(after.get(name, 0) - before.get(name, 0), 3) for name in REPORTED_COUNTERS},
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args):
+    port = _free_port()
+    command = [sys.executable, "-m", "benchmarks.serve", "--port", str(port), "--tables", str(args.tables),
+               "--rows", str(args.rows), "--columns", str(args.columns)]
+    process = subprocess.Popen(command)
+    url = f"http://127.0.0.1:{port}/"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("benchmarks.serve exited before it started listening")
+        try:
+            requests.get(url + DEPENDENCIES_ROUTE, timeout=2).raise_for_status()
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("benchmarks.serve did not start within 120s")
+
+
+def _print_level(level: dict):
+    print(f"sessions={level['sessions']:<4} {level['callbacks_per_second'] or 0:>8.1f} callbacks/s  "
+          f"rss={(level['peak']['bti_process_resident_bytes'] or 0) / 1024 ** 2:>7.0f} MiB  "
+          f"connections in use={level['peak']['bti_sql_pool_in_use'] or 0:.0f}", file=sys.stderr)
+    for name, stats in level["callbacks"].items():
+        print(f"    {name:<13} n={stats['count']:<5} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+              f"p99={stats['p99_ms']}ms errors={stats['errors']}", file=sys.stderr)
+
+
+def _int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent multi-session load test of the Tables page callbacks")
+    parser.add_argument("--url", help="app to test (e.g. one started with benchmarks.serve); "
+                                      "default: start benchmarks.serve on a free port")
+    parser.add_argument("--sessions", type=_int_list, default=[1, 4, 16], help="comma-separated concurrency levels")
+    parser.add_argument("--iterations", type=int, default=3, help="load/add/save rounds per session per level")
+    parser.add_argument("--add-rows", type=int, default=2, help="Add Row clicks per round")
+    parser.add_argument("--edits", type=int, default=5, help="cell edits saved per round")
+    parser.add_argument("--tables", type=int, default=1, help="tables shared by the sessions (round robin)")
+    parser.add_argument("--rows", type=int, default=10000, help="rows per table (started server only)")
+    parser.add_argument("--columns", type=int, default=12, help="columns per table (started server only)")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="seconds between background job polls")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="seconds between /metrics samples")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    process = None
+    url = args.url
+    if not url:
+        process, url = start_server(args)
+    try:
+        dependencies = find_callbacks(url)
+        tables = table_names(args.tables)
+        levels = []
+        for sessions in args.sessions:
+            level = run_level(url, dependencies, sessions, args.iterations, tables, args)
+            _print_level(level)
+            levels.append(level)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "url": args.url or "benchmarks.serve",
+        "tables": args.tables,
+        "rows": None if args.url else args.rows,
+        "columns": None if args.url else args.columns,
+        "levels": levels,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# benchmarks/run.py
+# Offline benchmarks of the load, edit, encode and save paths against the DuckDB
+# stand-in in benchmarks/fake_sql.py. No workspace or warehouse is needed:
+#
+#   python -m benchmarks.run --rows 10000,100000 --columns 20 --mix mixed --output results.json
+#
+# Each case runs --repeat times; the JSON report has min/median/max seconds,
+# rows per second and the per-phase breakdown recorded by utils.metrics.
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import duckdb
+import pandas as pd
+
+from benchmarks import fake_sql
+from benchmarks.data import MIXES, make_table
+
+BENCH_TABLE = "bench.main.rows"
+BENCH_HTTP_PATH = "/sql/1.0/warehouses/benchmark"
+# Share of rows edited / deleted per edit-diff and save run, plus rows inserted
+EDIT_FRACTION = 0.01
+DELETE_FRACTION = 0.001
+INSERT_ROWS = 100
+# INSERT OVERWRITE rewrites the whole table; only timed up to this size
+OVERWRITE_MAX_ROWS = 20000
+
+
+def _schema(types: dict) -> list:
+    return [{"name": name, "type": dtype, "nullable": name != "id"} for name, dtype in types.items()]
+
+
+def _edit_column(types: dict) -> str:
+    # First non-key column; edits are sent as strings, the way the grid sends them
+    return next((name for name in types if name != "id"), "id")
+
+
+def _deltas(rows: int, types: dict, seq: int = 0) -> list:
+    column = _edit_column(types)
+    edited = max(int(rows * EDIT_FRACTION), 1)
+    deleted = int(rows * DELETE_FRACTION)
+    step = max(rows // edited, 1)
+    entries = []
+    for rid in range(0, rows, step)[:edited]:
+        seq += 1
+        entries.append({"seq": seq, "id": rid, "column": column, "value": "7"})
+    for rid in range(1, rows, max(rows // max(deleted, 1), 1))[:deleted]:
+        seq += 1
+        entries.append({"seq": seq, "id": rid, "deleted": True})
+    return entries
+
+
+def _edited_buffer(table, types: dict):
+    from utils.edit_buffer import EditBuffer
+
+    buffer = EditBuffer(BENCH_TABLE, None, table.column_names, _schema(types), ["id"], table=table)
+    buffer.apply_deltas(_deltas(table.num_rows, types))
+    for i in range(INSERT_ROWS):
+        buffer.insert_row({"id": table.num_rows + i, _edit_column(types): "1"})
+    return buffer
+
+
+def bench_load(table, types):
+    from utils.connections import borrow_connection
+    from utils.grid_query import build_select_query
+    from utils.reader import arrow_to_records, read_query
+
+    query, params = build_select_query(BENCH_TABLE)
+    with borrow_connection(BENCH_HTTP_PATH, None, None) as conn:
+        result, _ = read_query(conn, query, params, max_rows=0, max_bytes=0)
+    records = arrow_to_records(result)
+    return len(records)
+
+
+def bench_edit_diff(table, types):
+    buffer = _edited_buffer(table, types)
+    diff = buffer.diff(["id"])
+    return len(diff["inserted"]) + len(diff["updated"]) + len(diff["deleted"])
+
+
+def bench_encode(table, types):
+    from utils.encoding import compile_plan, encode_rows, parameter_column, parse_value_by_type
+
+    frame = table.to_pandas()
+    plan = compile_plan(_schema(types))
+    for name, kind in plan:
+        parameter_column(frame[name], kind, name)
+    literals = encode_rows(frame, plan)
+    # Single-value parsing, as used for add_row and per-cell validation
+    sample = frame.head(1000)
+    for name, dtype in types.items():
+        for value in sample[name].astype(str):
+            parse_value_by_type(value, dtype)
+    return len(literals)
+
+
+def bench_save(table, types):
+    from utils.connections import borrow_connection
+    from utils.encoding import compile_plan
+    from utils.table_diff import diff_frame
+    from utils.writer import merge_rows
+
+    schema = _schema(types)
+    buffer = _edited_buffer(table, types)
+    diff = buffer.diff(["id"])
+    frame = diff_frame(diff, table.column_names, ["id"])
+    with borrow_connection(BENCH_HTTP_PATH, None, None) as conn:
+        report = merge_rows(conn, BENCH_TABLE, frame, compile_plan(schema), ["id"], types)
+    return report.get("rows", len(frame))
+
+
+def bench_overwrite(table, types):
+    from utils.connections import borrow_connection
+    from utils.encoding import compile_plan
+    from utils.writer import write_rows
+
+    with borrow_connection(BENCH_HTTP_PATH, None, None) as conn:
+        report = write_rows(conn, BENCH_TABLE, table.to_pandas(), compile_plan(_schema(types)), mode="overwrite")
+    return report.get("rows", table.num_rows)
+
+
+BENCHMARKS = {
+    "load": bench_load,
+    "edit-diff": bench_edit_diff,
+    "encode": bench_encode,
+    "save": bench_save,
+    "overwrite": bench_overwrite,
+}
+
+
+def run_case(name, fn, database, table, types, repeat: int) -> dict:
+    from utils.metrics import metrics
+
+    runs, phases = [], []
+    rows = 0
+    for _ in range(repeat):
+        # Every run starts from the generated table, so saves see the same diff
+        database.create_table(BENCH_TABLE, table, types, key_columns=["id"])
+        with metrics.request_trace(f"bench:{name}") as trace:
+            started = time.perf_counter()
+            rows = fn(table, types)
+            runs.append(time.perf_counter() - started)
+        phases.append(trace["phases"])
+    median = statistics.median(runs)
+    phase_names = sorted({p for run in phases for p in run})
+    return {
+        "benchmark": name,
+        "rows": table.num_rows,
+        "columns": table.num_columns,
+        "rows_processed": rows,
+        "min_seconds": round(min(runs), 6),
+        "median_seconds": round(median, 6),
+        "max_seconds": round(max(runs), 6),
+        "rows_per_second": round(table.num_rows / median, 1) if median else None,
+        "phases_median_seconds": {p: round(statistics.median(run.get(p, 0.0) for run in phases), 6)
+                                  for p in phase_names},
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local DuckDB SQL stand-in")
+    parser.add_argument("--rows", type=_int_list, default=[10000], help="comma-separated row counts")
+    parser.add_argument("--columns", type=_int_list, default=[12], help="comma-separated column counts")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma-separated benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    database = fake_sql.FakeDatabase()
+    fake_sql.install(database)
+    selected = [name for name in args.only.split(",") if name]
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = []
+    for rows in args.rows:
+        for columns in args.columns:
+            table, types = make_table(rows, columns, args.mix, args.seed)
+            for name in selected:
+                if name == "overwrite" and rows > OVERWRITE_MAX_ROWS:
+                    continue
+                result = run_case(name, BENCHMARKS[name], database, table, types, args.repeat)
+                results.append(result)
+                print(f"{name:>10} {rows:>9,} rows x {columns:>3} cols  median {result['median_seconds']:.3f}s  "
+                      f"{result['rows_per_second'] or 0:>12,.0f} rows/s", file=sys.stderr)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "pandas": pd.__version__,
+        "mix": args.mix,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
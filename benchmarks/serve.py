@@ -0,0 +1,46 @@
+# benchmarks/serve.py
+# Runs the Dash app against the DuckDB stand-in with generated tables
+# bench.main.t0 .. t<N-1>, for the load test or for clicking around offline:
+#
+#   python -m benchmarks.serve --port 8050 --tables 4 --rows 10000 --columns 12
+import argparse
+import os
+
+from benchmarks import fake_sql
+from benchmarks.data import MIXES, make_table
+
+BENCH_HTTP_PATH = "/sql/1.0/warehouses/benchmark"
+
+
+def table_names(count: int) -> list:
+    return [f"bench.main.t{i}" for i in range(count)]
+
+
+def prepare(tables: int, rows: int, columns: int, mix: str = "mixed", seed: int = 0):
+    # Loads the tables and points the app's connector at them; call before importing app
+    database = fake_sql.FakeDatabase()
+    data, types = make_table(rows, columns, mix, seed)
+    for name in table_names(tables):
+        database.create_table(name, data, types, key_columns=["id"])
+    os.environ.setdefault("DATABRICKS_SQL_HTTP_PATH", BENCH_HTTP_PATH)
+    return fake_sql.install(database)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the app against a local DuckDB SQL stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--tables", type=int, default=1)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    args = parser.parse_args(argv)
+
+    prepare(args.tables, args.rows, args.columns, args.mix)
+    from app import app
+
+    app.run(host=args.host, port=args.port, debug=False, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# gunicorn.conf.py
+# Production server: gunicorn app:server -c gunicorn.conf.py (see app.yaml).
+# The app is imported once in the master (preload) and forked into one worker;
+# the worker serves requests on a pool of threads, and background callbacks
+# run on threads of the worker too (utils/background.py).
+import os
+
+bind = f"0.0.0.0:{os.getenv('DATABRICKS_APP_PORT', os.getenv('PORT', '8000'))}"
+# Edit buffers, export tickets, the save queue and the caches are per process,
+# and Databricks Apps routes requests without session affinity: the app scales
+# with threads, never with a second worker
+workers = 1
+worker_class = "gthread"
+# Requests mostly wait on the warehouse, so threads rather than processes
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+preload_app = True
+# Long loads and saves run as background callbacks; requests are short polls
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # Nothing opened in the master before the fork is reused by the worker
+    from utils.connections import pool
+    from utils.load_pipeline import reset_after_fork
+
+    pool.reset_after_fork()
+    reset_after_fork()
+
+
+def post_worker_init(worker):
+    # The worker is accepting requests; heavy imports and the first warehouse
+    # connection are made in the background instead of on the first table load
+    from utils.startup import start_warm_up
+
+    start_warm_up()
+
+
+def worker_exit(server, worker):
+    # Graceful shutdown: close the worker's SQL sessions on the warehouse
+    from utils.connections import pool
+
+    pool.close_all()
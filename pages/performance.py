@@ -0,0 +1,73 @@
+from dash import html, dcc, callback, Input, Output, dash_table
+import dash_bootstrap_components as dbc
+import dash
+import os
+from datetime import datetime
+from utils.metrics import metrics, METRICS_ROUTE
+
+# pages/performance.py
+# Debug panel with the phase breakdown of recent callbacks; only registered
+# when METRICS_DEBUG_PANEL is set, /metrics is always available
+if os.getenv("METRICS_DEBUG_PANEL", "").lower() in ("1", "true", "yes"):
+    dash.register_page(
+        __name__,
+        path='/performance',
+        title='Performance',
+        name='Performance',
+        category='Settings',
+        icon='speed'
+    )
+
+PHASES = ["execute", "fetch", "serialize", "coerce", "encode", "write_execute", "diff"]
+
+def layout():
+    return dbc.Container([
+        html.H1("Performance", className="my-4"),
+        html.P([
+            "Where the time of the last callbacks went, by phase. ",
+            "Prometheus metrics for the whole process are at ",
+            html.A(METRICS_ROUTE, href=dash.get_relative_path(METRICS_ROUTE), target="_blank"),
+            ".",
+        ], className="mb-4"),
+        dcc.Interval(id="performance-interval", interval=5000),
+        html.Div(id="performance-table"),
+    ], fluid=True, className="py-4")
+
+def trace_row(trace):
+    phases = trace.get('phases', {})
+    counters = trace.get('counters', {})
+    row = {
+        'time': datetime.fromtimestamp(trace['started_at']).strftime('%H:%M:%S'),
+        'request': trace['name'] + (f" ({trace['error']})" if trace.get('error') else ""),
+        'total_ms': round(trace.get('seconds', 0) * 1000, 1),
+        'rows': int(counters.get('bti_rows_read_total', 0) + counters.get('bti_rows_written_total', 0)),
+        'kib': round((counters.get('bti_bytes_read_total', 0) + counters.get('bti_bytes_sent_total', 0)) / 1024, 1),
+    }
+    for phase in PHASES:
+        row[phase] = round(phases[phase] * 1000, 1) if phase in phases else None
+    # Time not covered by any instrumented phase (callback logic, Dash serialization)
+    row['other'] = round(max(trace.get('seconds', 0) - sum(phases.values()), 0) * 1000, 1)
+    return row
+
+@callback(
+    Output("performance-table", "children"),
+    Input("performance-interval", "n_intervals"),
+)
+def update_performance_table(_):
+    traces = metrics.recent_requests()
+    if not traces:
+        return dbc.Alert("No callbacks recorded yet. Load or save a table and come back.", color="info")
+    rows = [trace_row(t) for t in reversed(traces)]
+    columns = ['time', 'request', 'total_ms'] + PHASES + ['other', 'rows', 'kib']
+    return dash_table.DataTable(
+        data=rows,
+        columns=[{'name': c if c.endswith(('ms', 'kib')) or c in ('time', 'request', 'rows') else f"{c} (ms)", 'id': c}
+                 for c in columns],
+        page_size=20,
+        sort_action='native',
+        style_cell={'padding': '6px 10px', 'textAlign': 'left'},
+        style_header={'backgroundColor': '#f8f9fa', 'fontWeight': 'bold'},
+    )
+
+# Make layout available at module level
+__all__ = ['layout']
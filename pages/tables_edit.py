@@ -1,16 +1,32 @@
-from dash import Dash, html, dcc, callback, Input, Output, State, dash_table
+from __future__ import annotations
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Input, Output, State, Patch, dash_table
 import dash_bootstrap_components as dbc
-from databricks import sql
-from databricks.sdk.core import Config
-import pandas as pd
-from functools import lru_cache
 import dash
-import os
-from urllib.parse import urlparse
 from dash.dependencies import ALL
-from datetime import datetime, date
-import numpy as np
-import numbers
+import json
+import uuid
+from utils.arrow_query import index_for, warm_in_background
+from utils.background import cancellable
+from utils.bulk_import import ImportFailed, IMPORT_MAX_ERRORS, upload_path, discard_upload, import_file, describe_import
+from utils.change_feed import CDF_POLL_SECONDS, ChangeFeedUnavailable, read_changes, apply_changes
+from utils.connections import borrow_connection, connection_identity, try_borrow_connection
+from utils.export import create_export
+from utils.load_pipeline import LoadPipeline
+from utils.edit_buffer import edit_buffers, EditBufferFull
+from utils.single_flight import single_flight
+from utils.snapshot_cache import snapshot_cache, get_table_version
+from utils.schema_cache import schema_cache
+from utils.reader import MAX_READ_ROWS, read_query, arrow_to_records
+from utils.metrics import metrics, traced
+from utils.grid_query import LOAD_OPERATORS, build_predicate, build_select_query, build_page_query, build_count_query
+from utils.encoding import compile_plan, frame_plan, parse_value
+from utils.table_diff import ROW_ID, attach_row_ids, combine_diffs, diff_is_empty, diff_frame, diff_keys
+from utils.partitions import combine_predicates, partition_slice
+from utils.writer import write_rows, merge_rows, describe_report
+from utils.write_queue import write_queue
+from utils.startup import lazy_module
+
+pd = lazy_module("pandas")
 
 # pages/tables_edit.py
 dash.register_page(
@@ -22,73 +38,15 @@ dash.register_page(
     icon='table'
 )
 
-@lru_cache(maxsize=1)
-def get_config():
-    return Config()
-
-@lru_cache(maxsize=8)
-def get_connection(http_path: str, host_override: str | None, token_override: str | None):
-    # Priority 1: explicit overrides from UI or store
-    if host_override and token_override:
-        parsed = urlparse(host_override)
-        hostname = parsed.hostname if parsed.hostname else host_override.replace("https://", "").replace("http://", "")
-        return sql.connect(
-            server_hostname=hostname,
-            http_path=http_path,
-            access_token=token_override,
-        )
-    # Priority 2: environment variables for local dev
-    env_host = os.getenv("DATABRICKS_HOST")
-    env_token = os.getenv("DATABRICKS_TOKEN")
-    if env_host and env_token:
-        parsed = urlparse(env_host)
-        hostname = parsed.hostname if parsed.hostname else env_host.replace("https://", "").replace("http://", "")
-        return sql.connect(
-            server_hostname=hostname,
-            http_path=http_path,
-            access_token=env_token,
-        )
-    # Priority 3: unified auth (Databricks Apps or configured local auth)
-    cfg = get_config()
-    parsed = urlparse(cfg.host)
-    hostname = parsed.hostname if parsed.hostname else cfg.host.replace("https://", "").replace("http://", "")
-    return sql.connect(
-        server_hostname=hostname,
-        http_path=http_path,
-        credentials_provider=lambda: cfg.authenticate,
-    )
+EXPIRED_SESSION = "The edit session expired. Load the table again to continue editing."
 
-def get_table_schema(table_name: str, conn):
-    # Returns list of dicts: [{'name': ..., 'type': ...}, ...]
-    try:
-        parts = table_name.split(".")
-        if len(parts) != 3:
-            return []
-        catalog, schema, table = parts
-        query = (
-            "SELECT column_name, data_type FROM system.information_schema.columns "
-            f"WHERE table_catalog = '{catalog}' AND table_schema = '{schema}' AND table_name = '{table}' "
-            "ORDER BY ordinal_position"
-        )
-        with conn.cursor() as cursor:
-            cursor.execute(query)
-            rows = cursor.fetchall()
-        return [{"name": r[0], "type": r[1]} for r in rows]
-    except Exception:
-        # Fallback to DESCRIBE TABLE if information_schema not accessible
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(f"DESCRIBE TABLE {table_name}")
-                rows = cursor.fetchall()
-            schema = []
-            for r in rows:
-                col = r[0]
-                dtype = r[1]
-                if col and not col.startswith("#") and dtype:
-                    schema.append({"name": col, "type": dtype})
-            return schema
-        except Exception:
-            return []
+def get_table_metadata(table_name: str, conn, identity):
+    # {'columns': [{'name', 'type', 'nullable'}, ...], 'key_columns': [...], 'partition_columns': [...]}
+    return schema_cache.get_table(identity, table_name, conn)
+
+def get_table_schema(table_name: str, conn, identity):
+    # Returns list of dicts: [{'name': ..., 'type': ..., 'nullable': ...}, ...]
+    return get_table_metadata(table_name, conn, identity)['columns']
 
 def build_new_row_form(schema):
     fields = []
@@ -96,13 +54,16 @@ def build_new_row_form(schema):
         fields.append(
             dbc.Row([
                 dbc.Col([
-                    dbc.Label(f"{col['name']} ({col['type']})", className="fw-bold mb-2"),
+                    dbc.Label(f"{col['name']} ({col['type']}{'' if col.get('nullable', True) else ', NOT NULL'})", className="fw-bold mb-2"),
                     dbc.Input(id={"type": "new-field", "name": col["name"]}, type="text", placeholder=f"Enter {col['name']}", className="mb-3",
                               style={
                                   "backgroundColor": "#f8f9fa",
                                   "border": "1px solid #dee2e6",
                                   "boxShadow": "inset 0 1px 2px rgba(0,0,0,0.075)"
-                              })
+                              }),
+                    # Why the column refuses the text typed so far (assets/table_edit.js)
+                    dbc.FormFeedback(id={"type": "new-field-error", "name": col["name"]}, type="invalid",
+                                     className="mb-3")
                 ], width=12)
             ])
         )
@@ -112,45 +73,166 @@ def build_new_row_form(schema):
         dbc.Button("Add Row", id="add-row-button", color="primary", className="mt-2")
     ])
 
-def parse_value_by_type(value: str, dtype: str):
-    if value is None or value == "":
-        return None
-    dt = dtype.lower()
-    try:
-        if any(t in dt for t in ["int", "byte", "short"]):
-            return int(value)
-        if any(t in dt for t in ["decimal", "double", "float", "real"]):
-            return float(value)
-        if "boolean" in dt:
-            return value.lower() in ("true", "1", "yes", "y")
-        if "date" in dt and "time" not in dt:
-            return str(value)
-        if "timestamp" in dt:
-            return str(value)
-        return str(value)
-    except Exception:
-        return str(value)
-
 def insert_row(table_name: str, schema, values, conn):
     # values: list aligned to schema order
-    coerced = []
-    for col, val in zip(schema, values):
-        coerced.append(parse_value_by_type(val, col["type"]))
-    # Build VALUES clause with repr, handling NULL
-    sql_values = ",".join(["NULL" if v is None else repr(v) for v in coerced])
-    with conn.cursor() as cursor:
-        cursor.execute(f"INSERT INTO {table_name} VALUES ({sql_values})")
+    plan = compile_plan(schema)
+    row = {name: parse_value(val, kind) for (name, kind), val in zip(plan, values)}
+    return write_rows(conn, table_name, pd.DataFrame([row], columns=[name for name, _ in plan]), plan)
+
+def read_table_arrow(table_name: str, conn, progress=None, max_rows=None, max_bytes=None, projection=None, predicate=None):
+    # Returns (pa.Table, read stats); stops at the READ_MAX_ROWS / READ_MAX_MB ceiling.
+    # projection: columns to read (all when empty); predicate: build_predicate() output
+    query, params = build_select_query(table_name, projection, predicate)
+    return read_query(conn, query, params, max_rows=max_rows, max_bytes=max_bytes, progress=progress)
 
 def read_table(table_name: str, conn) -> pd.DataFrame:
-    with conn.cursor() as cursor:
-        cursor.execute(f"SELECT * FROM {table_name}")
-        return cursor.fetchall_arrow().to_pandas()
+    return read_table_arrow(table_name, conn)[0].to_pandas()
+
+def slice_key(projection=None, filters=None):
+    # Snapshot cache key part for the loaded columns and filters
+    return tuple(projection or ()), json.dumps(filters or [], sort_keys=True, default=str)
+
+def slice_schema(schema, columns):
+    # Schema entries of the loaded columns, in load order
+    by_name = {c['name']: c for c in (schema or [])}
+    return [by_name[c] for c in columns if c in by_name] if by_name else schema
+
+def load_predicate(table_name: str, conn, identity, filters):
+    # Filters from the load form as a typed WHERE predicate: (sql, params)
+    if not filters:
+        return "", {}
+    return build_predicate(filters, get_table_schema(table_name, conn, identity))
+
+def load_snapshot(table_name: str, conn, identity, progress=None, projection=None, filters=None, pipeline=None,
+                  version_future=None):
+    # One DESCRIBE HISTORY when the cached version is current, full read otherwise.
+    # progress(rows_fetched, total_rows) while reading; total_rows is None until
+    # the count is in. Returns a SnapshotEntry. With a LoadPipeline the count and
+    # data queries run concurrently; version_future is a version query already
+    # submitted to it.
+    pipeline = pipeline or LoadPipeline(conn)
+    version = pipeline.result(version_future or pipeline.submit(lambda c: get_table_version(table_name, c)))
+    cache_key = (identity, table_name, slice_key(projection, filters))
+    previous_version = snapshot_cache.cached_version(cache_key)
+    entry = snapshot_cache.get(cache_key, version)
+    if entry is not None:
+        return entry
+    if previous_version is not None:
+        # A new Delta version may come from ALTER TABLE; refresh this table's columns
+        schema_cache.invalidate(identity, table_name)
 
-def insert_overwrite_table(table_name: str, df: pd.DataFrame, conn):
+    def read():
+        predicate = pipeline.result(pipeline.submit(lambda c: load_predicate(table_name, c, identity, filters)))
+        if progress is not None:
+            # COUNT(*) on Delta is answered from file statistics; it only feeds the progress bar
+            count_future = pipeline.submit(lambda c: safe_count(table_name, c, predicate))
+            def fetched(rows):
+                total = count_future.result() if count_future.done() else None
+                progress(rows, None if total is None else min(total, MAX_READ_ROWS))
+            fetched(0)
+        else:
+            fetched = None
+        data_future = pipeline.submit(lambda c: read_table_arrow(table_name, c, fetched, projection=projection,
+                                                                 predicate=predicate))
+        arrow, stats = pipeline.result(data_future)
+        metadata = pipeline.result(pipeline.submit(lambda c: get_table_metadata(table_name, c, identity)))
+        return snapshot_cache.put(cache_key, version, arrow, metadata['columns'], metadata['key_columns'], stats['truncated'])
+
+    # Sessions loading the same slice of the same version at once share one read
+    return single_flight.do(("snapshot",) + cache_key + (version,), read)
+
+def refresh_snapshot(table_name: str, conn, identity, base, base_version, version, key_columns=None, truncated=False,
+                     projection=None, filters=None):
+    # Applies the change data feed since base_version to base (the loaded Arrow table).
+    # Returns (SnapshotEntry, summary); summary is None after a full reload.
+    # Filtered loads always reload: changed rows may enter or leave the slice.
+    if base is not None and base_version is not None and version is not None and not truncated and not filters:
+        try:
+            changes = read_changes(conn, table_name, base_version + 1, version)
+            if not key_columns or set(key_columns) - set(base.column_names):
+                key_columns = None
+            table, summary = apply_changes(base, changes, key_columns)
+            metadata = get_table_metadata(table_name, conn, identity)
+            entry = snapshot_cache.put((identity, table_name, slice_key(projection, filters)), version, table,
+                                       metadata['columns'], metadata['key_columns'])
+            return entry, summary
+        except ChangeFeedUnavailable:
+            pass
+    # No feed, or too far behind: columns may have changed as well
+    schema_cache.invalidate(identity, table_name)
+    return load_snapshot(table_name, conn, identity, projection=projection, filters=filters), None
+
+def read_table_columns(table_name: str, conn):
+    # Column names without scanning any data
     with conn.cursor() as cursor:
-        rows = list(df.itertuples(index=False))
-        values = ",".join([f"({','.join(map(repr, row))})" for row in rows])
-        cursor.execute(f"INSERT OVERWRITE {table_name} VALUES {values}")
+        cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
+        return [d[0] for d in cursor.description]
+
+def read_table_page(table_name: str, conn, page_current, page_size, sort_by=None, filter_query=None, columns=None,
+                    projection=None, predicate=None):
+    query, params = build_page_query(table_name, page_current, page_size, sort_by, filter_query, columns,
+                                     projection, predicate)
+    with conn.cursor() as cursor, cancellable(cursor):
+        with metrics.timer("execute"):
+            cursor.execute(query, parameters=params or None)
+        with metrics.timer("fetch"):
+            return cursor.fetchall_arrow()
+
+def count_table_rows(table_name: str, conn, filter_query=None, columns=None, predicate=None) -> int:
+    query, params = build_count_query(table_name, filter_query, columns, predicate)
+    with conn.cursor() as cursor, cancellable(cursor):
+        with metrics.timer("execute"):
+            cursor.execute(query, parameters=params or None)
+        row = cursor.fetchone()
+    return int(row[0]) if row else 0
+
+def safe_count(table_name: str, conn, predicate=None):
+    # Row count for progress only: a failure leaves the total unknown
+    try:
+        return count_table_rows(table_name, conn, predicate=predicate)
+    except Exception:
+        return None
+
+def load_progress(set_progress):
+    # progress(rows, total) for load_snapshot -> the load progress bar
+    def progress(rows, total):
+        if total is None:
+            set_progress((rows, max(rows, 1), f"{rows:,} rows"))
+        else:
+            set_progress((rows, max(total, 1), f"{rows:,} / {total:,} rows"))
+    return progress
+
+def queue_progress(set_progress):
+    # waiting(ahead, together) for write_queue.run -> the save progress label
+    def waiting(ahead, together):
+        if together > 1:
+            set_progress((0, 1, f"Saving together with {together - 1} other session{'s' if together > 2 else ''}"))
+        elif ahead:
+            set_progress((0, 1, f"Waiting for {ahead} earlier save{'s' if ahead != 1 else ''} of this table"))
+    return waiting
+
+def insert_overwrite_table(table_name: str, df: pd.DataFrame, conn, schema=None, progress=None):
+    return write_rows(conn, table_name, df, frame_plan(df, schema), mode="overwrite", progress=progress)
+
+def replace_where_table(table_name: str, df: pd.DataFrame, predicate, conn, schema=None, progress=None):
+    # Rewrites only the rows matching predicate; df must hold every table column
+    return write_rows(conn, table_name, df, frame_plan(df, schema), mode="replace", progress=progress,
+                      predicate=predicate)
+
+def cache_query(buffer, sort_by, filter_query, search):
+    # Server cache paging: (snapshot positions to show, rows added since the load)
+    positions = buffer.index.query(sort_by, filter_query, search)
+    return buffer.visible_positions(positions), buffer.added_rows()
+
+def build_filter_row(index, options):
+    return dbc.Row([
+        dbc.Col(dcc.Dropdown(id={"type": "load-filter-column", "index": index}, options=options or [],
+                             placeholder="Column"), width=5),
+        dbc.Col(dcc.Dropdown(id={"type": "load-filter-op", "index": index}, options=LOAD_OPERATORS,
+                             value="=", clearable=False), width=2),
+        dbc.Col(dbc.Input(id={"type": "load-filter-value", "index": index}, type="text",
+                          placeholder="Value (IN: a, b, c)"), width=5),
+    ], className="mb-2")
 
 def layout():
     return dbc.Container([
@@ -181,17 +263,88 @@ def layout():
                                       })
                         ], width=12)
                     ]),
+                    dbc.Accordion([
+                        dbc.AccordionItem([
+                            dbc.Label("Columns to load (all when empty):", className="fw-bold mb-2"),
+                            dcc.Dropdown(id="load-columns-select", multi=True, placeholder="All columns", className="mb-3"),
+                            dbc.Label("Filters, applied by the warehouse before loading:", className="fw-bold mb-2"),
+                            html.Div(id="load-filters", children=[]),
+                            dbc.Button("Add filter", id="add-filter-button", color="secondary", outline=True, size="sm",
+                                       className="me-2"),
+                            dbc.Button("Clear filters", id="clear-filters-button", color="link", size="sm"),
+                        ], title="Columns and filters", item_id="load-options"),
+                        dbc.AccordionItem([
+                            html.P("Append or upsert rows from a CSV file with a header row, or a Parquet file. "
+                                   "Values are checked against the column types; rejected rows are listed and "
+                                   "the rest are written in batches.", className="text-muted"),
+                            html.Input(id="import-file", type="file", accept=".csv,.parquet,.pq",
+                                       className="form-control mb-3"),
+                            dbc.RadioItems(id="import-mode", options=[
+                                {"label": "Append rows (INSERT INTO)", "value": "append"},
+                                {"label": "Upsert on the key columns (MERGE)", "value": "merge"},
+                            ], value="append", className="mb-3"),
+                            dbc.Button("Import", id="import-button", color="primary", size="sm"),
+                            dbc.Progress(id="import-progress", value=0, striped=True, animated=True,
+                                         className="mt-2 d-none"),
+                            html.Div(id="import-status", className="mt-3"),
+                        ], title="Import rows from a file", item_id="import-rows"),
+                    ], id="load-options-accordion", start_collapsed=True, className="mb-3"),
+                    dbc.Label("Page, sort and filter rows:", className="fw-bold mb-2"),
+                    dbc.RadioItems(id="paging-mode", options=[
+                        {"label": "In the browser (every loaded row is sent)", "value": "browser"},
+                        {"label": "On the server from the loaded snapshot (large loads; adds a search box)", "value": "cache"},
+                        {"label": "On the warehouse (tables over the load limit; editing needs a primary key)", "value": "warehouse"},
+                    ], value="browser", className="mb-3"),
                     dbc.Button("Load Table", id="load-button-edit", color="primary", className="mb-4", size="md")
                 ], className="mt-3"),
+                dbc.Progress(id="load-progress", value=0, striped=True, animated=True, className="mt-2 d-none"),
                 dcc.Store(id="schema-store"),
+                # {upload_id, filename, format, bytes} from the upload route, or {error}
+                dcc.Store(id="import-upload"),
+                dcc.Store(id="loaded-table-store"),
+                # Staged edits live on the server under this id; the grid only sends deltas
+                dcc.Store(id="session-id", data=str(uuid.uuid4())),
+                dcc.Store(id="edit-deltas"),
+                dcc.Store(id="edit-ack", data=0),
+                # Bumped when the snapshot behind server cache pages changes
+                dcc.Store(id="cache-refresh", data=0),
+                dbc.Input(id="grid-search", type="search", placeholder="Search all columns", debounce=True,
+                          className="mt-3 d-none"),
                 dbc.Spinner(
                     html.Div(id="table-editor", className="mt-3"),
                     color="primary",
                     type="border",
                     fullscreen=False,
                 ),
+                html.Div([
+                    dbc.Label("Key columns used to save only changed rows (MERGE):", className="fw-bold mb-2"),
+                    dcc.Dropdown(id="key-columns-select", multi=True,
+                                 placeholder="No key: Save Changes rewrites the whole table"),
+                ], id="key-area", className="mt-3 d-none"),
+                html.Div([
+                    dbc.Button("Refresh", id="refresh-button-edit", color="secondary", outline=True, size="sm", className="me-3"),
+                    dbc.Switch(id="follow-changes-switch", label=f"Follow changes (every {CDF_POLL_SECONDS}s)",
+                               value=False, className="d-inline-block"),
+                    dcc.Interval(id="refresh-interval", interval=CDF_POLL_SECONDS * 1000, disabled=True),
+                ], id="refresh-area", className="mt-3 d-none"),
+                html.Div([
+                    dbc.Select(id="export-format", options=[
+                        {"label": "CSV", "value": "csv"},
+                        {"label": "Parquet", "value": "parquet"},
+                        {"label": "Arrow IPC stream", "value": "arrow"},
+                    ], value="csv", size="sm", className="d-inline-block me-3", style={"width": "auto"}),
+                    dbc.Checkbox(id="export-gzip", label="gzip", value=False, className="d-inline-block me-3"),
+                    dbc.Checkbox(id="export-view", label="Only the grid's current filter and sort", value=False,
+                                 className="d-inline-block me-3"),
+                    dbc.Button("Export", id="export-button", color="secondary", outline=True, size="sm"),
+                    # Download path of the last export; the browser follows it (assets/table_edit.js)
+                    dcc.Store(id="export-url"),
+                    dcc.Store(id="export-started"),
+                ], id="export-area", className="mt-3 d-none"),
                 html.Div(id="new-row-area", className="mt-3"),
+                html.Div(id="pending-edits-status", className="mt-2 text-muted"),
                 dbc.Button("Save Changes", id="save-button-edit", color="success", className="mt-3 d-none", size="md"),
+                dbc.Progress(id="save-progress", value=0, striped=True, animated=True, className="mt-2 d-none"),
                 html.Div(id="status-area-edit", className="mt-3")
             ], className="p-3"),
             
@@ -227,165 +380,708 @@ def layout():
         ], id="tabs", active_tab="try-it", className="mb-4")
     ], fluid=True, className="py-4")
 
+def build_editing_table(columns, data, server_side: bool = False, editable: bool = True):
+    # server_side: the warehouse or the snapshot index pages, sorts and filters; the grid holds one page only
+    paging = {
+        'page_action': 'custom',
+        'sort_action': 'custom',
+        'filter_action': 'custom',
+        'page_current': 0,
+        'sort_by': [],
+        'filter_query': '',
+    } if server_side else {
+        'page_action': 'native',
+        'sort_action': 'native',
+    }
+    return dash_table.DataTable(
+        id='editing-table',
+        data=data,
+        columns=[{'name': i, 'id': i, 'editable': editable} for i in columns],
+        editable=editable,
+        row_deletable=editable,
+        style_table={
+            'overflowX': 'auto',
+            'minWidth': '100%',
+        },
+        style_header={
+            'backgroundColor': '#f8f9fa',
+            'fontWeight': 'bold',
+            'border': '1px solid #dee2e6',
+            'padding': '12px 15px'
+        },
+        style_cell={
+            'padding': '12px 15px',
+            'textAlign': 'left',
+            'border': '1px solid #dee2e6',
+            'maxWidth': '200px',
+            'overflow': 'hidden',
+            'textOverflow': 'ellipsis'
+        },
+        style_data={
+            'whiteSpace': 'normal',
+            'height': 'auto',
+        },
+        page_size=10,
+        sort_mode='multi',
+        **paging,
+    )
+
 @callback(
     [Output("table-editor", "children"),
      Output("save-button-edit", "className"),
      Output("status-area-edit", "children", allow_duplicate=True),
      Output("new-row-area", "children"),
-     Output("schema-store", "data")],
+     Output("schema-store", "data"),
+     Output("loaded-table-store", "data"),
+     Output("edit-deltas", "data", allow_duplicate=True),
+     Output("edit-ack", "data", allow_duplicate=True),
+     Output("pending-edits-status", "children", allow_duplicate=True),
+     Output("key-columns-select", "options"),
+     Output("key-columns-select", "value"),
+     Output("key-area", "className"),
+     Output("refresh-area", "className"),
+     Output("grid-search", "className")],
     Input("load-button-edit", "n_clicks"),
-    [State("table-name-input", "value"), State("app-config", "data")],
+    [State("table-name-input", "value"), State("app-config", "data"), State("paging-mode", "value"),
+     State("session-id", "data"),
+     State("load-columns-select", "value"),
+     State({"type": "load-filter-column", "index": ALL}, "value"),
+     State({"type": "load-filter-op", "index": ALL}, "value"),
+     State({"type": "load-filter-value", "index": ALL}, "value")],
+    background=True,
+    running=[
+        (Output("load-button-edit", "disabled"), True, False),
+        (Output("save-button-edit", "disabled"), True, False),
+        (Output("load-progress", "className"), "mt-2", "mt-2 d-none"),
+    ],
+    progress=[Output("load-progress", "value"), Output("load-progress", "max"), Output("load-progress", "label")],
+    progress_default=[0, 100, ""],
+    # Pressing Load Table again also cancels the running job
+    cancel=[Input("table-name-input", "value")],
     prevent_initial_call=True
 )
-def load_table_data_edit(n_clicks, table_name, store):
+@traced("load_table")
+def load_table_data_edit(set_progress, n_clicks, table_name, store, paging_mode, session_id,
+                         projection, filter_columns, filter_ops, filter_values):
     if not table_name:
-        return None, "mt-3 d-none", dbc.Alert("Please provide table name in catalog.schema.table format", color="warning"), None, None
+        return None, "mt-3 d-none", dbc.Alert("Please provide table name in catalog.schema.table format", color="warning"), None, None, None, None, 0, None, [], [], "mt-3 d-none", "mt-3 d-none", "mt-3 d-none"
     http_path = (store or {}).get('http_path') if store else None
     host = (store or {}).get('host') if store else None
     token = (store or {}).get('token') if store else None
     if not http_path:
-        return None, "mt-3 d-none", dbc.Alert("Missing SQL HTTP Path. Set it in Configuration.", color="warning"), None, None
+        return None, "mt-3 d-none", dbc.Alert("Missing SQL HTTP Path. Set it in Configuration.", color="warning"), None, None, None, None, 0, None, [], [], "mt-3 d-none", "mt-3 d-none", "mt-3 d-none"
+    filters = [{'column': c, 'op': o or "=", 'value': v}
+               for c, o, v in zip(filter_columns or [], filter_ops or [], filter_values or []) if c]
     try:
-        conn = get_connection(http_path, host, token)
-        df = read_table(table_name, conn)
-        schema = get_table_schema(table_name, conn)
-        table = dash_table.DataTable(
-            id='editing-table',
-            data=df.to_dict('records'),
-            columns=[{'name': i, 'id': i, 'editable': True} for i in df.columns],
-            editable=True,
-            row_deletable=True,
-            style_table={
-                'overflowX': 'auto',
-                'minWidth': '100%',
-            },
-            style_header={
-                'backgroundColor': '#f8f9fa',
-                'fontWeight': 'bold',
-                'border': '1px solid #dee2e6',
-                'padding': '12px 15px'
-            },
-            style_cell={
-                'padding': '12px 15px',
-                'textAlign': 'left',
-                'border': '1px solid #dee2e6',
-                'maxWidth': '200px',
-                'overflow': 'hidden',
-                'textOverflow': 'ellipsis'
-            },
-            style_data={
-                'whiteSpace': 'normal',
-                'height': 'auto',
-            },
-            page_size=10,
-            page_action='native',
-            sort_action='native',
-            sort_mode='multi',
-        )
-        return table, "mt-3", None, build_new_row_form(schema), schema
+        identity = connection_identity(http_path, host, token)
+        with borrow_connection(http_path, host, token) as conn, \
+                LoadPipeline(conn, lambda: try_borrow_connection(http_path, host, token)) as pipeline:
+            # Schema lookup and Delta version go out together; warehouse paging needs no version
+            metadata_future = pipeline.submit(lambda c: get_table_metadata(table_name, c, identity))
+            version_future = None
+            if paging_mode != "warehouse":
+                version_future = pipeline.submit(lambda c: get_table_version(table_name, c))
+            metadata = pipeline.result(metadata_future)
+            all_columns = [c['name'] for c in metadata['columns']]
+            projection = [c for c in (projection or []) if c in all_columns] or None
+            # Only a strict subset of columns is a projection; saving it must not null the rest
+            partial = bool(projection) and set(all_columns) != set(projection)
+            if paging_mode == "warehouse":
+                # Only metadata here; the page and count callbacks fetch the rows.
+                # Pages are editable when rows can be addressed by a primary key.
+                key_columns = metadata['key_columns']
+                columns = projection or all_columns or read_table_columns(table_name, conn)
+                schema = slice_schema(metadata['columns'], columns)
+                editable = bool(key_columns) and not set(key_columns) - set(columns)
+                buffer = edit_buffers.create(session_id, table_name=table_name, identity=identity, columns=columns,
+                                             schema=schema, key_columns=key_columns, server_side=True)
+                table = build_editing_table(columns, [], server_side=True, editable=editable)
+                loaded = {'table': table_name, 'server_side': True, 'mode': paging_mode, 'columns': columns,
+                          'projection': projection, 'partial': partial, 'filters': filters,
+                          'next_row_id': buffer.next_id}
+                status = None if editable else dbc.Alert(
+                    "The primary key is missing or not loaded, so server-side pages are read-only.", color="info")
+                return (table, "mt-3" if editable else "mt-3 d-none", status,
+                        build_new_row_form(schema) if editable else None, schema, loaded, None, 0, None,
+                        [], key_columns, "mt-3 d-none", "mt-3 d-none", "mt-3 d-none")
+            snapshot = load_snapshot(table_name, conn, identity, progress=load_progress(set_progress),
+                                     projection=projection, filters=filters, pipeline=pipeline,
+                                     version_future=version_future)
+        columns = snapshot.table.column_names
+        schema = slice_schema(snapshot.schema, columns)
+        key_columns = snapshot.key_columns if not set(snapshot.key_columns) - set(columns) else []
+        cached = paging_mode == "cache"
+        index = None
+        if cached:
+            # Pages are cut from the snapshot; sort indexes are built while the first page shows
+            index = index_for(snapshot)
+            warm_in_background(index)
+        # The buffer shares the cached Arrow table; row ids are row positions in it
+        buffer = edit_buffers.create(session_id, table_name=table_name, identity=identity, columns=columns,
+                                     schema=schema, key_columns=key_columns, table=snapshot.table, index=index)
+        records = [] if cached else attach_row_ids(arrow_to_records(snapshot.table))
+        table = build_editing_table(columns, records, server_side=cached)
+        loaded = {'table': table_name, 'server_side': False, 'mode': "cache" if cached else "browser", 'columns': columns,
+                  'version': snapshot.version, 'truncated': snapshot.truncated,
+                  'projection': projection, 'partial': partial, 'filters': filters,
+                  # Rows staged in the browser take ids from here on (assets/table_edit.js)
+                  'next_row_id': buffer.next_id}
+        key_options = [{'label': c, 'value': c} for c in columns]
+        status = None
+        if snapshot.truncated:
+            status = dbc.Alert(f"Showing the first {snapshot.table.num_rows:,} rows; the table is larger than the load limit. "
+                               "Page on the warehouse to browse all rows.", color="warning")
+        return (table, "mt-3", status, build_new_row_form(schema), schema, loaded, None, 0, None,
+                key_options, key_columns, "mt-3", "mt-3", "mt-3" if cached else "mt-3 d-none")
     except Exception as e:
-        return None, "mt-3 d-none", dbc.Alert(f"Error loading table: {str(e)}", color="danger"), None, None
+        return None, "mt-3 d-none", dbc.Alert(f"Error loading table: {str(e)}", color="danger"), None, None, None, None, 0, None, [], [], "mt-3 d-none", "mt-3 d-none", "mt-3 d-none"
 
 @callback(
-    Output("status-area-edit", "children"),
-    Input("save-button-edit", "n_clicks"),
+    [Output("editing-table", "data", allow_duplicate=True),
+     Output("status-area-edit", "children", allow_duplicate=True)],
+    [Input("editing-table", "page_current"),
+     Input("editing-table", "page_size"),
+     Input("editing-table", "sort_by"),
+     Input("editing-table", "filter_query"),
+     Input("grid-search", "value"),
+     Input("cache-refresh", "data")],
+    [State("loaded-table-store", "data"), State("app-config", "data"), State("session-id", "data")],
+    prevent_initial_call='initial_duplicate'
+)
+@traced("table_page")
+def update_table_page(page_current, page_size, sort_by, filter_query, search, refreshed, loaded, store, session_id):
+    if loaded and loaded.get('mode') == "cache":
+        buffer = edit_buffers.get(session_id)
+        if buffer is None or buffer.index is None:
+            return dash.no_update, dash.no_update
+        positions, added = cache_query(buffer, sort_by, filter_query, search)
+        size = max(int(page_size or 10), 1)
+        start = int(page_current or 0) * size
+        records = buffer.records_at(positions[start:start + size])
+        if len(records) < size:
+            # Rows inserted since the load follow the snapshot rows
+            offset = max(start - len(positions), 0)
+            records.extend(added[offset:offset + size - len(records)])
+        return records, dash.no_update
+    if not loaded or not loaded.get('server_side'):
+        return dash.no_update, dash.no_update
+    http_path = (store or {}).get('http_path') if store else None
+    host = (store or {}).get('host') if store else None
+    token = (store or {}).get('token') if store else None
+    try:
+        with borrow_connection(http_path, host, token) as conn:
+            identity = connection_identity(http_path, host, token)
+            predicate = load_predicate(loaded['table'], conn, identity, loaded.get('filters'))
+            page = read_table_page(loaded['table'], conn, page_current, page_size, sort_by, filter_query, loaded.get('columns'),
+                                   loaded.get('projection'), predicate)
+    except Exception as e:
+        # The grid keeps the page it shows
+        return dash.no_update, dbc.Alert(f"Error loading page: {str(e)}", color="danger")
+    records = arrow_to_records(page)
+    buffer = edit_buffers.get(session_id)
+    if buffer is not None and buffer.server_side and buffer.key_columns:
+        # Tag rows with key-based ids and show edits staged on other pages
+        return buffer.remember_page(records), dash.no_update
+    return records, dash.no_update
+
+@callback(
+    [Output("editing-table", "page_count"),
+     Output("status-area-edit", "children", allow_duplicate=True)],
+    [Input("editing-table", "filter_query"),
+     Input("editing-table", "page_size"),
+     Input("grid-search", "value"),
+     Input("cache-refresh", "data")],
+    [State("loaded-table-store", "data"), State("app-config", "data"), State("session-id", "data")],
+    prevent_initial_call='initial_duplicate'
+)
+def update_page_count(filter_query, page_size, search, refreshed, loaded, store, session_id):
+    # Separate callback so the COUNT(*) runs alongside the page fetch
+    size = max(int(page_size or 10), 1)
+    if loaded and loaded.get('mode') == "cache":
+        buffer = edit_buffers.get(session_id)
+        if buffer is None or buffer.index is None:
+            return dash.no_update, dash.no_update
+        # Same query as the page callback, answered from the index's result cache
+        positions, added = cache_query(buffer, None, filter_query, search)
+        return max((len(positions) + len(added) + size - 1) // size, 1), dash.no_update
+    if not loaded or not loaded.get('server_side'):
+        return dash.no_update, dash.no_update
+    http_path = (store or {}).get('http_path') if store else None
+    host = (store or {}).get('host') if store else None
+    token = (store or {}).get('token') if store else None
+    try:
+        with borrow_connection(http_path, host, token) as conn:
+            identity = connection_identity(http_path, host, token)
+            predicate = load_predicate(loaded['table'], conn, identity, loaded.get('filters'))
+            total = count_table_rows(loaded['table'], conn, filter_query, loaded.get('columns'), predicate)
+    except Exception as e:
+        return dash.no_update, dbc.Alert(f"Error counting rows: {str(e)}", color="danger")
+    return max((total + size - 1) // size, 1), dash.no_update
+
+@callback(
+    Output("editing-table", "page_current"),
+    Input("grid-search", "value"),
+    prevent_initial_call=True
+)
+def reset_page_on_search(search):
+    return 0
+
+@callback(
+    Output("load-columns-select", "options"),
+    [Input("load-options-accordion", "active_item"),
+     Input("table-name-input", "n_blur")],
+    [State("table-name-input", "value"), State("app-config", "data")],
+    prevent_initial_call=True
+)
+def update_load_column_options(active_item, n_blur, table_name, store):
+    # Columns come from the schema cache, so opening the panel costs at most one metadata query
+    if active_item != "load-options" or not table_name:
+        return dash.no_update
+    http_path = (store or {}).get('http_path') if store else None
+    host = (store or {}).get('host') if store else None
+    token = (store or {}).get('token') if store else None
+    if not http_path:
+        return []
+    try:
+        with borrow_connection(http_path, host, token) as conn:
+            schema = get_table_schema(table_name, conn, connection_identity(http_path, host, token))
+    except Exception:
+        return []
+    return [{'label': f"{c['name']} ({c['type']})", 'value': c['name']} for c in schema]
+
+@callback(
+    Output("load-filters", "children"),
+    Input("add-filter-button", "n_clicks"),
+    State("load-columns-select", "options"),
+    prevent_initial_call=True
+)
+def add_load_filter(n_clicks, options):
+    rows = Patch()
+    rows.append(build_filter_row(n_clicks, options))
+    return rows
+
+@callback(
+    Output("load-filters", "children", allow_duplicate=True),
+    Input("clear-filters-button", "n_clicks"),
+    prevent_initial_call=True
+)
+def clear_load_filters(n_clicks):
+    return []
+
+@callback(
+    Output("refresh-interval", "disabled"),
+    Input("follow-changes-switch", "value"),
+)
+def toggle_follow_changes(follow):
+    return not follow
+
+@callback(
+    [Output("editing-table", "data", allow_duplicate=True),
+     Output("loaded-table-store", "data", allow_duplicate=True),
+     Output("status-area-edit", "children", allow_duplicate=True),
+     Output("edit-deltas", "data", allow_duplicate=True),
+     Output("edit-ack", "data", allow_duplicate=True),
+     Output("editing-table", "columns"),
+     Output("cache-refresh", "data")],
+    [Input("refresh-button-edit", "n_clicks"),
+     Input("refresh-interval", "n_intervals")],
+    [State("session-id", "data"),
+     State("app-config", "data"),
+     State("loaded-table-store", "data"),
+     State("cache-refresh", "data")],
+    prevent_initial_call=True
+)
+@traced("refresh_table")
+def refresh_table_data(n_clicks, n_intervals, session_id, store, loaded, refreshed):
+    # Polls stay silent unless the table changed; a manual refresh always reports
+    polling = dash.ctx.triggered_id == "refresh-interval"
+    def notice(message, color):
+        if polling:
+            return (dash.no_update,) * 7
+        return (dash.no_update, dash.no_update, dbc.Alert(message, color=color), dash.no_update, dash.no_update,
+                dash.no_update, dash.no_update)
+    if not loaded or loaded.get('server_side'):
+        return notice("Server-side pages are always read from the warehouse.", "info")
+    buffer = edit_buffers.get(session_id)
+    if buffer is None:
+        return notice(EXPIRED_SESSION, "warning")
+    if buffer.pending_count():
+        return notice("Save your changes before refreshing.", "warning")
+    http_path = (store or {}).get('http_path') if store else None
+    host = (store or {}).get('host') if store else None
+    token = (store or {}).get('token') if store else None
+    table_name = loaded['table']
+    try:
+        identity = connection_identity(http_path, host, token)
+        with borrow_connection(http_path, host, token) as conn:
+            version = get_table_version(table_name, conn)
+            if version is not None and version == loaded.get('version'):
+                return notice("The table is up to date.", "info")
+            entry, summary = refresh_snapshot(table_name, conn, identity, buffer.table, loaded.get('version'), version,
+                                              buffer.key_columns, loaded.get('truncated'),
+                                              loaded.get('projection'), loaded.get('filters'))
+    except Exception as e:
+        return notice(f"Error refreshing table: {str(e)}", "danger")
+    columns = entry.table.column_names
+    cached = loaded.get('mode') == "cache"
+    index = index_for(entry) if cached else None
+    refreshed_buffer = edit_buffers.create(session_id, table_name=table_name, identity=identity, columns=columns,
+                                           schema=slice_schema(entry.schema, columns),
+                                           key_columns=buffer.key_columns, table=entry.table, index=index)
+    if cached:
+        # The page callbacks re-query the new snapshot
+        warm_in_background(index)
+        rows = dash.no_update
+    elif summary is not None and summary['in_place'] and not buffer.overrides and columns == buffer.columns:
+        # Grid rows still line up with snapshot positions: patch only the changed rows
+        rows = Patch()
+        for pos, row in summary['replaced'].items():
+            rows[pos] = {**row, ROW_ID: pos}
+        for pos, row in enumerate(summary['appended'], start=buffer.table.num_rows):
+            rows.append({**row, ROW_ID: pos})
+    else:
+        rows = attach_row_ids(arrow_to_records(entry.table))
+    loaded = {**loaded, 'columns': columns, 'version': entry.version, 'truncated': entry.truncated,
+              'next_row_id': refreshed_buffer.next_id}
+    if summary is None:
+        message = f"Reloaded version {entry.version} (change data feed not available)"
+    else:
+        message = (f"Refreshed to version {entry.version}: {summary['inserted']} inserted, "
+                   f"{summary['updated']} updated, {summary['deleted']} deleted")
+    grid_columns = dash.no_update
+    if columns != buffer.columns:
+        grid_columns = [{'name': c, 'id': c, 'editable': True} for c in columns]
+    return (rows, loaded, dbc.Alert(message, color="info"), None, 0, grid_columns,
+            (refreshed or 0) + 1 if cached else dash.no_update)
+
+def overwrite_table(table_name: str, table_data, schema, conn, progress=None):
+    # Fallback for keyless tables: rewrite the table from the staged rows
+    df = pd.DataFrame(table_data)
+    columns = [c.get('name') for c in schema] if schema else [c for c in df.columns if c != ROW_ID]
+    return insert_overwrite_table(table_name, df.reindex(columns=columns), conn, schema, progress)
+
+def replace_slice(table_name: str, table_data, predicate, schema, conn, progress=None):
+    # Keyless filtered loads: REPLACE WHERE the load filters; schema is the full table schema
+    df = pd.DataFrame(table_data).reindex(columns=[c.get('name') for c in schema])
+    return replace_where_table(table_name, df, predicate, conn, schema, progress)
+
+def merge_changes(table_name: str, diff, columns, key_columns, schema, conn, progress=None):
+    type_map = {c.get('name'): c.get('type') for c in (schema or [])}
+    frame = diff_frame(diff, columns, key_columns)
+    return merge_rows(conn, table_name, frame, compile_plan(schema, columns), key_columns, type_map, progress)
+
+def pending_summary(buffer):
+    count = buffer.pending_count()
+    if not count:
+        return None
+    return f"{count:,} row{'s' if count != 1 else ''} with unsaved changes"
+
+# Grid edits become cell deltas in the browser (assets/table_edit.js); only
+# entries the server has not acknowledged yet are sent. Values are checked and
+# typed against schema-store first; a refused value is put back in the grid.
+clientside_callback(
+    ClientsideFunction(namespace="tableEdit", function_name="collectDeltas"),
+    [Output("edit-deltas", "data"),
+     Output("editing-table", "data", allow_duplicate=True),
+     Output("status-area-edit", "children", allow_duplicate=True)],
+    Input("editing-table", "data_timestamp"),
     [State("editing-table", "data"),
+     State("editing-table", "data_previous"),
+     State("edit-deltas", "data"),
+     State("edit-ack", "data"),
+     State("schema-store", "data")],
+    prevent_initial_call=True
+)
+
+@callback(
+    [Output("edit-ack", "data"),
+     Output("pending-edits-status", "children")],
+    Input("edit-deltas", "data"),
+    State("session-id", "data"),
+    prevent_initial_call=True
+)
+def apply_edit_deltas(queue, session_id):
+    buffer = edit_buffers.get(session_id)
+    if buffer is None:
+        return dash.no_update, dbc.Alert(EXPIRED_SESSION, color="warning")
+    try:
+        buffer.apply_deltas((queue or {}).get('pending'))
+    except EditBufferFull as e:
+        return buffer.applied_seq, dbc.Alert(str(e), color="warning")
+    return buffer.applied_seq, pending_summary(buffer)
+
+@callback(
+    [Output("status-area-edit", "children"),
+     Output("pending-edits-status", "children", allow_duplicate=True)],
+    Input("save-button-edit", "n_clicks"),
+    [State("session-id", "data"),
+     State("edit-deltas", "data"),
      State("table-name-input", "value"),
      State("app-config", "data"),
-     State("schema-store", "data")],
+     State("schema-store", "data"),
+     State("loaded-table-store", "data"),
+     State("key-columns-select", "value")],
+    background=True,
+    running=[
+        (Output("save-button-edit", "disabled"), True, False),
+        (Output("load-button-edit", "disabled"), True, False),
+        (Output("save-progress", "className"), "mt-2", "mt-2 d-none"),
+    ],
+    progress=[Output("save-progress", "value"), Output("save-progress", "max"), Output("save-progress", "label")],
+    progress_default=[0, 100, ""],
     prevent_initial_call=True
 )
-def save_changes(n_clicks, table_data, table_name, store, schema):
+@traced("save_changes")
+def save_changes(set_progress, n_clicks, session_id, queue, table_name, store, schema, loaded, key_columns):
     if not n_clicks:
-        return None
+        return None, dash.no_update
+    buffer = edit_buffers.get(session_id)
+    if buffer is None:
+        return dbc.Alert(EXPIRED_SESSION, color="warning"), dash.no_update
     http_path = (store or {}).get('http_path') if store else None
     host = (store or {}).get('host') if store else None
     token = (store or {}).get('token') if store else None
+    # Write back to the table that was loaded, even if the input was edited since
+    table_name = buffer.table_name or (loaded or {}).get('table') or table_name
+    def progress(report):
+        set_progress((report['rows'], max(report['total_rows'], 1), f"{report['rows']:,} / {report['total_rows']:,} rows"))
     try:
-        conn = get_connection(http_path, host, token)
-        df = pd.DataFrame(table_data)
-        # Coerce values to match schema to avoid mixed inline types
-        schema = schema or []
-        ordered_cols = [c.get('name') for c in schema] if schema else df.columns.tolist()
-        df = df.reindex(columns=ordered_cols)
-        def coerce_series(s, dtype):
-            dt = (dtype or '').lower()
-            try:
-                if any(t in dt for t in ["int", "byte", "short"]):
-                    return pd.to_numeric(s, errors='coerce').astype('Int64')
-                if any(t in dt for t in ["decimal", "double", "float", "real"]):
-                    return pd.to_numeric(s, errors='coerce')
-                if "boolean" in dt:
-                    return s.map(lambda v: str(v).lower() in ("true","1","yes","y") if v is not None else None)
-                # dates/timestamps: leave as strings
-                return s
-            except Exception:
-                return s
-        if schema:
-            for col in schema:
-                name = col.get('name')
-                if name in df.columns:
-                    df[name] = coerce_series(df[name], col.get('type'))
-        # Build SQL literals using schema type per column
-        def sql_literal_typed(v, dtype):
-            dt = (dtype or '').lower()
-            # nulls
-            if v is None or pd.isna(v):
-                return "NULL"
-            # booleans
-            if "boolean" in dt:
-                if isinstance(v, (bool, np.bool_)):
-                    return "TRUE" if bool(v) else "FALSE"
-                sv = str(v).lower()
-                return "TRUE" if sv in ("true","1","yes","y") else "FALSE"
-            # numerics
-            if any(t in dt for t in ["int", "byte", "short", "long", "bigint", "tinyint", "smallint", "decimal", "double", "float", "real"]):
-                nv = pd.to_numeric(pd.Series([v]), errors='coerce').iloc[0]
-                if pd.isna(nv):
-                    return "NULL"
-                return str(nv)
-            # dates/timestamps and strings
-            return "'" + str(v).replace("'", "''") + "'"
-        row_strings = []
-        type_map = {c.get('name'): c.get('type') for c in (schema or [])}
-        for _, r in df.iterrows():
-            vals = [sql_literal_typed(r[c], type_map.get(c)) for c in df.columns]
-            row_strings.append("(" + ",".join(vals) + ")")
-        values_sql = ",".join(row_strings)
-        with conn.cursor() as cursor:
-            cursor.execute(f"INSERT OVERWRITE {table_name} VALUES {values_sql}")
-        return dbc.Alert("Changes saved successfully", color="success")
+        try:
+            # Deltas still in flight; replays of applied ones are ignored
+            buffer.apply_deltas((queue or {}).get('pending'))
+        except EditBufferFull:
+            pass
+        columns = [c.get('name') for c in schema] if schema else buffer.columns
+        # Server-side pages are addressed by the primary key
+        key_columns = buffer.key_columns if buffer.server_side else key_columns
+        if not buffer.pending_count():
+            return dbc.Alert("No changes to save", color="info"), dash.no_update
+        identity = connection_identity(http_path, host, token)
+        # Saves of one table run one at a time, in order (utils/write_queue.py)
+        table_key = (identity[0], table_name.lower())
+        if key_columns:
+            diff = buffer.diff(key_columns)
+            if diff_is_empty(diff):
+                buffer.commit()
+                return dbc.Alert("No changes to save", color="info"), None
+            def merge(diffs):
+                # Diffs of other sessions with the same credentials and columns may join this MERGE
+                with borrow_connection(http_path, host, token) as conn:
+                    return merge_changes(table_name, combine_diffs(diffs), columns, key_columns, schema, conn,
+                                         progress)
+            report = write_queue.run(table_key, merge, payload=diff,
+                                     group=(identity, tuple(columns), tuple(key_columns)),
+                                     keys=diff_keys(diff, key_columns), waiting=queue_progress(set_progress))
+            message = (f"Changes saved successfully ({len(diff['inserted'])} inserted, "
+                       f"{len(diff['updated'])} updated, {len(diff['deleted'])} deleted; {describe_report(report)})")
+        else:
+            if (loaded or {}).get('truncated'):
+                # Overwriting from a partial snapshot would delete every row that was not loaded
+                return (dbc.Alert("Only part of this table was loaded. Select key columns to save changes with MERGE.",
+                                  color="warning"), dash.no_update)
+            if (loaded or {}).get('partial'):
+                # Rewriting rows from a subset of columns would null the columns that were not loaded
+                return (dbc.Alert("Only some columns were loaded. Select key columns to save changes with MERGE, "
+                                  "or load all columns.", color="warning"), dash.no_update)
+            def rewrite(_):
+                with borrow_connection(http_path, host, token) as conn:
+                    metadata = get_table_metadata(table_name, conn, identity)
+                    predicate = load_predicate(table_name, conn, identity, (loaded or {}).get('filters'))
+                    rows = buffer.current_rows()
+                    partition_columns = metadata.get('partition_columns') or []
+                    scope = "whole table"
+                    if partition_columns and not set(partition_columns) - set(buffer.columns):
+                        # Only the partitions holding staged edits are rewritten
+                        partitions, rows = partition_slice(rows, buffer.touched_rows(), partition_columns,
+                                                           metadata['columns'])
+                        if partitions is None:
+                            # No staged row is in a partition; never fall back to the whole table
+                            return {'scope': None}
+                        predicate = combine_predicates(predicate, partitions)
+                        scope = "touched partitions"
+                    elif predicate[0]:
+                        scope = "loaded slice"
+                    if predicate[0]:
+                        report = replace_slice(table_name, rows, predicate, metadata['columns'], conn, progress)
+                    else:
+                        report = overwrite_table(table_name, rows, schema, conn, progress)
+                return {**report, 'scope': scope}
+            # A rewrite from this session's snapshot is never merged, and a conflict is
+            # not retried: another writer changed the table since it was loaded
+            report = write_queue.run(table_key, rewrite, retry_conflicts=False, waiting=queue_progress(set_progress))
+            if report['scope'] is None:
+                buffer.commit()
+                return dbc.Alert("No changes to save", color="info"), None
+            message = f"Changes saved successfully ({describe_report(report)}; rewrote {report['scope']})"
+        # The write created a new Delta version; the next load re-reads it
+        snapshot_cache.invalidate_table(identity, table_name)
+        # The saved edits become the baseline for the next save
+        buffer.commit()
+        return dbc.Alert(message, color="success"), None
     except Exception as e:
-        return dbc.Alert(f"Error saving changes: {str(e)}", color="danger")
+        return dbc.Alert(f"Error saving changes: {str(e)}", color="danger"), dash.no_update
 
-@callback(
+# New rows are staged in the browser: the form is checked against schema-store
+# as it is typed, and Add Row appends the row to the grid and queues it as one
+# delta, which reaches the edit buffer like any cell edit
+clientside_callback(
+    ClientsideFunction(namespace="tableEdit", function_name="validateFields"),
+    [Output({'type': 'new-field', 'name': ALL}, 'invalid'),
+     Output({'type': 'new-field-error', 'name': ALL}, 'children')],
+    Input({'type': 'new-field', 'name': ALL}, 'value'),
+    [State({'type': 'new-field', 'name': ALL}, 'id'),
+     State("schema-store", "data")],
+    prevent_initial_call=True
+)
+
+clientside_callback(
+    ClientsideFunction(namespace="tableEdit", function_name="stageRow"),
     [Output("editing-table", "data", allow_duplicate=True),
-     Output("status-area-edit", "children", allow_duplicate=True),
-     Output("new-row-area", "children", allow_duplicate=True)],
+     Output("edit-deltas", "data", allow_duplicate=True),
+     Output({'type': 'new-field', 'name': ALL}, 'value'),
+     Output("status-area-edit", "children", allow_duplicate=True)],
     Input("add-row-button", "n_clicks"),
     [State({'type': 'new-field', 'name': ALL}, 'value'),
+     State({'type': 'new-field', 'name': ALL}, 'id'),
      State("schema-store", "data"),
+     State("edit-deltas", "data"),
+     State("edit-ack", "data"),
+     State("loaded-table-store", "data"),
      State("editing-table", "data")],
     prevent_initial_call=True
 )
-def add_row(n_clicks, new_values, schema, current_data):
-    if not n_clicks:
-        return dash.no_update, dash.no_update, dash.no_update
+
+# The file goes to the upload route from the browser (assets/bulk_import.js),
+# so it never passes through a callback payload
+clientside_callback(
+    ClientsideFunction(namespace="bulkImport", function_name="upload"),
+    Output("import-upload", "data"),
+    Input("import-button", "n_clicks"),
+    prevent_initial_call=True
+)
+
+def import_errors_table(report):
+    errors = report['errors']
+    note = "Rejected rows"
+    if len(errors) >= IMPORT_MAX_ERRORS:
+        note += f" (first {len(errors):,} problems)"
+    return html.Div([
+        html.H6(note, className="mt-3"),
+        dash_table.DataTable(
+            data=errors,
+            columns=[{'name': c.capitalize(), 'id': c} for c in ('row', 'column', 'value', 'error')],
+            page_size=10,
+            style_cell={'textAlign': 'left', 'padding': '6px 10px'},
+        ),
+    ])
+
+@callback(
+    Output("import-status", "children"),
+    Input("import-upload", "data"),
+    [State("table-name-input", "value"),
+     State("app-config", "data"),
+     State("import-mode", "value"),
+     State("key-columns-select", "value")],
+    background=True,
+    running=[
+        (Output("import-button", "disabled"), True, False),
+        (Output("import-progress", "className"), "mt-2", "mt-2 d-none"),
+    ],
+    progress=[Output("import-progress", "value"), Output("import-progress", "max"), Output("import-progress", "label")],
+    progress_default=[0, 100, ""],
+    cancel=[Input("table-name-input", "value")],
+    prevent_initial_call=True
+)
+@traced("import_rows")
+def import_rows(set_progress, upload, table_name, store, mode, key_columns):
+    if not upload:
+        return dash.no_update
+    if upload.get('error'):
+        return dbc.Alert(upload['error'], color="warning")
+    if not table_name:
+        discard_upload(upload.get('upload_id'), upload.get('format'))
+        return dbc.Alert("Please provide table name in catalog.schema.table format", color="warning")
+    path = upload_path(upload.get('upload_id'), upload.get('format'))
+    if path is None:
+        return dbc.Alert("The uploaded file is no longer available. Choose it and import again.", color="warning")
+    http_path = (store or {}).get('http_path') if store else None
+    host = (store or {}).get('host') if store else None
+    token = (store or {}).get('token') if store else None
     try:
-        schema = schema or []
-        column_names = [c.get('name') for c in schema]
-        # Build new row dict aligned with schema order; fill missing columns with None
-        new_row = {}
-        for name, val, col in zip(column_names, (new_values or []), schema):
-            new_row[name] = parse_value_by_type(val, col.get('type', 'string'))
-        # Ensure all columns present
-        if current_data and isinstance(current_data, list) and len(current_data) > 0:
-            for key in current_data[0].keys():
-                new_row.setdefault(key, None)
-        updated = (current_data or []) + [new_row]
-        return updated, dbc.Alert("Row staged. Click Save Changes to commit.", color="info"), build_new_row_form(schema)
+        identity = connection_identity(http_path, host, token)
+        with borrow_connection(http_path, host, token) as conn:
+            metadata = get_table_metadata(table_name, conn, identity)
+            if not metadata['columns']:
+                return dbc.Alert(f"Table {table_name} was not found", color="warning")
+            # Key columns picked for the loaded table, else the primary key
+            keys = [k for k in (key_columns or []) if k in {c['name'] for c in metadata['columns']}]
+            report = import_file(
+                conn, table_name, path, upload['format'], metadata['columns'], mode,
+                keys or metadata['key_columns'],
+                progress=lambda rows, total: set_progress((rows, max(total, 1), f"{rows:,} / {total:,} rows")),
+            )
+    except ImportFailed as e:
+        return dbc.Alert(str(e), color="warning")
     except Exception as e:
-        return dash.no_update, dbc.Alert(f"Error staging row: {str(e)}", color="danger"), dash.no_update
+        return dbc.Alert(f"Error importing {upload.get('filename')}: {str(e)}", color="danger")
+    finally:
+        discard_upload(upload.get('upload_id'), upload.get('format'))
+    if report['rows_written']:
+        snapshot_cache.invalidate_table(identity, table_name)
+    message = f"{upload.get('filename')}: {describe_import(report)}"
+    if not report['rows_rejected']:
+        return dbc.Alert(message, color="success")
+    return html.Div([dbc.Alert(message, color="warning"), import_errors_table(report)])
+
+@callback(
+    Output("export-area", "className"),
+    Input("loaded-table-store", "data"),
+)
+def toggle_export_area(loaded):
+    return "mt-3" if loaded else "mt-3 d-none"
+
+@callback(
+    [Output("export-url", "data"),
+     Output("status-area-edit", "children", allow_duplicate=True)],
+    Input("export-button", "n_clicks"),
+    [State("export-format", "value"),
+     State("export-gzip", "value"),
+     State("export-view", "value"),
+     State("editing-table", "sort_by"),
+     State("editing-table", "filter_query"),
+     State("loaded-table-store", "data"),
+     State("app-config", "data")],
+    prevent_initial_call=True
+)
+def export_table_data(n_clicks, fmt, compress, view_only, sort_by, filter_query, loaded, store):
+    # Only builds the query; the rows stream from the export route (utils/export.py)
+    if not loaded:
+        return dash.no_update, dash.no_update
+    http_path = (store or {}).get('http_path') if store else None
+    host = (store or {}).get('host') if store else None
+    token = (store or {}).get('token') if store else None
+    table_name = loaded['table']
+    try:
+        with borrow_connection(http_path, host, token) as conn:
+            predicate = load_predicate(table_name, conn, connection_identity(http_path, host, token),
+                                       loaded.get('filters'))
+        query, params = build_select_query(
+            table_name, loaded.get('projection'), predicate,
+            filter_query if view_only else None, loaded.get('columns'), sort_by if view_only else None,
+        )
+        path = create_export(http_path, host, token, table_name, query, params, fmt, compress)
+    except Exception as e:
+        return dash.no_update, dbc.Alert(f"Error starting export: {str(e)}", color="danger")
+    return dash.get_relative_path(path), dbc.Alert(
+        f"Exporting {table_name} as {fmt}{' (gzip)' if compress else ''}; the download starts shortly.",
+        color="info")
+
+clientside_callback(
+    ClientsideFunction(namespace="tableEdit", function_name="startDownload"),
+    Output("export-started", "data"),
+    Input("export-url", "data"),
+    prevent_initial_call=True
+)
 
 # Make layout available at module level
 __all__ = ['layout']
@@ -0,0 +1,86 @@
+# tests/test_arrow_query.py
+# Sort, filter and search over a cached snapshot give the same page slices as
+# the equivalent pandas operations.
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+
+from utils.arrow_query import SnapshotIndex
+
+CITIES = ["Oslo", "Lima", "Pune", "Kyiv", None]
+PAGE = 7
+
+
+@pytest.fixture(scope="module")
+def frame():
+    n = 120
+    return pd.DataFrame({
+        "id": range(n),
+        # Distinct scores, so descending order is well defined; every 11th is NULL
+        "score": [None if i % 11 == 0 else float((i * 37) % 211) / 2 for i in range(n)],
+        "city": [CITIES[i % len(CITIES)] for i in range(n)],
+        "name": [f"user {i:03d}" for i in range(n)],
+    })
+
+
+@pytest.fixture(scope="module")
+def index(frame):
+    return SnapshotIndex(pa.Table.from_pandas(frame, preserve_index=False))
+
+
+def pages(positions):
+    return [list(positions[start:start + PAGE]) for start in range(0, len(positions), PAGE)]
+
+
+def expected_pages(selected):
+    return pages(selected["id"].tolist())
+
+
+def test_no_sort_or_filter_keeps_load_order(index, frame):
+    assert pages(index.query()) == expected_pages(frame)
+
+
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_sort_puts_nulls_last(index, frame, direction):
+    positions = index.query(sort_by=[{"column_id": "score", "direction": direction}])
+    expected = frame.sort_values("score", ascending=direction == "asc", na_position="last", kind="stable")
+    assert pages(positions) == expected_pages(expected)
+
+
+def test_sort_on_two_columns(index, frame):
+    positions = index.query(sort_by=[{"column_id": "city", "direction": "asc"},
+                                     {"column_id": "id", "direction": "desc"}])
+    expected = frame.sort_values(["city", "id"], ascending=[True, False], na_position="last", kind="stable")
+    assert pages(positions) == expected_pages(expected)
+
+
+@pytest.mark.parametrize("filter_query, select", [
+    ("{score} gt 50", lambda f: f["score"] > 50),
+    ("{score} le 20.5", lambda f: f["score"] <= 20.5),
+    ("{city} eq Lima", lambda f: f["city"] == "Lima"),
+    ("{city} ne Lima", lambda f: f["city"].notna() & (f["city"] != "Lima")),
+    ("{name} contains USER 01", lambda f: f["name"].str.contains("user 01")),
+    ("{city} contains o && {score} lt 40", lambda f: f["city"].str.contains("o", case=False, na=False)
+                                                     & (f["score"] < 40)),
+    ("{missing} eq 1", lambda f: f["id"] >= 0),
+])
+def test_filter(index, frame, filter_query, select):
+    positions = index.query(sort_by=[{"column_id": "score", "direction": "desc"}], filter_query=filter_query)
+    expected = frame[select(frame).fillna(False).astype(bool)]
+    expected = expected.sort_values("score", ascending=False, na_position="last", kind="stable")
+    assert pages(positions) == expected_pages(expected)
+
+
+def test_search_matches_any_column(index, frame):
+    positions = index.query(search="  PUNE ")
+    expected = frame[frame["city"].eq("Pune").fillna(False).astype(bool)]
+    assert pages(positions) == expected_pages(expected)
+    assert list(index.query(search="user 007")) == [7]
+
+
+def test_repeated_query_is_served_from_the_result_cache(index):
+    first = index.query(filter_query="{score} gt 10")
+    hits = index.stats()["result_hits"]
+    assert index.query(filter_query="{score} gt 10") is first
+    assert index.stats()["result_hits"] == hits + 1
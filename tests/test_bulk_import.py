@@ -0,0 +1,79 @@
+# tests/test_bulk_import.py
+# Import validation: file columns are matched to the table, and each rejected
+# value is reported with its 1-based data row in the file.
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from utils.bulk_import import ImportFailed, match_columns, validate_batch
+from utils.encoding import compile_plan
+
+SCHEMA = [
+    {"name": "id", "type": "bigint", "nullable": False},
+    {"name": "qty", "type": "int"},
+    {"name": "price", "type": "decimal(10,2)"},
+    {"name": "day", "type": "date"},
+    {"name": "active", "type": "boolean"},
+]
+PLAN = compile_plan(SCHEMA)
+
+
+def batch(**columns):
+    # File text as the CSV reader hands it over: strings, None for empty cells
+    return pd.DataFrame({name: columns.get(name, [None] * len(columns["id"])) for name, _ in PLAN})
+
+
+def test_columns_match_ignoring_case():
+    assert match_columns(["ID", "Qty"], SCHEMA) == {"ID": "id", "Qty": "qty"}
+
+
+def test_unknown_and_missing_required_columns_stop_the_import():
+    with pytest.raises(ImportFailed, match="Columns not in the table: colour"):
+        match_columns(["id", "colour"], SCHEMA)
+    with pytest.raises(ImportFailed, match="Required columns missing from the file: id"):
+        match_columns(["qty"], SCHEMA)
+    with pytest.raises(ImportFailed, match="missing from the file: qty"):
+        match_columns(["id"], SCHEMA, key_columns=["qty"])
+
+
+def test_valid_rows_pass():
+    frame = batch(id=["1", "2"], qty=["3", "4.0"], price=["1.50", None], day=["2024-01-31", None],
+                  active=["true", "N"])
+    valid, errors = validate_batch(frame, PLAN, {"id"}, 1)
+    assert errors == []
+    assert len(valid) == 2
+
+
+def test_int_with_fraction_is_rejected():
+    frame = batch(id=["1", "2", "3"], qty=["3", "2.5", "x"])
+    valid, errors = validate_batch(frame, PLAN, {"id"}, 1)
+    assert valid["id"].tolist() == ["1"]
+    assert errors == [
+        {"row": 2, "column": "qty", "value": "2.5", "error": "not a valid int"},
+        {"row": 3, "column": "qty", "value": "x", "error": "not a valid int"},
+    ]
+
+
+@pytest.mark.filterwarnings("error")
+def test_infinite_int_is_rejected():
+    frame = batch(id=["1", "2"], qty=["inf", "-Infinity"])
+    valid, errors = validate_batch(frame, PLAN, {"id"}, 1)
+    assert valid.empty
+    assert [(e["row"], e["value"]) for e in errors] == [(1, "inf"), (2, "-Infinity")]
+
+
+def test_blank_not_null_value_is_rejected_with_its_file_row():
+    # Second batch of the file: its first data row is row 101
+    frame = batch(id=["7", None, "9"], day=["2024-02-30", None, "2024-03-01"])
+    valid, errors = validate_batch(frame, PLAN, {"id"}, 101)
+    assert valid["id"].tolist() == ["9"]
+    assert errors == [
+        {"row": 101, "column": "day", "value": "2024-02-30", "error": "not a valid date"},
+        {"row": 102, "column": "id", "value": None, "error": "value is required"},
+    ]
+
+
+def test_boolean_text_is_checked():
+    frame = batch(id=["1", "2"], active=["yes", "maybe"])
+    valid, errors = validate_batch(frame, PLAN, {"id"}, 1)
+    assert errors == [{"row": 2, "column": "active", "value": "maybe", "error": "not a valid boolean"}]
@@ -0,0 +1,154 @@
+# tests/test_connections.py
+# The SQL connection pool with stand-in connections: reuse, idle eviction, the
+# liveness probe before reusing a quiet connection, and discarding broken ones.
+import time
+
+import pytest
+
+exc = pytest.importorskip("databricks.sql.exc")
+
+from utils.connections import ConnectionPool, is_session_error
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, parameters=None):
+        if not self.conn.alive:
+            raise exc.RequestError("connection reset by peer")
+
+    def fetchall(self):
+        return [(1,)]
+
+
+class FakeConnection:
+    def __init__(self, n):
+        self.n = n
+        self.alive = True
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class Connector:
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        conn = FakeConnection(len(self.opened))
+        self.opened.append(conn)
+        return conn
+
+
+def test_connection_is_reused():
+    pool, connect = ConnectionPool(max_size=2), Connector()
+    with pool.connection("k", connect) as first:
+        pass
+    with pool.connection("k", connect) as second:
+        assert second is first
+    assert len(connect.opened) == 1
+    assert pool.metrics()["idle"] == 1
+
+
+def test_keys_do_not_share_connections():
+    pool, connect = ConnectionPool(max_size=2), Connector()
+    with pool.connection("a", connect) as a, pool.connection("b", connect) as b:
+        assert a is not b
+
+
+def test_idle_connections_are_evicted():
+    pool, connect = ConnectionPool(max_size=2, idle_timeout=0.05), Connector()
+    with pool.connection("k", connect):
+        pass
+    time.sleep(0.1)
+    with pool.connection("other", connect):
+        pass
+    assert connect.opened[0].closed
+    assert pool.metrics()["evicted"] == 1
+
+
+def test_quiet_connection_is_probed_and_replaced_when_dead():
+    pool, connect = ConnectionPool(max_size=2, probe_after=0.0), Connector()
+    with pool.connection("k", connect) as conn:
+        pass
+    conn.alive = False
+    with pool.connection("k", connect) as replacement:
+        assert replacement is not conn
+    assert conn.closed
+    assert pool.metrics()["reconnects"] == 1
+
+
+def test_quiet_connection_that_answers_is_kept():
+    pool, connect = ConnectionPool(max_size=2, probe_after=0.0), Connector()
+    with pool.connection("k", connect) as conn:
+        pass
+    with pool.connection("k", connect) as again:
+        assert again is conn
+    assert pool.metrics()["reconnects"] == 0
+
+
+def test_session_errors_discard_the_connection():
+    pool, connect = ConnectionPool(max_size=2), Connector()
+    with pytest.raises(exc.RequestError):
+        with pool.connection("k", connect):
+            raise exc.RequestError("connection reset by peer")
+    assert connect.opened[0].closed
+    assert pool.metrics()["discarded"] == 1
+    with pytest.raises(ValueError):
+        with pool.connection("k", connect):
+            raise ValueError("bad value")
+    assert not connect.opened[1].closed
+    assert pool.metrics()["idle"] == 1
+
+
+@pytest.mark.parametrize("error, broken", [
+    (exc.RequestError("Error during request to server"), True),
+    (exc.SessionAlreadyClosedError("Session already closed"), True),
+    (exc.MaxRetryDurationError("Retry request would exceed Retry policy max retry duration"), True),
+    (exc.InterfaceError("Cannot create cursor from closed connection"), True),
+    (ConnectionResetError("Connection reset by peer"), True),
+    (exc.ServerOperationError("[INVALID_HANDLE.SESSION_NOT_FOUND] The session was not found."), True),
+    (exc.CursorAlreadyClosedError("Cursor already closed"), False),
+    # Warehouse SQL errors keep the session, even when they mention one
+    (exc.ServerOperationError("[TABLE_OR_VIEW_NOT_FOUND] The table `connection_log` cannot be found."), False),
+    (exc.ServerOperationError("[DELTA_CONCURRENT_APPEND] Files were added by a concurrent update; "
+                              "session closed the transaction"), False),
+    (exc.OperationalError("[PARSE_SYNTAX_ERROR] Syntax error at or near 'session'"), False),
+    (ValueError("closed connection"), False),
+])
+def test_session_errors_are_matched_by_type(error, broken):
+    assert is_session_error(error) is broken
+
+
+def test_full_pool_times_out():
+    pool, connect = ConnectionPool(max_size=1, acquire_timeout=0.05), Connector()
+    with pool.connection("k", connect):
+        with pytest.raises(TimeoutError):
+            with pool.connection("k", connect):
+                pass
+    assert pool.metrics()["in_use"] == 0
+
+
+def test_reset_after_fork_forgets_inherited_connections():
+    pool, connect = ConnectionPool(max_size=1), Connector()
+    with pool.connection("k", connect):
+        pass
+    # Checked out in the master when the worker was forked
+    inherited = pool.connection("k", connect).__enter__()
+    pool.reset_after_fork()
+    assert pool.metrics()["in_use"] == 0 and pool.metrics()["idle"] == 0
+    with pool.connection("k", connect) as fresh:
+        assert fresh is not inherited
+    # The master's socket is left alone
+    assert not inherited.closed
@@ -0,0 +1,91 @@
+# tests/test_edit_buffer.py
+# A save writes what diff() / current_rows() saw; commit() must not mark edits
+# that arrived while the write ran as saved.
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from utils.edit_buffer import EditBuffer, key_row_id
+from utils.table_diff import ROW_ID
+
+
+def native_buffer():
+    table = pa.table({"id": [1, 2, 3], "name": ["a", "b", "c"]})
+    return EditBuffer("main.t", "me", ["id", "name"], None, ["id"], table=table)
+
+
+def server_buffer():
+    buffer = EditBuffer("main.t", "me", ["id", "name"], None, ["id"], server_side=True)
+    buffer.remember_page([{"id": 1, "name": "a"}, {"id": 2, "name": "b"}])
+    return buffer
+
+
+def test_commit_without_late_edits_clears_pending():
+    buffer = native_buffer()
+    buffer.apply_deltas([{"seq": 1, "id": 0, "column": "name", "value": "x"},
+                         {"seq": 2, "id": 2, "deleted": True}])
+    buffer.diff(["id"])
+    buffer.commit()
+    assert buffer.pending_count() == 0
+    assert buffer.original_row(0) == {"id": 1, "name": "x"}
+    assert buffer.original_row(2) is None
+
+
+def test_edit_of_saved_cell_after_diff_stays_pending():
+    buffer = native_buffer()
+    buffer.apply_deltas([{"seq": 1, "id": 0, "column": "name", "value": "x"}])
+    buffer.diff(["id"])
+    buffer.apply_deltas([{"seq": 2, "id": 0, "column": "name", "value": "y"}])
+    buffer.commit()
+    assert buffer.original_row(0) == {"id": 1, "name": "x"}
+    assert buffer.diff(["id"])["updated"] == [{"id": 1, "name": "y", ROW_ID: 0}]
+
+
+def test_edits_to_other_rows_after_diff_stay_pending():
+    buffer = native_buffer()
+    buffer.apply_deltas([{"seq": 1, "id": 0, "column": "name", "value": "x"}])
+    buffer.diff(["id"])
+    buffer.apply_deltas([{"seq": 2, "id": 1, "column": "name", "value": "z"},
+                         {"seq": 3, "id": 2, "deleted": True}])
+    buffer.insert_row({"id": 4, "name": "new"})
+    buffer.commit()
+    diff = buffer.diff(["id"])
+    assert diff["updated"] == [{"id": 2, "name": "z", ROW_ID: 1}]
+    assert [row["id"] for row in diff["deleted"]] == [3]
+    assert [row["id"] for row in diff["inserted"]] == [4]
+
+
+def test_inserted_row_changed_after_diff():
+    buffer = native_buffer()
+    kept = buffer.insert_row({"id": 4, "name": "new"})[ROW_ID]
+    gone = buffer.insert_row({"id": 6, "name": "gone"})[ROW_ID]
+    buffer.diff(["id"])
+    buffer.apply_deltas([{"seq": 1, "id": kept, "column": "name", "value": "renamed"},
+                         {"seq": 2, "id": gone, "deleted": True}])
+    buffer.commit()
+    diff = buffer.diff(["id"])
+    assert diff["inserted"] == []
+    assert diff["updated"] == [{"id": 4, "name": "renamed", ROW_ID: kept}]
+    assert [row["id"] for row in diff["deleted"]] == [6]
+
+
+def test_current_rows_captures_for_keyless_saves():
+    buffer = native_buffer()
+    buffer.apply_deltas([{"seq": 1, "id": 1, "column": "name", "value": "x"}])
+    rows = buffer.current_rows()
+    buffer.apply_deltas([{"seq": 2, "id": 1, "column": "name", "value": "y"}])
+    buffer.commit()
+    assert {"id": 2, "name": "x"} in rows
+    assert buffer.pending_count() == 1
+    assert {"id": 2, "name": "y"} in buffer.current_rows()
+
+
+def test_server_side_late_edit_keeps_saved_original():
+    buffer = server_buffer()
+    rid = key_row_id({"id": 1}, ["id"])
+    buffer.apply_deltas([{"seq": 1, "id": rid, "column": "name", "value": "x"}])
+    buffer.diff(["id"])
+    buffer.apply_deltas([{"seq": 2, "id": rid, "column": "name", "value": "y"}])
+    buffer.commit()
+    assert buffer.original_row(rid) == {"id": 1, "name": "x"}
+    assert buffer.diff(["id"])["updated"] == [{"id": 1, "name": "y", ROW_ID: rid}]
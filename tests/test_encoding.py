@@ -0,0 +1,85 @@
+# tests/test_encoding.py
+# Typed parameters and SQL literals from grid text, under whatever pandas is
+# installed (pandas 3: string dtype, read-only to_numpy() views, no
+# Series.dt.to_pydatetime()).
+import datetime
+from decimal import Decimal
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from utils.encoding import coerce_column, encode_column, parameter_column
+
+pytestmark = pytest.mark.filterwarnings("error")
+
+
+def text(*values):
+    # Grid text as pandas infers it (str dtype under pandas 3)
+    return pd.Series(list(values))
+
+
+def test_double():
+    s = text("1.5", "inf", "", None)
+    assert parameter_column(s, "double") == [1.5, None, None, None]
+    assert encode_column(s, "double").tolist() == ["1.5", "NULL", "NULL", "NULL"]
+
+
+def test_decimal_keeps_digits():
+    s = text("12345678901234567.89", " 1.50 ", None)
+    assert parameter_column(s, "decimal") == [Decimal("12345678901234567.89"), Decimal("1.50"), None]
+    assert encode_column(s, "decimal").tolist() == ["12345678901234567.89", "1.50", "NULL"]
+
+
+def test_int():
+    s = text("3", "4.0", None)
+    assert parameter_column(s, "int") == [3, 4, None]
+    assert encode_column(s, "int").tolist() == ["3", "4", "NULL"]
+
+
+def test_int_with_non_finite_values():
+    s = text("3", "inf", "-inf", "nan", None)
+    assert parameter_column(s, "int") == [3, None, None, None, None]
+    assert encode_column(s, "int").tolist() == ["3", "NULL", "NULL", "NULL", "NULL"]
+    # A fraction keeps the column as double; non-finite values are still NULL
+    assert encode_column(text("1.5", "inf"), "int").tolist() == ["1.5", "NULL"]
+
+
+def test_boolean():
+    s = text("true", "No", "", " ", None)
+    assert coerce_column(s, "boolean").tolist() == [True, False, pd.NA, pd.NA, pd.NA]
+    assert parameter_column(s, "boolean") == [True, False, None, None, None]
+    assert encode_column(s, "boolean").tolist() == ["TRUE", "FALSE", "NULL", "NULL", "NULL"]
+    assert parameter_column(pd.Series([True, None], dtype="boolean"), "boolean") == [True, None]
+    assert encode_column(pd.Series([True, None], dtype="boolean"), "boolean").tolist() == ["TRUE", "NULL"]
+
+
+def test_blank_date_is_null():
+    s = text("2024-01-02", " ", "", None)
+    assert encode_column(s, "date").tolist() == ["'2024-01-02'", "NULL", "NULL", "NULL"]
+
+
+def test_date():
+    s = text("2024-01-02", "2024-03-04 00:00:00", " ", None)
+    assert parameter_column(s, "date") == [datetime.date(2024, 1, 2), datetime.date(2024, 3, 4), None, None]
+
+
+def test_timestamp():
+    s = text("2024-01-02 03:04:05", "2024-01-02T03:04:05.250", "", None)
+    assert parameter_column(s, "timestamp") == [
+        datetime.datetime(2024, 1, 2, 3, 4, 5),
+        datetime.datetime(2024, 1, 2, 3, 4, 5, 250000),
+        None,
+        None,
+    ]
+    assert encode_column(s, "timestamp").tolist() == ["'2024-01-02 03:04:05'", "'2024-01-02T03:04:05.250'",
+                                                      "NULL", "NULL"]
+
+
+def test_invalid_timestamp_names_column():
+    with pytest.raises(ValueError, match="column ts"):
+        parameter_column(text("not a time"), "timestamp", "ts")
+
+
+def test_string_quotes_and_empty_text():
+    assert encode_column(text("it's", "", None), "string").tolist() == ["'it''s'", "''", "NULL"]
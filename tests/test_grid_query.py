@@ -0,0 +1,68 @@
+# tests/test_grid_query.py
+# Grid filter and sort state to SQL: values only ever travel as parameters and
+# column names only as quoted identifiers of known columns.
+from utils.grid_query import build_count_query, build_page_query, build_predicate, build_where, split_filter_part
+
+
+def test_split_filter_part():
+    assert split_filter_part("{price} ge 5") == ("price", "ge", 5)
+    assert split_filter_part("{price} < 2.5") == ("price", "lt", 2.5)
+    assert split_filter_part('{name} contains "a b"') == ("name", "contains", "a b")
+    assert split_filter_part("{name} eq") == (None, None, None)
+
+
+def test_unknown_columns_are_dropped():
+    where, params = build_where("{id} eq 1 && {id; DROP TABLE t} eq 2 && {other} eq 3", ["id"])
+    assert where == " WHERE `id` = :f0"
+    assert params == {"f0": 1}
+    assert build_where("{other} eq 3", ["id"]) == ("", {})
+
+
+def test_values_only_travel_as_parameters():
+    where, params = build_where("{name} eq \"x' OR '1'='1\" && {name} contains 'O\\'Brien' "
+                                "&& {day} datestartswith 2024-01", ["name", "day"])
+    assert where == (" WHERE `name` = :f0 AND contains(lower(CAST(`name` AS STRING)), lower(:f1))"
+                     " AND CAST(`day` AS STRING) LIKE :f2")
+    assert params == {"f0": "x' OR '1'='1", "f1": "O'Brien", "f2": "2024-01%"}
+    assert "'" not in where
+
+
+def test_backticks_in_identifiers_are_escaped():
+    query, params = build_page_query("t", 2, 10, [{"column_id": "a`b", "direction": "desc"}],
+                                     "{a`b} eq x", ["a`b"])
+    assert query == "SELECT * FROM t WHERE `a``b` = :f0 ORDER BY `a``b` DESC LIMIT 10 OFFSET 20"
+    assert params == {"f0": "x"}
+
+
+def test_page_and_count_share_the_filter():
+    query, params = build_count_query("t", "{id} gt 3", ["id"])
+    assert query == "SELECT COUNT(*) FROM t WHERE `id` > :f0"
+    assert params == {"f0": 3}
+    assert build_page_query("t", None, None)[0] == "SELECT * FROM t LIMIT 10 OFFSET 0"
+
+
+SCHEMA = [{"name": "id", "type": "int"}, {"name": "region", "type": "string"}]
+
+
+def test_load_predicate_is_typed_and_drops_unknown_columns():
+    predicate = build_predicate([
+        {"column": "region", "op": "in", "value": "eu, us"},
+        {"column": "id", "op": ">", "value": "5"},
+        {"column": "id; DROP TABLE t", "op": "=", "value": "1"},
+        {"column": "id", "op": "LIKE", "value": "1"},
+        {"column": "id", "op": "=", "value": ""},
+    ], SCHEMA)
+    assert predicate == ("`region` IN (:w0, :w1) AND `id` > :w2 AND `id` IS NULL",
+                         {"w0": "eu", "w1": "us", "w2": 5})
+
+
+def test_predicate_and_grid_filter_parameters_do_not_collide():
+    predicate = build_predicate([{"column": "id", "op": ">", "value": "5"}], SCHEMA)
+    query, params = build_page_query("t", 0, 10, None, "{id} eq 7 && {region} contains e", ["id", "region"],
+                                     ["id"], predicate)
+    assert query == ("SELECT `id` FROM t WHERE (`id` > :w0) AND `id` = :f0 "
+                     "AND contains(lower(CAST(`region` AS STRING)), lower(:f1)) LIMIT 10 OFFSET 0")
+    assert params == {"w0": 5, "f0": 7, "f1": "e"}
+    query, params = build_count_query("t", "{id} eq 7", ["id"], predicate)
+    assert query == "SELECT COUNT(*) FROM t WHERE (`id` > :w0) AND `id` = :f0"
+    assert params == {"w0": 5, "f0": 7}
@@ -0,0 +1,44 @@
+# tests/test_metrics.py
+# Callback metrics are labelled by the @traced name, never by Dash output ids.
+import flask
+
+from utils.metrics import metrics, register_metrics_route, traced
+
+
+def make_server():
+    server = flask.Flask(__name__)
+    register_metrics_route(server)
+
+    @traced("test_save")
+    def save():
+        return "saved"
+
+    @server.route("/_dash-update-component", methods=["POST"])
+    def update_component():
+        body = flask.request.get_json()
+        return save() if body["output"].startswith("status") else "untraced"
+
+    return server
+
+
+def callback_lines(text):
+    return [line for line in text.splitlines() if line.startswith("bti_callback_seconds_count")]
+
+
+def test_callbacks_are_labelled_by_traced_name():
+    client = make_server().test_client()
+    client.post("/_dash-update-component", json={"output": "status-area-edit.children"})
+    client.post("/_dash-update-component", json={"output": "..editing-table.data...pager.children.."})
+    lines = callback_lines(client.get("/metrics").get_data(as_text=True))
+    assert any('callback="test_save"' in line for line in lines)
+    assert any('callback="other"' in line for line in lines)
+    assert not any("output=" in line or "editing-table" in line for line in lines)
+
+
+def test_background_run_does_not_need_a_request():
+    @traced("test_background")
+    def job():
+        return 1
+
+    assert job() == 1
+    assert any(trace["name"] == "test_background" for trace in metrics.recent_requests())
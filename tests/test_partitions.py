@@ -0,0 +1,48 @@
+# tests/test_partitions.py
+# Keyless saves on partitioned tables rewrite only the partitions that staged
+# edits touch, and never the whole table when none are touched.
+import datetime
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from utils.partitions import build_partition_predicate, combine_predicates, partition_slice
+
+SCHEMA = [{"name": "day", "type": "date"}, {"name": "region", "type": "string"}, {"name": "qty", "type": "int"}]
+ROWS = [
+    {"day": "2024-01-01", "region": "eu", "qty": 1},
+    {"day": "2024-01-02", "region": "eu", "qty": 2},
+    {"day": "2024-01-02", "region": "us", "qty": 3},
+    {"day": None, "region": "us", "qty": 4},
+]
+
+
+def test_nothing_touched_gives_no_predicate():
+    assert partition_slice(ROWS, [], ["day"], SCHEMA) == (None, [])
+
+
+def test_old_and_new_values_of_an_edit_are_rewritten():
+    # A row moved from 2024-01-01 to 2024-01-02
+    touched = [ROWS[0], {**ROWS[0], "day": "2024-01-02"}]
+    predicate, rows = partition_slice(ROWS, touched, ["day"], SCHEMA)
+    assert predicate == ("`day` IN (:q0, :q1)", {"q0": datetime.date(2024, 1, 1), "q1": datetime.date(2024, 1, 2)})
+    assert rows == ROWS[:3]
+
+
+def test_null_partition():
+    predicate, rows = partition_slice(ROWS, [ROWS[3]], ["day"], SCHEMA)
+    assert predicate == ("`day` IS NULL", {})
+    assert rows == [ROWS[3]]
+
+
+def test_several_partition_columns():
+    predicate, rows = partition_slice(ROWS, [ROWS[2]], ["day", "region"], SCHEMA)
+    assert predicate == ("(`day` = :q0 AND `region` = :q1)", {"q0": datetime.date(2024, 1, 2), "q1": "us"})
+    assert rows == [ROWS[2]]
+
+
+def test_partitions_narrow_the_load_filter():
+    partitions = build_partition_predicate(["region"], [("eu",)])
+    assert combine_predicates(("`qty` > :w0", {"w0": 1}), partitions) == (
+        "(`qty` > :w0) AND (`region` IN (:q0))", {"w0": 1, "q0": "eu"})
@@ -0,0 +1,83 @@
+# tests/test_single_flight.py
+# Concurrent identical queries: one caller runs it, the others wait for its
+# result, or its error.
+import threading
+import time
+
+import pytest
+
+from utils.background import QueryCancelled
+from utils.single_flight import SingleFlight
+
+
+def run_concurrently(n, fn):
+    # fn() in n threads; returns each thread's result or exception
+    outcomes = [None] * n
+    start = threading.Barrier(n)
+
+    def call(i):
+        start.wait()
+        try:
+            outcomes[i] = fn()
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return outcomes
+
+
+def slow(result, calls, error=None):
+    def query():
+        calls.append(1)
+        time.sleep(0.2)
+        if error is not None:
+            raise error
+        return result
+    return query
+
+
+def test_concurrent_callers_share_one_call():
+    flight, calls = SingleFlight(), []
+    outcomes = run_concurrently(4, lambda: flight.do("k", slow("rows", calls)))
+    assert outcomes == ["rows"] * 4
+    assert len(calls) == 1
+    assert flight.stats()["shared"] == 3
+    assert flight.in_flight() == 0
+
+
+def test_leader_failure_reaches_every_waiter():
+    flight, calls = SingleFlight(), []
+    error = RuntimeError("warehouse stopped")
+    outcomes = run_concurrently(3, lambda: flight.do("k", slow(None, calls, error)))
+    assert outcomes == [error] * 3
+    assert len(calls) == 1
+    # Nothing is remembered: the next caller runs the query again
+    assert flight.do("k", lambda: "retried") == "retried"
+
+
+def test_cancelled_leader_makes_waiters_run_it_themselves():
+    flight, calls = SingleFlight(), []
+    leader_started = threading.Event()
+
+    def cancelled():
+        leader_started.set()
+        time.sleep(0.2)
+        raise QueryCancelled("Query cancelled")
+
+    leader = threading.Thread(target=lambda: pytest.raises(QueryCancelled, flight.do, "k", cancelled))
+    leader.start()
+    leader_started.wait(5)
+    assert flight.do("k", slow("rows", calls)) == "rows"
+    leader.join(5)
+    assert flight.stats()["retries"] == 1
+
+
+def test_different_keys_run_separately():
+    flight, calls = SingleFlight(), []
+    outcomes = run_concurrently(2, lambda: flight.do(threading.get_ident(), slow("rows", calls)))
+    assert outcomes == ["rows", "rows"]
+    assert len(calls) == 2
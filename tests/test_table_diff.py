@@ -0,0 +1,46 @@
+# tests/test_table_diff.py
+# Grid edits to MERGE source rows. Keys match null-safely: a NULL key column
+# is a value like any other, on the grid and in the MERGE condition.
+from utils.table_diff import ROW_ID, diff_records, merge_statement
+
+COLUMNS = ["id", "part", "value"]
+KEYS = ["id", "part"]
+
+
+def row(rid, id, part, value):
+    return {"id": id, "part": part, "value": value, ROW_ID: rid}
+
+
+def test_edit_of_row_with_null_key_is_an_update():
+    snapshot = [row(0, 1, None, "a"), row(1, 2, "x", "b")]
+    current = [row(0, 1, None, "z"), row(1, 2, "x", "b")]
+    assert diff_records(snapshot, current, COLUMNS, KEYS) == {
+        "inserted": [], "updated": [row(0, 1, None, "z")], "deleted": []}
+
+
+def test_key_set_from_null_is_delete_plus_insert():
+    snapshot = [row(0, 1, None, "a")]
+    current = [row(0, 1, "x", "a")]
+    assert diff_records(snapshot, current, COLUMNS, KEYS) == {
+        "inserted": [row(0, 1, "x", "a")], "updated": [], "deleted": [row(0, 1, None, "a")]}
+
+
+def test_null_key_deleted_and_reinserted_is_an_update():
+    # MERGE rejects two source rows matching one target row
+    snapshot = [row(0, 1, None, "a")]
+    current = [{"id": 1, "part": None, "value": "new"}]
+    assert diff_records(snapshot, current, COLUMNS, KEYS) == {
+        "inserted": [], "updated": [{"id": 1, "part": None, "value": "new"}], "deleted": []}
+
+
+def test_unchanged_values_compare_as_text():
+    # Edited cells come back from the grid as strings
+    snapshot = [row(0, 1, None, 5)]
+    assert diff_records(snapshot, [row(0, "1", None, "5")], COLUMNS, KEYS)["updated"] == []
+
+
+def test_merge_matches_keys_null_safely():
+    statement = merge_statement("t", "(SELECT * FROM src)", COLUMNS, KEYS)
+    assert " ON t.`id` <=> s.`id` AND t.`part` <=> s.`part` " in statement
+    assert " = s.`id`" not in statement
+    assert "UPDATE SET t.`value` = s.`value` " in statement
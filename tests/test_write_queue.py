@@ -0,0 +1,103 @@
+# tests/test_write_queue.py
+# MERGE saves to one table that arrive together are written as one commit.
+import threading
+import time
+
+from utils.write_queue import WriteQueue
+
+
+def make_queue(coalesce_seconds=0.2, max_batch=32):
+    return WriteQueue(coalesce_seconds=coalesce_seconds, max_retries=2, retry_base_seconds=0.01,
+                      max_batch=max_batch)
+
+
+def run_together(queue, requests):
+    # requests: [dict(table_key, write, ...)]; runs each in its own thread
+    results, errors = [None] * len(requests), [None] * len(requests)
+
+    def call(i):
+        try:
+            results[i] = queue.run(**requests[i])
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join(10)
+    return results, errors
+
+
+class Recorder:
+    def __init__(self, fail=None):
+        self.calls = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def __call__(self, payloads):
+        with self.lock:
+            self.calls.append(list(payloads))
+        if self.fail is not None:
+            self.fail(payloads)
+        return {"rows": len(payloads)}
+
+
+def test_merge_saves_coalesce_into_one_commit():
+    queue, write = make_queue(), Recorder()
+    requests = [dict(table_key="t", write=write, payload=i, group="merge", keys=[i]) for i in range(4)]
+    results, errors = run_together(queue, requests)
+    assert errors == [None] * 4
+    assert write.calls == [[0, 1, 2, 3]]
+    assert all(r["sessions"] == 4 and r["retries"] == 0 for r in results)
+    stats = queue.stats()
+    assert stats["commits"] == 1 and stats["coalesced"] == 3 and stats["queued"] == 0
+
+
+def test_overlapping_keys_and_other_groups_are_not_batched():
+    queue, write = make_queue(), Recorder()
+    requests = [
+        dict(table_key="t", write=write, payload="a", group="merge", keys=[1]),
+        dict(table_key="t", write=write, payload="b", group="merge", keys=[1]),
+        dict(table_key="t", write=write, payload="c", group="other", keys=[2]),
+    ]
+    run_together(queue, requests)
+    assert write.calls == [["a"], ["b"], ["c"]]
+
+
+def test_ungrouped_writes_run_alone():
+    queue, write = make_queue(), Recorder()
+    requests = [dict(table_key="t", write=write, payload=i) for i in range(3)]
+    results, _ = run_together(queue, requests)
+    assert sorted(call[0] for call in write.calls) == [0, 1, 2]
+    assert all(len(call) == 1 for call in write.calls)
+    assert all(r["sessions"] == 1 for r in results)
+
+
+def test_failed_batch_is_split_per_session():
+    def fail(payloads):
+        if "bad" in payloads:
+            raise ValueError("bad row")
+
+    queue, write = make_queue(), Recorder(fail)
+    requests = [dict(table_key="t", write=write, payload=p, group="merge", keys=[p]) for p in ("ok", "bad")]
+    results, errors = run_together(queue, requests)
+    assert write.calls == [["ok", "bad"], ["ok"], ["bad"]]
+    assert results[0]["sessions"] == 1
+    assert isinstance(errors[1], ValueError)
+    assert queue.stats()["split"] == 1
+
+
+def test_conflicts_are_retried():
+    attempts = []
+
+    def fail(payloads):
+        attempts.append(payloads)
+        if len(attempts) == 1:
+            raise RuntimeError("[DELTA_CONCURRENT_APPEND] files were added")
+
+    queue, write = make_queue(coalesce_seconds=0), Recorder(fail)
+    result = queue.run("t", write, payload=1, group="merge", keys=[1])
+    assert result["retries"] == 1
+    assert len(write.calls) == 2
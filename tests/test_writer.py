@@ -0,0 +1,28 @@
+# tests/test_writer.py
+# Batch planning: every batch stays under the parameter and byte limits.
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from utils.writer import PLACEHOLDER_BYTES, plan_batches
+
+pytestmark = pytest.mark.filterwarnings("error")
+
+
+def test_batches_respect_the_parameter_limit():
+    frame = pd.DataFrame({"a": range(10), "b": range(10)})
+    assert plan_batches(frame, max_params=6, max_bytes=10_000) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+
+
+def test_batches_respect_the_byte_limit():
+    frame = pd.DataFrame({"a": ["x" * 90] * 4})
+    assert plan_batches(frame, max_params=1000, max_bytes=2 * (90 + PLACEHOLDER_BYTES)) == [(0, 2), (2, 4)]
+
+
+def test_missing_values_count_as_placeholders_only():
+    frame = pd.DataFrame({"a": ["x" * 90, None, None, "x" * 90]})
+    assert plan_batches(frame, max_params=1000, max_bytes=90 + 3 * PLACEHOLDER_BYTES) == [(0, 3), (3, 4)]
+
+
+def test_empty_frame_has_no_batches():
+    assert plan_batches(pd.DataFrame({"a": []})) == []
@@ -0,0 +1,2 @@
+# utils/__init__.py
+# Shared helpers for the table pages (SQL building, connections, caches).
@@ -0,0 +1,192 @@
+# utils/arrow_query.py
+# Sort, filter and global search over a cached Arrow snapshot with pyarrow
+# compute, so the grid can page a loaded table from the server without a
+# warehouse round trip. Sort indexes are built per column (ahead of time by
+# warm()), string columns with few distinct values get a dictionary index the
+# first time they are matched, and recent query results are kept per index.
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+
+from utils.grid_query import split_filter_part
+from utils.startup import lazy_module
+
+np = lazy_module("numpy")
+pa = lazy_module("pyarrow")
+pc = lazy_module("pyarrow.compute")
+
+# A string column is dictionary-indexed when it has at most this many distinct values
+DICTIONARY_MAX_VALUES = int(os.getenv("INDEX_DICTIONARY_MAX_VALUES", "10000"))
+RESULT_CACHE_SIZE = 16
+
+# Filter operator -> pyarrow.compute function, looked up when a filter runs so
+# importing this module does not load pyarrow
+COMPARISONS = {
+    "eq": "equal", "ne": "not_equal", "lt": "less",
+    "le": "less_equal", "gt": "greater", "ge": "greater_equal",
+}
+
+
+def _is_string(dtype) -> bool:
+    return pa.types.is_string(dtype) or pa.types.is_large_string(dtype)
+
+
+def _to_mask(result) -> np.ndarray:
+    # Boolean compute result (Array or ChunkedArray) as a numpy mask, nulls False
+    return np.asarray(pc.fill_null(result, False).to_numpy(zero_copy_only=False), dtype=bool)
+
+
+class SnapshotIndex:
+    def __init__(self, table: pa.Table):
+        self.table = table
+        self.num_rows = table.num_rows
+        self._lock = threading.Lock()
+        self._sort = {}           # column -> ascending positions, nulls last
+        self._dictionaries = {}   # column -> DictionaryArray, or None when not low-cardinality
+        self._results = OrderedDict()
+        self._stats = {"queries": 0, "result_hits": 0, "sort_builds": 0, "dictionary_builds": 0}
+
+    def sort_positions(self, column: str, descending: bool = False) -> np.ndarray:
+        with self._lock:
+            ascending = self._sort.get(column)
+        if ascending is None:
+            ascending = pc.sort_indices(self.table, sort_keys=[(column, "ascending")],
+                                        null_placement="at_end").to_numpy()
+            with self._lock:
+                self._sort[column] = ascending
+                self._stats["sort_builds"] += 1
+        if not descending:
+            return ascending
+        # Descending reuses the ascending index; nulls stay last
+        valid = self.num_rows - self.table.column(column).null_count
+        return np.concatenate([ascending[:valid][::-1], ascending[valid:]])
+
+    def warm(self):
+        # Prebuilds every column's sort index; columns that cannot be sorted are skipped
+        for column in self.table.column_names:
+            try:
+                self.sort_positions(column)
+            except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+                continue
+
+    def dictionary(self, column: str):
+        with self._lock:
+            if column in self._dictionaries:
+                return self._dictionaries[column]
+        encoded = None
+        if _is_string(self.table.schema.field(column).type):
+            candidate = pc.dictionary_encode(self.table.column(column).combine_chunks())
+            if len(candidate.dictionary) <= DICTIONARY_MAX_VALUES:
+                encoded = candidate
+        with self._lock:
+            self._dictionaries[column] = encoded
+            self._stats["dictionary_builds"] += 1
+        return encoded
+
+    def _string_match(self, column: str, match) -> np.ndarray:
+        # match(string array) -> boolean array; on a dictionary column it runs
+        # once per distinct value and is mapped back through the indices
+        encoded = self.dictionary(column)
+        if encoded is not None:
+            hits = pc.fill_null(match(encoded.dictionary), False)
+            return _to_mask(pc.take(hits, encoded.indices))
+        values = self.table.column(column)
+        if not _is_string(values.type):
+            values = pc.cast(values, pa.string())
+        return _to_mask(match(values))
+
+    def _condition(self, column: str, operator: str, value) -> np.ndarray:
+        if operator == "contains":
+            text = str(value)
+            return self._string_match(column, lambda arr: pc.match_substring(arr, text, ignore_case=True))
+        if operator == "datestartswith":
+            text = str(value)
+            return self._string_match(column, lambda arr: pc.starts_with(arr, text))
+        compare = getattr(pc, COMPARISONS[operator])
+        values = self.table.column(column)
+        if _is_string(values.type):
+            text = str(value)
+            return self._string_match(column, lambda arr: compare(arr, text))
+        try:
+            return _to_mask(compare(values, pa.scalar(value).cast(values.type)))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError, TypeError):
+            # Value does not convert to the column type: compare as text
+            text = str(value)
+            return self._string_match(column, lambda arr: compare(arr, text))
+
+    def filter_mask(self, filter_query: str):
+        # DataTable filter expression as a row mask, None when nothing applies
+        mask = None
+        for part in (filter_query or "").split(" && "):
+            name, operator, value = split_filter_part(part)
+            if not name or operator is None or name not in self.table.column_names:
+                continue
+            condition = self._condition(name, operator, value)
+            mask = condition if mask is None else mask & condition
+        return mask
+
+    def search_mask(self, text: str) -> np.ndarray:
+        # Case-insensitive substring match in any column
+        mask = np.zeros(self.num_rows, dtype=bool)
+        for column in self.table.column_names:
+            try:
+                mask |= self._string_match(column, lambda arr: pc.match_substring(arr, text, ignore_case=True))
+            except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+                # Nested types have no string form
+                continue
+        return mask
+
+    def _sorted(self, sort_keys) -> np.ndarray:
+        if not sort_keys:
+            return np.arange(self.num_rows)
+        if len(sort_keys) == 1:
+            column, direction = sort_keys[0]
+            return self.sort_positions(column, direction == "desc")
+        keys = [(c, "descending" if d == "desc" else "ascending") for c, d in sort_keys]
+        return pc.sort_indices(self.table, sort_keys=keys, null_placement="at_end").to_numpy()
+
+    def query(self, sort_by=None, filter_query=None, search=None) -> np.ndarray:
+        # Row positions matching filter_query and search, in sort_by order
+        sort_keys = tuple((s.get("column_id"), s.get("direction")) for s in (sort_by or [])
+                          if s.get("column_id") in self.table.column_names)
+        search = (search or "").strip()
+        key = (sort_keys, filter_query or "", search)
+        with self._lock:
+            self._stats["queries"] += 1
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                self._stats["result_hits"] += 1
+                return cached
+        positions = self._sorted(sort_keys)
+        mask = self.filter_mask(filter_query)
+        if search:
+            found = self.search_mask(search)
+            mask = found if mask is None else mask & found
+        if mask is not None:
+            positions = positions[mask[positions]]
+        with self._lock:
+            self._results[key] = positions
+            while len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return positions
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sort_indexes"] = len(self._sort)
+            stats["dictionary_indexes"] = sum(1 for d in self._dictionaries.values() if d is not None)
+        return stats
+
+
+def index_for(entry) -> SnapshotIndex:
+    # The index lives on the SnapshotEntry, so sessions sharing a snapshot share it
+    if entry.index is None:
+        entry.index = SnapshotIndex(entry.table)
+    return entry.index
+
+
+def warm_in_background(index: SnapshotIndex):
+    threading.Thread(target=index.warm, name="snapshot-index-warm", daemon=True).start()
@@ -0,0 +1,183 @@
+# utils/background.py
+# Background callback manager that runs jobs on threads of the serving process
+# instead of forked processes. Jobs share the connection pool and table caches,
+# and cancelling a job cancels its running warehouse query through the cursor
+# rather than killing the process and leaving the query running.
+import contextvars
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+
+from dash import DiskcacheManager
+
+_current_job = contextvars.ContextVar("background_job", default=None)
+_job_ids = itertools.count(1)
+
+ALIVE_PREFIX = "bti-job-alive-"
+CANCEL_PREFIX = "bti-job-cancel-"
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+class _Job:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.thread = None
+        self._cursors = set()
+        self._children = set()   # cancel_scope()s opened inside this job
+        self._lock = threading.Lock()
+
+    def add(self, cursor):
+        with self._lock:
+            self._cursors.add(cursor)
+
+    def remove(self, cursor):
+        with self._lock:
+            self._cursors.discard(cursor)
+
+    def add_child(self, child):
+        with self._lock:
+            self._children.add(child)
+        if self.cancelled.is_set():
+            child.cancel()
+
+    def remove_child(self, child):
+        with self._lock:
+            self._children.discard(child)
+
+    def cancel(self):
+        self.cancelled.set()
+        with self._lock:
+            cursors = list(self._cursors)
+            children = list(self._children)
+        for child in children:
+            child.cancel()
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except Exception:
+                pass
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise QueryCancelled("Query cancelled")
+
+
+class ThreadedDiskcacheManager(DiskcacheManager):
+    # Results and progress still go through diskcache, so any worker on the
+    # host can serve the polling requests; cancellation requests for jobs owned
+    # by another worker are relayed through the cache as well.
+    def __init__(self, cache, cache_by=None, expire=None, poll_interval: float = 0.5):
+        super().__init__(cache, cache_by=cache_by, expire=expire)
+        self.poll_interval = poll_interval
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+
+    def call_job_fn(self, key, job_fn, args, context):
+        job_id = f"{os.getpid()}-{next(_job_ids)}"
+        job = _Job(job_id)
+        with self._jobs_lock:
+            self._jobs[job_id] = job
+        self.handle.set(ALIVE_PREFIX + job_id, 1)
+
+        def run():
+            _current_job.set(job)
+            try:
+                job_fn(key, self._make_progress_key(key), args, context)
+            finally:
+                job.done.set()
+                with self._jobs_lock:
+                    self._jobs.pop(job_id, None)
+                self.handle.delete(ALIVE_PREFIX + job_id)
+                self.handle.delete(CANCEL_PREFIX + job_id)
+
+        def watch():
+            # Picks up cancel requests that arrived at another worker
+            while not job.done.wait(self.poll_interval):
+                if self.handle.get(CANCEL_PREFIX + job_id):
+                    job.cancel()
+                    return
+
+        job.thread = threading.Thread(target=run, name=f"background-{job_id}", daemon=True)
+        job.thread.start()
+        threading.Thread(target=watch, name=f"background-watch-{job_id}", daemon=True).start()
+        return job_id
+
+    def _local_job(self, job):
+        with self._jobs_lock:
+            return self._jobs.get(str(job))
+
+    def job_running(self, job):
+        if job is None:
+            return False
+        local = self._local_job(job)
+        if local is not None:
+            return local.thread is not None and local.thread.is_alive()
+        return bool(self.handle.get(ALIVE_PREFIX + str(job)))
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        local = self._local_job(job)
+        if local is not None:
+            local.cancel()
+        elif self.handle.get(ALIVE_PREFIX + str(job)):
+            self.handle.set(CANCEL_PREFIX + str(job), 1, expire=600)
+
+    def terminate_unhealthy_job(self, job):
+        # A thread cannot become a zombie; finished jobs clean up after themselves
+        local = self._local_job(job)
+        if local is not None and local.thread is not None and not local.thread.is_alive():
+            with self._jobs_lock:
+                self._jobs.pop(str(job), None)
+            return True
+        return False
+
+
+@contextmanager
+def cancellable(cursor):
+    # Registers cursor with the current background job so terminate_job can
+    # cancel its running statement; a no-op outside background callbacks
+    job = _current_job.get()
+    if job is None:
+        yield cursor
+        return
+    job.check()
+    job.add(cursor)
+    try:
+        yield cursor
+    except Exception as e:
+        if job.cancelled.is_set():
+            raise QueryCancelled("Query cancelled") from e
+        raise
+    finally:
+        job.remove(cursor)
+
+
+@contextmanager
+def cancel_scope():
+    # Group of queries that can be cancelled together, e.g. the concurrent
+    # queries of one load. Cancelling the enclosing job cancels the scope too.
+    # Work submitted to other threads must run in a copy of this context.
+    parent = _current_job.get()
+    scope = _Job(f"{parent.job_id if parent else os.getpid()}-scope-{next(_job_ids)}")
+    if parent is not None:
+        parent.add_child(scope)
+    token = _current_job.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_job.reset(token)
+        if parent is not None:
+            parent.remove_child(scope)
+
+
+def check_cancelled():
+    job = _current_job.get()
+    if job is not None:
+        job.check()
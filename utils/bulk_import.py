@@ -0,0 +1,261 @@
+# utils/bulk_import.py
+# Bulk import from uploaded CSV or Parquet files. The upload is streamed to a
+# scratch file; the import reads it back in Arrow record batches, validates each
+# batch against the table schema and writes the valid rows with write_rows or
+# merge_rows. Memory is bounded by the batch size, not by the file size.
+from __future__ import annotations
+
+import csv
+import os
+import re
+import tempfile
+import time
+import uuid
+
+import flask
+
+from utils.background import check_cancelled
+from utils.encoding import NUMERIC_KINDS, TRUE_STRINGS, blank_mask, compile_plan
+from utils.startup import lazy_module
+from utils.table_diff import OP_FIELD
+from utils.writer import write_rows, merge_rows
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+pa = lazy_module("pyarrow")
+pa_csv = lazy_module("pyarrow.csv")
+pq = lazy_module("pyarrow.parquet")
+
+IMPORT_DIR = os.getenv("IMPORT_DIR") or os.path.join(tempfile.gettempdir(), "bti_imports")
+IMPORT_MAX_MB = int(os.getenv("IMPORT_MAX_MB", "2048"))
+IMPORT_BATCH_ROWS = int(os.getenv("IMPORT_BATCH_ROWS", "50000"))
+IMPORT_CSV_BLOCK_BYTES = int(os.getenv("IMPORT_CSV_BLOCK_MB", "8")) * 1024 * 1024
+# Rejected rows listed in the report; the counts always cover the whole file
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+# Uploads that were never imported are removed after this many seconds
+UPLOAD_TTL = 3600
+
+UPLOAD_ROUTE = "/api/import/upload"
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}
+BOOLEAN_STRINGS = TRUE_STRINGS + ("false", "0", "no", "n")
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class ImportFailed(Exception):
+    pass
+
+
+def _path(upload_id: str, fmt: str) -> str:
+    return os.path.join(IMPORT_DIR, f"{upload_id}.{fmt}")
+
+
+def _sweep_uploads(now: float):
+    try:
+        names = os.listdir(IMPORT_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(IMPORT_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > UPLOAD_TTL:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+def save_upload(stream, filename: str) -> dict:
+    # Copies the uploaded file to IMPORT_DIR in chunks; returns what the import needs
+    fmt = FORMATS.get(os.path.splitext(filename or "")[1].lower())
+    if fmt is None:
+        raise ImportFailed("Only .csv and .parquet files can be imported")
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    _sweep_uploads(time.time())
+    upload_id = uuid.uuid4().hex
+    path = _path(upload_id, fmt)
+    limit = IMPORT_MAX_MB * 1024 * 1024
+    size = 0
+    with open(path, "wb") as out:
+        while True:
+            chunk = stream.read(COPY_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                out.close()
+                os.remove(path)
+                raise ImportFailed(f"The file is larger than the import limit of {IMPORT_MAX_MB} MB")
+            out.write(chunk)
+    return {"upload_id": upload_id, "filename": os.path.basename(filename), "format": fmt, "bytes": size}
+
+
+def upload_path(upload_id: str, fmt: str):
+    # None unless upload_id is one of ours and the file is still there
+    if fmt not in FORMATS.values() or not re.fullmatch(r"[0-9a-f]{32}", upload_id or ""):
+        return None
+    path = _path(upload_id, fmt)
+    return path if os.path.exists(path) else None
+
+
+def discard_upload(upload_id: str, fmt: str):
+    path = upload_path(upload_id, fmt)
+    if path is not None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def register_upload_route(server):
+    # POST multipart "file" -> {upload_id, filename, format, bytes} or {error}
+    @server.route(UPLOAD_ROUTE, methods=["POST"])
+    def upload_import_file():
+        upload = flask.request.files.get("file")
+        if upload is None:
+            return flask.jsonify(error="No file was uploaded"), 400
+        try:
+            return flask.jsonify(save_upload(upload.stream, upload.filename))
+        except ImportFailed as e:
+            return flask.jsonify(error=str(e)), 400
+
+
+def _csv_header(path: str) -> list:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+
+def _count_lines(path: str) -> int:
+    # Progress estimate only; quoted line breaks make it an overcount
+    count = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_BYTES), b""):
+            count += chunk.count(b"\n")
+    return count
+
+
+def open_batches(path: str, fmt: str):
+    # Returns (file column names, estimated row count, iterator of pa.RecordBatch).
+    # CSV values are read as text (empty cells are NULL) and typed by validate_batch.
+    if fmt == "parquet":
+        parquet = pq.ParquetFile(path)
+        return parquet.schema_arrow.names, parquet.metadata.num_rows, parquet.iter_batches(batch_size=IMPORT_BATCH_ROWS)
+    header = _csv_header(path)
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=IMPORT_CSV_BLOCK_BYTES),
+        convert_options=pa_csv.ConvertOptions(column_types={c: pa.string() for c in header},
+                                              strings_can_be_null=True, null_values=[""]),
+    )
+    return header, max(_count_lines(path) - 1, 0), iter(reader)
+
+
+def match_columns(file_columns, schema, key_columns=None) -> dict:
+    # {file column: table column}, matched case-insensitively; raises on columns
+    # the table lacks, missing NOT NULL columns and, for a merge, missing keys
+    by_lower = {c['name'].lower(): c['name'] for c in schema}
+    unknown = [c for c in file_columns if c.lower() not in by_lower]
+    if unknown:
+        raise ImportFailed(f"Columns not in the table: {', '.join(unknown)}")
+    mapping = {c: by_lower[c.lower()] for c in file_columns}
+    present = set(mapping.values())
+    missing = [c['name'] for c in schema if not c.get('nullable', True) and c['name'] not in present]
+    missing += [k for k in (key_columns or []) if k not in present and k not in missing]
+    if missing:
+        raise ImportFailed(f"Required columns missing from the file: {', '.join(missing)}")
+    return mapping
+
+
+def _invalid(s: pd.Series, kind: str, blank: np.ndarray) -> np.ndarray:
+    # Non-blank values that do not convert to kind
+    if kind in NUMERIC_KINDS:
+        num = pd.to_numeric(s.mask(blank), errors='coerce')
+        bad = num.isna().to_numpy() & ~blank
+        if kind == "int":
+            # inf is not an int either; np.mod only sees finite values, so nothing warns
+            values = num.to_numpy(dtype='float64', na_value=np.nan)
+            finite = np.isfinite(values)
+            whole = np.zeros(len(values), dtype=bool)
+            whole[finite] = np.mod(values[finite], 1) == 0
+            bad |= ~np.isnan(values) & ~whole
+        return bad
+    if kind == "boolean":
+        if pd.api.types.is_bool_dtype(s):
+            return np.zeros(len(s), dtype=bool)
+        return ~s.astype(str).str.strip().str.lower().isin(BOOLEAN_STRINGS).to_numpy() & ~blank
+    if kind in ("date", "timestamp"):
+        parsed = pd.to_datetime(s.mask(blank), errors='coerce', format='mixed')
+        return parsed.isna().to_numpy() & ~blank
+    return np.zeros(len(s), dtype=bool)
+
+
+def validate_batch(frame: pd.DataFrame, plan, required, first_row: int):
+    # Returns (valid rows, [{'row', 'column', 'value', 'error'}]); row is the
+    # 1-based data row in the file
+    rejected = np.zeros(len(frame), dtype=bool)
+    errors = []
+    for name, kind in plan:
+        s = frame[name]
+        blank = blank_mask(s)
+        bad = _invalid(s, kind, blank)
+        missing = blank if name in required else np.zeros(len(frame), dtype=bool)
+        for pos in np.flatnonzero(bad | missing):
+            errors.append({
+                "row": first_row + int(pos),
+                "column": name,
+                "value": None if missing[pos] else str(s.iat[pos]),
+                "error": "value is required" if missing[pos] else f"not a valid {kind}",
+            })
+        rejected |= bad | missing
+    errors.sort(key=lambda e: e["row"])
+    return frame[~rejected], errors
+
+
+def import_file(conn, table_name: str, path: str, fmt: str, schema, mode: str = "append", key_columns=None,
+                progress=None) -> dict:
+    # mode: "append" (INSERT INTO) or "merge" (upsert on key_columns). Each batch
+    # is its own commit, so a failed import leaves the earlier batches written.
+    # progress(rows_read, estimated_total_rows) after every batch.
+    if mode == "merge" and not key_columns:
+        raise ImportFailed("Merging needs key columns")
+    file_columns, total, batches = open_batches(path, fmt)
+    mapping = match_columns(file_columns, schema, key_columns if mode == "merge" else None)
+    columns = [c['name'] for c in schema if c['name'] in set(mapping.values())]
+    plan = compile_plan(schema, columns)
+    required = {c['name'] for c in schema if not c.get('nullable', True)}
+    if mode == "merge":
+        required |= set(key_columns)
+    report = {"rows_read": 0, "rows_written": 0, "rows_rejected": 0, "batches": 0, "errors": [],
+              "mode": mode, "atomic": False}
+    started = time.perf_counter()
+    for batch in batches:
+        check_cancelled()
+        frame = batch.to_pandas().rename(columns=mapping)[columns]
+        valid, errors = validate_batch(frame, plan, required, report["rows_read"] + 1)
+        report["rows_read"] += len(frame)
+        report["rows_rejected"] += len(frame) - len(valid)
+        report["errors"].extend(errors[:max(IMPORT_MAX_ERRORS - len(report["errors"]), 0)])
+        if len(valid):
+            valid = valid.reset_index(drop=True)
+            if mode == "merge":
+                # MERGE rejects two source rows for one key; the last one in the batch wins
+                valid = valid.drop_duplicates(subset=list(key_columns), keep="last")
+                valid.insert(0, OP_FIELD, "U")
+                type_map = {c['name']: c.get('type') for c in schema}
+                merge_rows(conn, table_name, valid, plan, key_columns, type_map)
+            else:
+                write_rows(conn, table_name, valid, plan, mode="append")
+            report["rows_written"] += len(valid)
+        report["batches"] += 1
+        if progress is not None:
+            progress(report["rows_read"], max(total, report["rows_read"]))
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def describe_import(report: dict) -> str:
+    # "12,000 rows imported in 3 batches, 4.2s; 17 rows rejected"
+    verb = "merged" if report.get("mode") == "merge" else "imported"
+    text = (f"{report['rows_written']:,} rows {verb} in {report['batches']} "
+            f"batch{'es' if report['batches'] != 1 else ''}, {report['seconds']}s")
+    if report["rows_rejected"]:
+        text += f"; {report['rows_rejected']:,} row{'s' if report['rows_rejected'] != 1 else ''} rejected"
+    return text
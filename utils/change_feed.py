@@ -0,0 +1,114 @@
+# utils/change_feed.py
+# Incremental refresh from the Delta change data feed: rows changed since the
+# loaded version are read with table_changes() and applied to the Arrow snapshot,
+# so following other editors does not rescan the table.
+from __future__ import annotations
+
+import os
+
+from utils.reader import read_query
+from utils.startup import lazy_module
+
+pa = lazy_module("pyarrow")
+
+CDF_MAX_VERSIONS = int(os.getenv("CDF_MAX_VERSIONS", "100"))
+CDF_MAX_ROWS = int(os.getenv("CDF_MAX_ROWS", "10000"))
+CDF_POLL_SECONDS = int(os.getenv("CDF_POLL_SECONDS", "30"))
+
+CHANGE_TYPE = "_change_type"
+COMMIT_VERSION = "_commit_version"
+METADATA_COLUMNS = (CHANGE_TYPE, COMMIT_VERSION, "_commit_timestamp")
+REMOVALS = ("delete", "update_preimage")
+
+
+class ChangeFeedUnavailable(Exception):
+    # Feed disabled, history vacuumed, schema changed or too many changes: reload instead
+    pass
+
+
+def read_changes(conn, table_name: str, from_version: int, to_version: int, max_rows: int = None) -> pa.Table:
+    # Change rows for versions from_version..to_version, oldest first
+    if to_version - from_version + 1 > CDF_MAX_VERSIONS:
+        raise ChangeFeedUnavailable(f"{to_version - from_version + 1} versions behind")
+    query = (f"SELECT * FROM table_changes(:table_name, :start_version, :end_version) "
+             f"ORDER BY {COMMIT_VERSION}")
+    params = {"table_name": table_name, "start_version": int(from_version), "end_version": int(to_version)}
+    try:
+        changes, stats = read_query(conn, query, params, max_rows=max_rows or CDF_MAX_ROWS)
+    except Exception as e:
+        raise ChangeFeedUnavailable(str(e)) from e
+    if stats["truncated"]:
+        raise ChangeFeedUnavailable(f"more than {max_rows or CDF_MAX_ROWS:,} changed rows")
+    return changes
+
+
+def _match_key(row, columns):
+    return tuple(None if row.get(c) is None else str(row.get(c)) for c in columns)
+
+
+def apply_changes(snapshot: pa.Table, changes: pa.Table, key_columns=None):
+    # Returns (new_table, summary). Rows are matched on key_columns, or on every
+    # column for keyless tables. An update that keeps its key stays in place;
+    # summary['in_place'] is True when no row moved, so positions still match.
+    columns = snapshot.column_names
+    # A projected snapshot takes its columns from the change rows
+    data_columns = [c for c in changes.column_names if c not in METADATA_COLUMNS]
+    if set(columns) - set(data_columns):
+        raise ChangeFeedUnavailable("table schema changed")
+    match = list(key_columns or columns)
+
+    keys = list(zip(*(
+        [None if v is None else str(v) for v in snapshot.column(c).to_pylist()] for c in match
+    ))) if snapshot.num_rows else []
+    positions = {}
+    for pos, key in enumerate(keys):
+        positions.setdefault(key, []).append(pos)
+
+    events = changes.to_pylist()
+    # Within a commit, removals first so an update's post-image can reuse the slot
+    events.sort(key=lambda e: (e[COMMIT_VERSION], e[CHANGE_TYPE] not in REMOVALS))
+    removed, replaced = set(), {}
+    appended, appended_at = [], {}
+    vacated, version = {}, None
+    summary = {"inserted": 0, "updated": 0, "deleted": 0}
+    for event in events:
+        if event[COMMIT_VERSION] != version:
+            version, vacated = event[COMMIT_VERSION], {}
+        row = {c: event.get(c) for c in columns}
+        key = _match_key(row, match)
+        change = event[CHANGE_TYPE]
+        if change in REMOVALS:
+            if appended_at.get(key):
+                appended[appended_at[key].pop()] = None
+            elif positions.get(key):
+                pos = positions[key].pop()
+                removed.add(pos)
+                if change == "update_preimage":
+                    vacated.setdefault(key, []).append(pos)
+            if change == "delete":
+                summary["deleted"] += 1
+            continue
+        if change == "update_postimage":
+            summary["updated"] += 1
+            if vacated.get(key):
+                pos = vacated[key].pop()
+                removed.discard(pos)
+                replaced[pos] = row
+                positions.setdefault(key, []).append(pos)
+                continue
+        else:
+            summary["inserted"] += 1
+        appended_at.setdefault(key, []).append(len(appended))
+        appended.append(row)
+
+    appended = [r for r in appended if r is not None]
+    rows = [replaced.get(pos, row) for pos, row in enumerate(snapshot.to_pylist()) if pos not in removed]
+    rows.extend(appended)
+    table = pa.Table.from_pylist(rows, schema=snapshot.schema)
+    summary.update({
+        "in_place": not removed,
+        "replaced": replaced,
+        "appended": appended,
+        "version": version,
+    })
+    return table, summary
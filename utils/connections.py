@@ -0,0 +1,291 @@
+# utils/connections.py
+# Credential resolution and a thread-safe pool of Databricks SQL connections.
+# Each connection is used by one thread at a time. Connections are keyed by
+# (host, http_path, credential identity) so tokens never share a session.
+import atexit
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from utils.metrics import metrics
+from utils.startup import lazy_module
+
+sql = lazy_module("databricks.sql")
+sql_errors = lazy_module("databricks.sql.exc")
+
+# Error classes the warehouse reports for a closed or expired session
+SESSION_ERROR_CLASSES = ("INVALID_HANDLE.SESSION_",)
+
+
+@lru_cache(maxsize=1)
+def get_config():
+    # The SDK is only imported once unified auth is actually needed
+    from databricks.sdk.core import Config
+
+    return Config()
+
+
+def _hostname(host: str) -> str:
+    parsed = urlparse(host)
+    return parsed.hostname if parsed.hostname else host.replace("https://", "").replace("http://", "")
+
+
+def _token_identity(token: str) -> str:
+    return "token:" + hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+def resolve_connection(http_path: str, host_override: str | None, token_override: str | None):
+    # Returns (pool_key, connect) where connect() opens a new connection
+    # Priority 1: explicit overrides from UI or store
+    if host_override and token_override:
+        hostname = _hostname(host_override)
+        return (hostname, http_path, _token_identity(token_override)), lambda: sql.connect(
+            server_hostname=hostname,
+            http_path=http_path,
+            access_token=token_override,
+        )
+    # Priority 2: environment variables for local dev
+    env_host = os.getenv("DATABRICKS_HOST")
+    env_token = os.getenv("DATABRICKS_TOKEN")
+    if env_host and env_token:
+        hostname = _hostname(env_host)
+        return (hostname, http_path, _token_identity(env_token)), lambda: sql.connect(
+            server_hostname=hostname,
+            http_path=http_path,
+            access_token=env_token,
+        )
+    # Priority 3: unified auth (Databricks Apps or configured local auth)
+    cfg = get_config()
+    hostname = _hostname(cfg.host)
+    return (hostname, http_path, f"unified:{cfg.auth_type}"), lambda: sql.connect(
+        server_hostname=hostname,
+        http_path=http_path,
+        credentials_provider=lambda: cfg.authenticate,
+    )
+
+
+def connection_identity(http_path: str, host_override: str | None, token_override: str | None):
+    # Pool key, also used to keep per-credential caches apart
+    return resolve_connection(http_path, host_override, token_override)[0]
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def is_session_error(exc: Exception) -> bool:
+    # Errors after which the connection should not be reused: transport failures
+    # and sessions the warehouse no longer knows. SQL errors (syntax, permissions,
+    # write conflicts) leave the session usable, whatever their message says.
+    if isinstance(exc, sql_errors.CursorAlreadyClosedError):
+        return False
+    if isinstance(exc, (sql_errors.RequestError, sql_errors.InterfaceError, sql_errors.InvalidServerResponseError,
+                        ConnectionError, TimeoutError)):
+        return True
+    return isinstance(exc, sql_errors.DatabaseError) and any(c in str(exc) for c in SESSION_ERROR_CLASSES)
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class ConnectionPool:
+    def __init__(self, max_size: int = 4, idle_timeout: float = 600.0, probe_after: float = 60.0,
+                 acquire_timeout: float = 60.0):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.probe_after = probe_after
+        self.acquire_timeout = acquire_timeout
+        self._cond = threading.Condition()
+        self._idle = {}      # key -> [_PooledConnection], most recently used last
+        self._in_use = {}    # key -> count of checked out connections
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "connects": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "evicted": 0,
+            "timeouts": 0,
+            "busy": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    def _evict_idle_locked(self, now: float):
+        # Returns expired connections; the caller closes them outside the lock
+        expired = []
+        for key, entries in list(self._idle.items()):
+            keep = []
+            for entry in entries:
+                if now - entry.last_used > self.idle_timeout:
+                    expired.append(entry)
+                else:
+                    keep.append(entry)
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+        self._stats["evicted"] += len(expired)
+        return expired
+
+    def _acquire(self, key, connect, wait: bool = True) -> _PooledConnection | None:
+        # wait=False returns None instead of waiting when every slot is taken
+        start = time.monotonic()
+        deadline = start + self.acquire_timeout
+        entry = None
+        busy = False
+        expired = []
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is shut down")
+                now = time.monotonic()
+                expired.extend(self._evict_idle_locked(now))
+                idle = self._idle.get(key)
+                in_use = self._in_use.get(key, 0)
+                if idle:
+                    entry = idle.pop()
+                    break
+                if in_use < self.max_size:
+                    break
+                if not wait:
+                    busy = True
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise TimeoutError(f"No SQL connection available after {self.acquire_timeout:.0f}s")
+                self._cond.wait(remaining)
+            if not busy:
+                self._in_use[key] = in_use + 1
+                waited = time.monotonic() - start
+                self._stats["checkouts"] += 1
+                self._stats["wait_seconds_total"] += waited
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+            else:
+                self._stats["busy"] += 1
+        # Close, connect and probe outside the lock
+        for old in expired:
+            _close_quietly(old.conn)
+        if busy:
+            return None
+        try:
+            if entry is None:
+                entry = _PooledConnection(connect())
+                self._count("connects")
+            elif time.monotonic() - entry.last_used > self.probe_after and not self._is_alive(entry.conn):
+                _close_quietly(entry.conn)
+                entry = _PooledConnection(connect())
+                self._count("reconnects")
+        except Exception:
+            self._release_slot(key)
+            raise
+        return entry
+
+    def _is_alive(self, conn) -> bool:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            return True
+        except Exception:
+            return False
+
+    def _count(self, name: str):
+        with self._cond:
+            self._stats[name] += 1
+
+    def _release_slot(self, key):
+        with self._cond:
+            self._in_use[key] = max(self._in_use.get(key, 1) - 1, 0)
+            if not self._in_use[key]:
+                del self._in_use[key]
+            self._cond.notify_all()
+
+    def _release(self, key, entry: _PooledConnection, broken: bool):
+        if broken or self._closed:
+            _close_quietly(entry.conn)
+            if broken:
+                self._count("discarded")
+        else:
+            entry.last_used = time.monotonic()
+            with self._cond:
+                self._idle.setdefault(key, []).append(entry)
+        self._release_slot(key)
+
+    @contextmanager
+    def connection(self, key, connect, wait: bool = True):
+        entry = self._acquire(key, connect, wait)
+        if entry is None:
+            yield None
+            return
+        broken = False
+        try:
+            yield entry.conn
+        except Exception as e:
+            broken = is_session_error(e)
+            raise
+        finally:
+            self._release(key, entry, broken)
+
+    def reset_after_fork(self):
+        # In a forked worker: connections opened before the fork share the
+        # parent's sockets, so they are forgotten without closing them
+        self._cond = threading.Condition()
+        self._idle = {}
+        self._in_use = {}
+        self._closed = False
+
+    def close_all(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, {}
+            self._cond.notify_all()
+        for entries in idle.values():
+            for entry in entries:
+                _close_quietly(entry.conn)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["in_use"] = sum(self._in_use.values())
+            stats["idle"] = sum(len(v) for v in self._idle.values())
+            stats["keys"] = len(set(self._idle) | set(self._in_use))
+        return stats
+
+
+pool = ConnectionPool(
+    max_size=int(os.getenv("SQL_POOL_MAX_SIZE", "4")),
+    idle_timeout=float(os.getenv("SQL_POOL_IDLE_TIMEOUT", "600")),
+)
+atexit.register(pool.close_all)
+metrics.register_collector("bti_sql_pool", pool.metrics)
+
+
+@contextmanager
+def borrow_connection(http_path: str, host_override: str | None, token_override: str | None):
+    key, connect = resolve_connection(http_path, host_override, token_override)
+    with pool.connection(key, connect) as conn:
+        yield conn
+
+
+@contextmanager
+def try_borrow_connection(http_path: str, host_override: str | None, token_override: str | None):
+    # Yields a pooled connection when one is free right now, else None; for
+    # extra concurrent queries that can fall back to a connection already held
+    key, connect = resolve_connection(http_path, host_override, token_override)
+    with pool.connection(key, connect, wait=False) as conn:
+        yield conn
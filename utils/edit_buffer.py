@@ -0,0 +1,361 @@
+# utils/edit_buffer.py
+# Server-side, per-session staging of grid edits. The buffer holds the loaded
+# snapshot (shared Arrow table) plus pending cell changes, deleted rows and
+# inserted rows, so the browser only ever sends deltas.
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+from utils.metrics import metrics
+from utils.startup import lazy_module
+from utils.table_diff import ROW_ID, diff_records
+
+np = lazy_module("numpy")
+
+# Rough per-entry overhead used for the memory estimate
+ENTRY_OVERHEAD_BYTES = 64
+
+
+class EditBufferFull(Exception):
+    pass
+
+
+def key_row_id(row, key_columns) -> str:
+    # Stable row id for server-side paging, where rows have no load position
+    return json.dumps([row.get(k) for k in key_columns], default=str)
+
+
+def _value_bytes(value) -> int:
+    return len(str(value)) + ENTRY_OVERHEAD_BYTES
+
+
+class EditBuffer:
+    def __init__(self, table_name: str, identity, columns, schema, key_columns, table=None,
+                 server_side: bool = False, max_bytes: int = None, index=None):
+        self.table_name = table_name
+        self.identity = identity
+        self.columns = list(columns)
+        self.schema = schema
+        self.key_columns = list(key_columns or [])
+        # Native mode: Arrow snapshot, row id = position. Server-side mode: no
+        # snapshot, row id = key_row_id() and originals are captured from pages.
+        self.table = table
+        self.server_side = server_side
+        # Server cache paging: SnapshotIndex over table (utils/arrow_query.py)
+        self.index = index
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self.updates = {}      # row id -> {column: value}
+        self.inserted = {}     # row id -> row
+        self.deleted = set()
+        self.overrides = {}    # row id -> saved row (None once deleted); the baseline after a save
+        self.originals = {}    # server-side: row id -> row as first seen
+        self.page_rows = {}    # server-side: row id -> row on the current page
+        self.applied_seq = 0
+        self.saving = None     # staged edits as diff() / current_rows() last saw them
+        self.next_id = table.num_rows if table is not None else 0
+        self.pending_bytes = 0
+        self.last_access = time.monotonic()
+
+    def nbytes(self) -> int:
+        snapshot = int(getattr(self.table, "nbytes", 0) or 0)
+        return snapshot + self.pending_bytes
+
+    def _check_limit(self, extra: int = 0):
+        if self.max_bytes and self.nbytes() + extra > self.max_bytes:
+            raise EditBufferFull(
+                f"Staged edits exceed the per-session limit of {self.max_bytes // (1024 * 1024)} MB; "
+                "save or reload before editing further"
+            )
+
+    def original_row(self, rid):
+        if rid in self.overrides:
+            return self.overrides[rid]
+        if self.server_side:
+            return self.originals.get(rid) or self.page_rows.get(rid)
+        if isinstance(rid, int) and self.table is not None and 0 <= rid < self.table.num_rows:
+            return self.table.slice(rid, 1).to_pylist()[0]
+        return None
+
+    def _capture_original(self, rid):
+        if self.server_side and rid not in self.originals and rid in self.page_rows:
+            self.originals[rid] = self.page_rows[rid]
+            self.pending_bytes += sum(_value_bytes(v) for v in self.page_rows[rid].values())
+
+    def apply_deltas(self, entries) -> int:
+        # entries: [{'seq', 'id', 'column', 'value'} | {'seq', 'id', 'deleted': True}
+        #           | {'seq', 'id', 'row'}]; 'row' stages a new row under the id the
+        # browser gave it (assets/table_edit.js).
+        # Entries at or below applied_seq were applied before, so replays are harmless.
+        # Every entry is applied; EditBufferFull afterwards only warns that the
+        # session is over its memory limit.
+        applied = 0
+        with self.lock:
+            self.last_access = time.monotonic()
+            for entry in sorted(entries or [], key=lambda e: e.get('seq', 0)):
+                seq = entry.get('seq', 0)
+                if seq <= self.applied_seq:
+                    continue
+                self.applied_seq = seq
+                rid = entry.get('id')
+                if entry.get('row') is not None:
+                    self._stage_insert(rid, entry['row'])
+                elif rid in self.inserted:
+                    if entry.get('deleted'):
+                        del self.inserted[rid]
+                    else:
+                        self.inserted[rid][entry['column']] = entry.get('value')
+                        self.pending_bytes += _value_bytes(entry.get('value'))
+                elif entry.get('deleted'):
+                    self._capture_original(rid)
+                    self.deleted.add(rid)
+                    self.updates.pop(rid, None)
+                    self.pending_bytes += ENTRY_OVERHEAD_BYTES
+                elif entry.get('column') in self.columns:
+                    self._capture_original(rid)
+                    self.updates.setdefault(rid, {})[entry['column']] = entry.get('value')
+                    self.pending_bytes += _value_bytes(entry.get('value'))
+                applied += 1
+            self._check_limit()
+        return applied
+
+    def _stage_insert(self, rid, row) -> dict:
+        # Ids handed out later (next_id) stay past the ones already in use
+        record = {c: row.get(c) for c in self.columns}
+        self.pending_bytes += sum(_value_bytes(v) for v in record.values())
+        self.inserted[rid] = record
+        if isinstance(rid, int):
+            self.next_id = max(self.next_id, rid + 1)
+        elif isinstance(rid, str) and rid.startswith("new-") and rid[4:].isdigit():
+            self.next_id = max(self.next_id, int(rid[4:]) + 1)
+        return record
+
+    def insert_row(self, row) -> dict:
+        # Assigns the staged row its id and returns it as a grid record
+        with self.lock:
+            self.last_access = time.monotonic()
+            rid = f"new-{self.next_id}" if self.server_side else self.next_id
+            self._check_limit(sum(_value_bytes(row.get(c)) for c in self.columns))
+            record = self._stage_insert(rid, row)
+            return {**record, ROW_ID: rid}
+
+    def remember_page(self, records) -> list:
+        # Server-side paging: tags fetched rows with ids, keeps them as originals
+        # for the next edits and overlays pending changes for display
+        with self.lock:
+            self.last_access = time.monotonic()
+            self.page_rows = {}
+            out = []
+            for row in records:
+                rid = key_row_id(row, self.key_columns)
+                self.page_rows[rid] = row
+                if rid in self.deleted:
+                    continue
+                out.append({**row, **self.updates.get(rid, {}), ROW_ID: rid})
+            return out
+
+    def visible_positions(self, positions) -> np.ndarray:
+        # Server cache paging: drops deleted rows (pending or saved) from query results
+        with self.lock:
+            hidden = [rid for rid in self.deleted | {r for r, row in self.overrides.items() if row is None}
+                      if isinstance(rid, int) and rid < self.table.num_rows]
+        if hidden:
+            positions = positions[~np.isin(positions, hidden)]
+        return positions
+
+    def records_at(self, positions) -> list:
+        # Server cache paging: snapshot rows at positions with saved and pending edits overlaid
+        rows = self.table.take(positions).to_pylist()
+        with self.lock:
+            self.last_access = time.monotonic()
+            out = []
+            for rid, row in zip((int(p) for p in positions), rows):
+                base = self.overrides.get(rid, row) or row
+                out.append({**base, **self.updates.get(rid, {}), ROW_ID: rid})
+            return out
+
+    def added_rows(self) -> list:
+        # Rows inserted since the load, saved or pending, listed after the snapshot rows
+        with self.lock:
+            n = self.table.num_rows if self.table is not None else 0
+            rows = [{**row, **self.updates.get(rid, {}), ROW_ID: rid} for rid, row in self.overrides.items()
+                    if isinstance(rid, int) and rid >= n and row is not None and rid not in self.deleted]
+            rows.extend({**row, ROW_ID: rid} for rid, row in self.inserted.items())
+            return rows
+
+    def pending_count(self) -> int:
+        with self.lock:
+            return len(self.updates) + len(self.inserted) + len(self.deleted)
+
+    def _capture(self):
+        # What a save is about to write; commit() settles only these edits, so
+        # deltas applied while the write runs stay pending
+        self.saving = ({rid: dict(changes) for rid, changes in self.updates.items()},
+                       {rid: dict(row) for rid, row in self.inserted.items()},
+                       set(self.deleted))
+
+    def diff(self, key_columns):
+        # Inserted / updated / deleted rows against the baseline, touching only edited rows
+        with self.lock:
+            self._capture()
+            snapshot, current = [], []
+            for rid in set(self.updates) | self.deleted:
+                original = self.original_row(rid)
+                if original is not None:
+                    snapshot.append({**original, ROW_ID: rid})
+            for rid, changes in self.updates.items():
+                original = self.original_row(rid)
+                if original is not None:
+                    current.append({**original, **changes, ROW_ID: rid})
+            for rid, row in self.inserted.items():
+                current.append({**row, ROW_ID: rid})
+            with metrics.timer("diff"):
+                return diff_records(snapshot, current, self.columns, key_columns)
+
+    def touched_rows(self) -> list:
+        # Original and edited versions of every staged row, e.g. to find touched partitions
+        with self.lock:
+            rows = []
+            for rid in set(self.updates) | self.deleted:
+                original = self.original_row(rid)
+                if original is None:
+                    continue
+                rows.append(original)
+                if rid in self.updates:
+                    rows.append({**original, **self.updates[rid]})
+            rows.extend(self.inserted.values())
+            return rows
+
+    def current_rows(self) -> list:
+        # Full table contents with pending edits applied (keyless overwrite)
+        with self.lock:
+            self._capture()
+            rows = []
+            n = self.table.num_rows if self.table is not None else 0
+            offset = 0
+            for batch in (self.table.to_batches() if self.table is not None else []):
+                for i, row in enumerate(batch.to_pylist(), start=offset):
+                    if i in self.deleted:
+                        continue
+                    if i in self.overrides:
+                        row = self.overrides[i]
+                        if row is None:
+                            continue
+                    rows.append({**row, **self.updates.get(i, {})})
+                offset += batch.num_rows
+            for rid, row in self.overrides.items():
+                if isinstance(rid, int) and rid >= n and row is not None and rid not in self.deleted:
+                    rows.append({**row, **self.updates.get(rid, {})})
+            rows.extend(self.inserted.values())
+            return rows
+
+    def commit(self):
+        # After a successful save the edits it wrote (see _capture) become the
+        # baseline; anything staged since is left pending on top of it
+        with self.lock:
+            if self.saving is None:
+                self._capture()
+            updates, inserted, deleted = self.saving
+            self.saving = None
+            for rid in deleted:
+                if self.server_side:
+                    self.page_rows.pop(rid, None)
+                else:
+                    self.overrides[rid] = None
+                self.deleted.discard(rid)
+                self.originals.pop(rid, None)
+            for rid, changes in updates.items():
+                original = self.original_row(rid)
+                if original is None:
+                    continue
+                saved = {**original, **changes}
+                if self.server_side:
+                    # The grid keeps showing this page; its rows are the new originals
+                    if rid in self.page_rows:
+                        self.page_rows[rid] = {**self.page_rows[rid], **changes}
+                else:
+                    self.overrides[rid] = saved
+                later = {c: v for c, v in self.updates.get(rid, {}).items() if c not in changes or changes[c] != v}
+                if later:
+                    self.updates[rid] = later
+                else:
+                    self.updates.pop(rid, None)
+                if rid in self.updates or rid in self.deleted:
+                    if self.server_side:
+                        self.originals[rid] = saved
+                else:
+                    self.originals.pop(rid, None)
+            for rid, row in inserted.items():
+                if self.server_side:
+                    self.page_rows[rid] = row
+                else:
+                    self.overrides[rid] = row
+                if rid not in self.inserted:
+                    # Deleted after the save started: now a saved row to delete
+                    if self.server_side:
+                        self.originals[rid] = row
+                    self.deleted.add(rid)
+                    continue
+                later = {c: v for c, v in self.inserted.pop(rid).items() if row.get(c) != v}
+                if later:
+                    if self.server_side:
+                        self.originals[rid] = row
+                    self.updates[rid] = later
+            self.pending_bytes = sum(
+                sum(_value_bytes(v) for v in row.values())
+                for rows in (self.overrides, self.originals, self.updates, self.inserted) for row in rows.values() if row
+            ) + ENTRY_OVERHEAD_BYTES * len(self.deleted)
+
+
+class EditBufferStore:
+    def __init__(self, ttl: float = 3600.0, max_bytes: int = 512 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._buffers = {}   # session id -> EditBuffer
+
+    def _sweep_locked(self, now: float):
+        for sid in [s for s, b in self._buffers.items() if now - b.last_access > self.ttl]:
+            del self._buffers[sid]
+
+    def create(self, session_id: str, **kwargs) -> EditBuffer:
+        buffer = EditBuffer(max_bytes=self.max_bytes, **kwargs)
+        if buffer.nbytes() > self.max_bytes:
+            raise EditBufferFull(
+                f"Table snapshot exceeds the per-session limit of {self.max_bytes // (1024 * 1024)} MB"
+            )
+        with self._lock:
+            self._sweep_locked(time.monotonic())
+            self._buffers[session_id] = buffer
+        return buffer
+
+    def get(self, session_id: str):
+        with self._lock:
+            now = time.monotonic()
+            self._sweep_locked(now)
+            buffer = self._buffers.get(session_id)
+            if buffer is not None:
+                buffer.last_access = now
+            return buffer
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._buffers.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._buffers),
+                "bytes": sum(b.nbytes() for b in self._buffers.values()),
+                "pending": sum(b.pending_count() for b in self._buffers.values()),
+            }
+
+
+edit_buffers = EditBufferStore(
+    ttl=float(os.getenv("EDIT_BUFFER_TTL", "3600")),
+    max_bytes=int(os.getenv("EDIT_BUFFER_MAX_MB", "512")) * 1024 * 1024,
+)
+metrics.register_collector("bti_edit_buffers", edit_buffers.stats)
@@ -0,0 +1,189 @@
+# utils/encoding.py
+# Type coercion and SQL literal encoding shared by every write path.
+# A plan maps each schema column to a kind once; values are then coerced
+# and encoded a whole column at a time.
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from utils.startup import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+KIND_ALIASES = {
+    "tinyint": "int", "byte": "int", "smallint": "int", "short": "int",
+    "int": "int", "integer": "int", "bigint": "int", "long": "int",
+    "decimal": "decimal", "dec": "decimal", "numeric": "decimal",
+    "double": "double", "float": "double", "real": "double",
+    "boolean": "boolean", "bool": "boolean",
+    "date": "date",
+    "timestamp": "timestamp", "timestamp_ntz": "timestamp", "timestamp_ltz": "timestamp",
+}
+NUMERIC_KINDS = ("int", "decimal", "double")
+TRUE_STRINGS = ("true", "1", "yes", "y")
+
+
+@lru_cache(maxsize=256)
+def column_kind(dtype) -> str:
+    # "DECIMAL(10,2)" -> "decimal", "array<int>" -> "string", None -> "string"
+    base = (dtype or "").lower().strip().split("(")[0].split("<")[0].strip()
+    return KIND_ALIASES.get(base, "string")
+
+
+def compile_plan(schema, columns=None):
+    # Returns ((name, kind), ...) in schema order, or for the given columns
+    kinds = {c.get('name'): column_kind(c.get('type')) for c in (schema or [])}
+    names = list(columns) if columns is not None else list(kinds)
+    return tuple((name, kinds.get(name, "string")) for name in names)
+
+
+def frame_plan(df: pd.DataFrame, schema=None):
+    # Plan for df's columns: schema types where known, else inferred from dtypes
+    kinds = dict(compile_plan(schema))
+    plan = []
+    for name in df.columns:
+        kind = kinds.get(name)
+        if kind is None:
+            dtype = df[name].dtype
+            if pd.api.types.is_bool_dtype(dtype):
+                kind = "boolean"
+            elif pd.api.types.is_integer_dtype(dtype):
+                kind = "int"
+            elif pd.api.types.is_float_dtype(dtype):
+                kind = "double"
+            elif pd.api.types.is_datetime64_any_dtype(dtype):
+                kind = "timestamp"
+            else:
+                kind = "string"
+        plan.append((name, kind))
+    return tuple(plan)
+
+
+def parse_value(value, kind: str):
+    # Scalar coercion for form input; unparseable values stay as text
+    if value is None or value == "":
+        return None
+    try:
+        if kind == "int":
+            try:
+                return int(value)
+            except ValueError:
+                as_float = float(value)
+                return int(as_float) if as_float.is_integer() else as_float
+        if kind in ("decimal", "double"):
+            return float(value)
+        if kind == "boolean":
+            return str(value).lower() in TRUE_STRINGS
+        return str(value)
+    except Exception:
+        return str(value)
+
+
+def parse_value_by_type(value, dtype):
+    return parse_value(value, column_kind(dtype))
+
+
+def blank_mask(s: pd.Series) -> np.ndarray:
+    # to_numpy() can hand back read-only views (pandas 3), so masks are combined, not updated
+    mask = s.isna().to_numpy()
+    if s.dtype == object or pd.api.types.is_string_dtype(s):
+        mask = mask | (s.astype(str).str.strip() == "").to_numpy()
+    return mask
+
+
+def coerce_column(s: pd.Series, kind: str) -> pd.Series:
+    if kind in NUMERIC_KINDS:
+        num = pd.to_numeric(s, errors='coerce', dtype_backend='numpy_nullable')
+        if kind == "int" and pd.api.types.is_float_dtype(num):
+            # Keep whole numbers exact; fractional values go through unchanged
+            # inf/nan never reach np.mod or the cast; they become NULL like in double columns
+            as_float = num.to_numpy(dtype='float64', na_value=np.nan)
+            finite = np.isfinite(as_float)
+            if np.all(np.mod(as_float[finite], 1) == 0):
+                num = num.mask(~finite).astype('Int64')
+        return num
+    if kind == "boolean":
+        if pd.api.types.is_bool_dtype(s):
+            return s.astype('boolean')
+        truthy = s.astype(str).str.lower().isin(TRUE_STRINGS)
+        return truthy.astype('boolean').mask(blank_mask(s))
+    return s
+
+
+def encode_column(s: pd.Series, kind: str) -> np.ndarray:
+    # Returns an array of SQL literal strings, NULL for missing values
+    if kind in NUMERIC_KINDS:
+        num = coerce_column(s, kind)
+        mask = num.isna().to_numpy()
+        if pd.api.types.is_float_dtype(num):
+            mask = mask | ~np.isfinite(num.to_numpy(dtype='float64', na_value=np.nan))
+        if kind == "decimal":
+            # Reuse the validated input text so no digits are lost through float
+            return np.where(mask, "NULL", s.astype(str).str.strip().to_numpy())
+        return np.where(mask, "NULL", num.astype(str).to_numpy())
+    if kind == "boolean":
+        coerced = coerce_column(s, kind)
+        mask = coerced.isna().to_numpy()
+        truthy = coerced.fillna(False).to_numpy(dtype=bool)
+        return np.where(mask, "NULL", np.where(truthy, "TRUE", "FALSE"))
+    # dates/timestamps and strings; an empty date is NULL, an empty string is ''
+    mask = blank_mask(s) if kind in ("date", "timestamp") else s.isna().to_numpy()
+    quoted = "'" + s.astype(str).str.replace("'", "''", regex=False) + "'"
+    return np.where(mask, "NULL", quoted.to_numpy())
+
+
+def parameter_column(s: pd.Series, kind: str, name=None) -> list:
+    # Python values for native query parameters (int, Decimal, float, bool,
+    # date, datetime, str), None for NULL
+    if kind in NUMERIC_KINDS:
+        num = coerce_column(s, kind)
+        mask = num.isna().to_numpy()
+        if pd.api.types.is_float_dtype(num):
+            mask = mask | ~np.isfinite(num.to_numpy(dtype='float64', na_value=np.nan))
+        if kind == "decimal":
+            values = s.astype(str).str.strip().to_numpy()
+            try:
+                return [None if m else Decimal(v) for v, m in zip(values, mask)]
+            except InvalidOperation:
+                # "1e3"-style input that to_numeric accepted; go through float
+                values = num.to_numpy(dtype=object, na_value=None)
+                return [None if m else Decimal(str(v)) for v, m in zip(values, mask)]
+        convert = int if kind == "int" and pd.api.types.is_integer_dtype(num) else float
+        values = num.to_numpy(dtype=object, na_value=None)
+        return [None if m else convert(v) for v, m in zip(values, mask)]
+    if kind == "boolean":
+        coerced = coerce_column(s, kind)
+        mask = coerced.isna().to_numpy()
+        values = coerced.fillna(False).to_numpy(dtype=bool)
+        return [None if m else bool(v) for v, m in zip(values, mask)]
+    if kind in ("date", "timestamp"):
+        blank = blank_mask(s)
+        parsed = pd.to_datetime(s.mask(blank), errors='coerce', format='mixed')
+        bad = parsed.isna().to_numpy() & ~blank
+        if bad.any():
+            examples = ", ".join(repr(v) for v in s[bad].head(3).tolist())
+            raise ValueError(f"Invalid {kind} value(s) in column {name}: {examples}")
+        if kind == "date":
+            return [None if m else v.date() for v, m in zip(parsed, blank)]
+        return [None if m else v.to_pydatetime() for v, m in zip(parsed, blank)]
+    mask = s.isna().to_numpy()
+    return [None if m else str(v) for v, m in zip(s.to_numpy(dtype=object), mask)]
+
+
+def parameter_value(value, kind: str, name=None):
+    # One native query parameter from form text (None for blank input)
+    return parameter_column(pd.Series([value], dtype=object), kind, name)[0]
+
+
+def encode_rows(frame: pd.DataFrame, plan) -> list:
+    # Returns ["(v1,v2,...)", ...] for every row of frame, in plan column order
+    if not len(frame):
+        return []
+    encoded = [
+        encode_column(frame[name] if name in frame.columns else pd.Series([None] * len(frame), dtype=object), kind)
+        for name, kind in plan
+    ]
+    return ["(" + ",".join(vals) + ")" for vals in zip(*encoded)]
+
@@ -0,0 +1,160 @@
+# utils/export.py
+# Streaming table export. A callback turns the caller's credentials and query
+# into a short-lived ticket; the Flask route for that ticket writes record
+# batches from fetchmany_arrow straight into the chunked HTTP response as CSV,
+# Parquet or Arrow IPC (optionally gzip-compressed). Only one batch is held in
+# memory at a time, whatever the table size.
+from __future__ import annotations
+
+import gzip
+import itertools
+import os
+import re
+import threading
+import time
+import uuid
+
+import flask
+
+from utils.connections import borrow_connection
+from utils.reader import iter_batches
+from utils.startup import lazy_module
+
+pa = lazy_module("pyarrow")
+pa_csv = lazy_module("pyarrow.csv")
+pq = lazy_module("pyarrow.parquet")
+
+EXPORT_ROUTE = "/api/export/<ticket>"
+EXPORT_TICKET_TTL = int(os.getenv("EXPORT_TICKET_TTL", "300"))
+
+# format -> (content type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", ".arrows"),
+}
+
+
+class _Sink:
+    # Write-only file object whose contents are taken out after every batch
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _open_writer(fmt: str, out, schema: pa.Schema):
+    if fmt == "parquet":
+        return pq.ParquetWriter(out, schema)
+    if fmt == "arrow":
+        return pa.ipc.new_stream(out, schema)
+    return pa_csv.CSVWriter(out, schema)
+
+
+class ExportTickets:
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tickets = {}   # ticket -> (created_at, job)
+
+    def create(self, job: dict) -> str:
+        ticket = uuid.uuid4().hex
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, (t, _) in self._tickets.items() if now - t > self.ttl]:
+                del self._tickets[key]
+            self._tickets[ticket] = (now, job)
+        return ticket
+
+    def get(self, ticket: str):
+        with self._lock:
+            entry = self._tickets.get(ticket)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return None
+            return entry[1]
+
+
+export_tickets = ExportTickets(ttl=EXPORT_TICKET_TTL)
+
+
+def create_export(http_path: str, host: str | None, token: str | None, table_name: str, query: str, params,
+                  fmt: str = "csv", compress: bool = False) -> str:
+    # Returns the download path; credentials stay on the server with the ticket
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    ticket = export_tickets.create({
+        "http_path": http_path, "host": host, "token": token, "table": table_name,
+        "query": query, "params": params or {}, "format": fmt, "compress": bool(compress),
+    })
+    return EXPORT_ROUTE.replace("<ticket>", ticket)
+
+
+def export_filename(job: dict) -> str:
+    base = re.sub(r"[^A-Za-z0-9_.-]", "_", job["table"].replace("`", ""))
+    return base + EXPORT_FORMATS[job["format"]][1] + (".gz" if job["compress"] else "")
+
+
+def stream_export(job: dict):
+    # Yields the encoded file in pieces; the connection is held until the last one
+    sink = _Sink()
+    out = gzip.GzipFile(fileobj=sink, mode="wb") if job["compress"] else sink
+    with borrow_connection(job["http_path"], job["host"], job["token"]) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(job["query"], parameters=job["params"] or None)
+            writer = None
+            for chunk in iter_batches(cursor):
+                if writer is None:
+                    writer = _open_writer(job["format"], out, chunk.schema)
+                if chunk.num_rows:
+                    writer.write_table(chunk)
+                data = sink.drain()
+                if data:
+                    yield data
+            if writer is not None:
+                writer.close()
+    if job["compress"]:
+        out.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def register_export_route(server):
+    # GET /api/export/<ticket> -> the export as a file download
+    @server.route(EXPORT_ROUTE, methods=["GET"])
+    def export_table(ticket):
+        job = export_tickets.get(ticket)
+        if job is None:
+            return flask.jsonify(error="This export link has expired. Start the export again."), 404
+        content_type = "application/gzip" if job["compress"] else EXPORT_FORMATS[job["format"]][0]
+        pieces = stream_export(job)
+        try:
+            # Run the query before committing to a 200, so SQL errors are reported
+            first = next(pieces, b"")
+        except Exception as e:
+            return flask.jsonify(error=f"Error exporting {job['table']}: {e}"), 502
+        return flask.Response(
+            flask.stream_with_context(itertools.chain([first], pieces)),
+            mimetype=content_type,
+            headers={"Content-Disposition": f'attachment; filename="{export_filename(job)}"'},
+        )
@@ -0,0 +1,164 @@
+# utils/grid_query.py
+# Translates DataTable custom paging / sorting / filtering state into SQL
+# so only the visible page is fetched from the warehouse, and the load form's
+# column and filter choices into a projected, filtered query.
+from utils.encoding import compile_plan, parameter_value
+
+# DataTable filter operators, longest symbols first so ">=" wins over ">"
+FILTER_OPERATORS = [
+    ["ge ", ">="],
+    ["le ", "<="],
+    ["lt ", "<"],
+    ["gt ", ">"],
+    ["ne ", "!="],
+    ["eq ", "="],
+    ["contains "],
+    ["datestartswith "],
+]
+
+SQL_COMPARISONS = {"ge": ">=", "le": "<=", "lt": "<", "gt": ">", "ne": "!=", "eq": "="}
+
+# Load form filter operators; "in" takes a comma-separated list
+LOAD_OPERATORS = ["=", "!=", "<", "<=", ">", ">=", "in"]
+
+
+def quote_identifier(name: str) -> str:
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def split_filter_part(filter_part: str):
+    # Returns (column, operator, value) for one "{col} op value" expression
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find("{") + 1: name_part.rfind("}")]
+                value_part = value_part.strip()
+                if not value_part:
+                    return None, None, None
+                v0 = value_part[0]
+                if v0 == value_part[-1] and v0 in ("'", '"', "`") and len(value_part) > 1:
+                    value = value_part[1:-1].replace("\\" + v0, v0)
+                else:
+                    try:
+                        value = float(value_part)
+                        if value.is_integer() and "." not in value_part:
+                            value = int(value)
+                    except ValueError:
+                        value = value_part
+                return name, operator_type[0].strip(), value
+    return None, None, None
+
+
+def build_where(filter_query: str | None, columns=None):
+    # Returns (" WHERE ...", params) or ("", {}) when nothing applies.
+    # Unknown columns are dropped so the filter box cannot inject SQL.
+    if not filter_query:
+        return "", {}
+    allowed = set(columns) if columns else None
+    clauses = []
+    params = {}
+    for part in filter_query.split(" && "):
+        name, operator, value = split_filter_part(part)
+        if not name or operator is None:
+            continue
+        if allowed is not None and name not in allowed:
+            continue
+        key = f"f{len(params)}"
+        col = quote_identifier(name)
+        if operator in SQL_COMPARISONS:
+            clauses.append(f"{col} {SQL_COMPARISONS[operator]} :{key}")
+            params[key] = value
+        elif operator == "contains":
+            clauses.append(f"contains(lower(CAST({col} AS STRING)), lower(:{key}))")
+            params[key] = str(value)
+        elif operator == "datestartswith":
+            clauses.append(f"CAST({col} AS STRING) LIKE :{key}")
+            params[key] = f"{value}%"
+    if not clauses:
+        return "", {}
+    return " WHERE " + " AND ".join(clauses), params
+
+
+def build_predicate(filters, schema):
+    # filters: [{'column', 'op', 'value'}] from the load form. Values become typed
+    # parameters (:w0, :w1, ...) using the column types; unknown columns and
+    # operators are dropped. Returns ("predicate", params) or ("", {}).
+    kinds = dict(compile_plan(schema))
+    clauses = []
+    params = {}
+    for f in filters or []:
+        name, op, value = f.get('column'), f.get('op'), f.get('value')
+        if name not in kinds or op not in LOAD_OPERATORS:
+            continue
+        col = quote_identifier(name)
+        if op == "in":
+            items = [v.strip() for v in str(value or "").split(",") if v.strip()]
+            if not items:
+                continue
+            names = []
+            for item in items:
+                key = f"w{len(params)}"
+                params[key] = parameter_value(item, kinds[name], name)
+                names.append(":" + key)
+            clauses.append(f"{col} IN ({', '.join(names)})")
+            continue
+        typed = parameter_value(value, kinds[name], name)
+        if typed is None:
+            if op in ("=", "!="):
+                clauses.append(f"{col} IS {'NOT ' if op == '!=' else ''}NULL")
+            continue
+        key = f"w{len(params)}"
+        params[key] = typed
+        clauses.append(f"{col} {op} :{key}")
+    return " AND ".join(clauses), params
+
+
+def _where_with(predicate, filter_query=None, columns=None):
+    # Load predicate (sql, params) combined with the grid's filter row
+    where, params = build_where(filter_query, columns)
+    sql, predicate_params = predicate or ("", {})
+    if sql:
+        where = f" WHERE ({sql})" + (where.replace(" WHERE ", " AND ", 1) if where else "")
+        params = {**predicate_params, **params}
+    return where, params
+
+
+def build_select_query(table_name: str, projection=None, predicate=None, filter_query=None, columns=None,
+                       sort_by=None):
+    # projection: column names (None for all); predicate: build_predicate() output;
+    # filter_query / sort_by: the grid's filter row and sort, e.g. to export the current view
+    select = ", ".join(quote_identifier(c) for c in projection) if projection else "*"
+    where, params = _where_with(predicate, filter_query, columns)
+    order_by = build_order_by(sort_by, columns)
+    return f"SELECT {select} FROM {table_name}{where}{order_by}", params
+
+
+def build_order_by(sort_by, columns=None) -> str:
+    if not sort_by:
+        return ""
+    allowed = set(columns) if columns else None
+    parts = []
+    for s in sort_by:
+        name = s.get("column_id")
+        if not name or (allowed is not None and name not in allowed):
+            continue
+        direction = "DESC" if s.get("direction") == "desc" else "ASC"
+        parts.append(f"{quote_identifier(name)} {direction}")
+    return " ORDER BY " + ", ".join(parts) if parts else ""
+
+
+def build_page_query(table_name: str, page_current, page_size, sort_by=None, filter_query=None, columns=None,
+                     projection=None, predicate=None):
+    where, params = _where_with(predicate, filter_query, columns)
+    order_by = build_order_by(sort_by, columns)
+    limit = max(int(page_size or 10), 1)
+    offset = max(int(page_current or 0), 0) * limit
+    select = ", ".join(quote_identifier(c) for c in projection) if projection else "*"
+    query = f"SELECT {select} FROM {table_name}{where}{order_by} LIMIT {limit} OFFSET {offset}"
+    return query, params
+
+
+def build_count_query(table_name: str, filter_query=None, columns=None, predicate=None):
+    where, params = _where_with(predicate, filter_query, columns)
+    return f"SELECT COUNT(*) FROM {table_name}{where}", params
@@ -0,0 +1,106 @@
+# utils/load_pipeline.py
+# Concurrent table loads: the schema lookup, Delta version, row count and data
+# query of one load are sent side by side instead of one after another. Each
+# query runs on its own pooled connection when one is free right away, and
+# otherwise waits its turn on the connection the load already holds, so a busy
+# pool degrades to the sequential load instead of blocking. A failed query
+# cancels its siblings, and cancelling the background job (Load Table pressed
+# again) cancels all of them.
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from utils.background import QueryCancelled, cancel_scope
+from utils.metrics import metrics
+
+LOAD_PIPELINE_THREADS = int(os.getenv("LOAD_PIPELINE_THREADS", "16"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LOAD_PIPELINE_THREADS, thread_name_prefix="load-pipeline")
+        return _executor
+
+
+def reset_after_fork():
+    # Threads do not survive fork; a forked worker starts its own pool
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+class LoadPipeline:
+    def __init__(self, conn, borrow=None):
+        # conn: the connection the caller holds; borrow(): context manager that
+        # yields a free pooled connection or None (try_borrow_connection).
+        # Without borrow, every query runs inline on conn as it is submitted.
+        self.conn = conn
+        self.borrow = borrow
+        self.scope = None
+        self._scope_cm = None
+        self._conn_lock = threading.Lock()
+        self._futures = []
+
+    def __enter__(self):
+        self._scope_cm = cancel_scope()
+        self.scope = self._scope_cm.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Queries still running (e.g. the count once the rows are in) are
+        # cancelled and awaited, so conn is idle when it goes back to the pool
+        pending = [f for f in self._futures if not f.done()]
+        if pending:
+            self.scope.cancel()
+            wait(pending)
+        self._scope_cm.__exit__(exc_type, exc, tb)
+        return False
+
+    def submit(self, fn) -> Future:
+        # fn(conn) -> result, run concurrently with the other submitted queries
+        if self.borrow is None:
+            future = Future()
+            try:
+                future.set_result(fn(self.conn))
+            except BaseException as e:
+                future.set_exception(e)
+        else:
+            # Runs in a copy of this context: the cancel scope and the metrics trace
+            future = _get_executor().submit(contextvars.copy_context().run, self._run, fn)
+            future.add_done_callback(self._cancel_siblings)
+        self._futures.append(future)
+        return future
+
+    def result(self, future: Future):
+        # The query's result; its failure cancels every other query of the load
+        try:
+            return future.result()
+        except BaseException:
+            self.cancel()
+            raise
+
+    def cancel(self):
+        if self.scope is not None:
+            self.scope.cancel()
+
+    def _run(self, fn):
+        if self.scope is not None:
+            self.scope.check()
+        with self.borrow() as extra:
+            if extra is not None:
+                metrics.count("bti_load_queries_total", mode="parallel")
+                return fn(extra)
+        metrics.count("bti_load_queries_total", mode="shared")
+        with self._conn_lock:
+            return fn(self.conn)
+
+    def _cancel_siblings(self, future: Future):
+        error = None if future.cancelled() else future.exception()
+        if error is not None and not isinstance(error, QueryCancelled):
+            self.cancel()
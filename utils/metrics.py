@@ -0,0 +1,215 @@
+# utils/metrics.py
+# Hot-path instrumentation: timers and counters recorded around query execute,
+# fetch, coercion, encoding and serialization, exposed in Prometheus text format
+# at /metrics. Work done inside request_trace() is also broken down per request
+# and kept for the debug panel (pages/performance.py).
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import flask
+
+METRICS_ROUTE = "/metrics"
+METRICS_RECENT_REQUESTS = int(os.getenv("METRICS_RECENT_REQUESTS", "50"))
+# Histogram bucket upper bounds, in seconds and in bytes
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+_current_trace = contextvars.ContextVar("bti_metrics_trace", default=None)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Metrics:
+    def __init__(self, recent: int = 50):
+        self._lock = threading.Lock()
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> _Histogram
+        self._collectors = []   # (prefix, fn) -> gauges from existing stats() methods
+        self._recent = deque(maxlen=recent)
+
+    def count(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        trace = _current_trace.get()
+        if trace is not None and not labels:
+            trace["counters"][name] = trace["counters"].get(name, 0) + value
+
+    def observe(self, name: str, value: float, buckets=SECONDS_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, phase: str):
+        # Adds the elapsed time to <phase>_seconds and to the current request's breakdown
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("bti_phase_seconds", elapsed, phase=phase)
+            trace = _current_trace.get()
+            if trace is not None:
+                trace["phases"][phase] = trace["phases"].get(phase, 0.0) + elapsed
+
+    @contextmanager
+    def request_trace(self, name: str):
+        # Collects the phases and counters of one callback run into recent_requests()
+        trace = {"name": name, "started_at": time.time(), "phases": {}, "counters": {}, "error": None}
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            yield trace
+        except BaseException as e:
+            trace["error"] = type(e).__name__
+            raise
+        finally:
+            _current_trace.reset(token)
+            trace["seconds"] = time.perf_counter() - started
+            self.observe("bti_request_seconds", trace["seconds"], request=name)
+            with self._lock:
+                self._recent.append(trace)
+
+    def register_collector(self, prefix: str, fn):
+        # fn() -> {name: number}, exported as gauges <prefix>_<name>
+        with self._lock:
+            self._collectors.append((prefix, fn))
+
+    def recent_requests(self) -> list:
+        with self._lock:
+            return list(self._recent)
+
+    def render(self) -> str:
+        # Prometheus text exposition format 0.0.4
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: (h.buckets, list(h.counts), h.count, h.sum) for k, h in self._histograms.items()}
+            collectors = list(self._collectors)
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), (buckets, counts, count, total) in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels(labels + (('le', repr(float(bound))),))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        for prefix, fn in collectors:
+            try:
+                values = fn()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                header(name, "gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+metrics = Metrics(recent=METRICS_RECENT_REQUESTS)
+
+
+def process_stats() -> dict:
+    # Worker memory and threads, for sizing workers under load
+    stats = {"threads": threading.active_count()}
+    try:
+        with open("/proc/self/statm") as f:
+            stats["resident_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        stats["max_resident_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    return stats
+
+
+metrics.register_collector("bti_process", process_stats)
+
+
+def traced(name: str):
+    # Decorator: runs the callback inside metrics.request_trace(name). When it runs
+    # in the request (not as a background job), name also labels bti_callback_*.
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if flask.has_request_context():
+                flask.g.bti_callback = name
+            with metrics.request_trace(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def register_metrics_route(server):
+    # GET /metrics for Prometheus; callback response sizes and times are recorded too
+    @server.route(METRICS_ROUTE, methods=["GET"])
+    def prometheus_metrics():
+        return flask.Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    @server.before_request
+    def start_request_timer():
+        flask.g.bti_started = time.perf_counter()
+
+    @server.after_request
+    def record_callback_payload(response):
+        if flask.request.path.endswith("/_dash-update-component"):
+            # Labelled by @traced name only, so the series stay few whatever the layout
+            callback = flask.g.get("bti_callback", "other")
+            metrics.observe("bti_callback_seconds", time.perf_counter() - flask.g.get("bti_started", time.perf_counter()),
+                            callback=callback)
+            if response.content_length is not None:
+                metrics.observe("bti_callback_response_bytes", response.content_length, buckets=BYTES_BUCKETS,
+                                callback=callback)
+                metrics.count("bti_callback_response_bytes_total", response.content_length)
+        return response
@@ -0,0 +1,68 @@
+# utils/partitions.py
+# Partition-scoped rewrites: the partitions touched by staged edits become a
+# REPLACE WHERE predicate, so a keyless save rewrites those partitions only.
+from utils.encoding import compile_plan, parameter_column
+from utils.grid_query import quote_identifier
+from utils.startup import lazy_module
+
+pd = lazy_module("pandas")
+
+
+def partition_values(rows, partition_columns, schema) -> list:
+    # Typed partition tuples of rows (dates, timestamps, numbers as query parameters)
+    kinds = dict(compile_plan(schema))
+    if not rows:
+        return []
+    frame = pd.DataFrame(list(rows), columns=list(partition_columns))
+    typed = [parameter_column(frame[c].astype(object), kinds.get(c, "string"), c) for c in partition_columns]
+    return list(zip(*typed))
+
+
+def build_partition_predicate(partition_columns, values, prefix: str = "q"):
+    # values: distinct typed partition tuples. One column gives "col IN (...)",
+    # several give "(a = :q0 AND b = :q1) OR ...". Returns (sql, params).
+    params = {}
+
+    def marker(value):
+        key = f"{prefix}{len(params)}"
+        params[key] = value
+        return ":" + key
+
+    ordered = sorted(values, key=lambda v: tuple((x is None, str(x)) for x in v))
+    if len(partition_columns) == 1:
+        col = quote_identifier(partition_columns[0])
+        present = [v[0] for v in ordered if v[0] is not None]
+        clauses = []
+        if present:
+            clauses.append(f"{col} IN ({', '.join(marker(v) for v in present)})")
+        if len(present) < len(ordered):
+            clauses.append(f"{col} IS NULL")
+        return " OR ".join(clauses), params
+    groups = []
+    for combo in ordered:
+        parts = [f"{quote_identifier(c)} IS NULL" if v is None else f"{quote_identifier(c)} = {marker(v)}"
+                 for c, v in zip(partition_columns, combo)]
+        groups.append("(" + " AND ".join(parts) + ")")
+    return " OR ".join(groups), params
+
+
+def combine_predicates(*predicates):
+    # AND of (sql, params) predicates; empty ones are skipped
+    clauses, params = [], {}
+    for sql, p in predicates:
+        if sql:
+            clauses.append(f"({sql})")
+            params.update(p)
+    return " AND ".join(clauses), params
+
+
+def partition_slice(rows, touched_rows, partition_columns, schema):
+    # Returns (predicate, rows to write): the touched partitions and every
+    # current row that falls in them. (None, []) when nothing is touched: an
+    # empty predicate would turn the rewrite into a whole-table overwrite.
+    touched = set(partition_values(touched_rows, partition_columns, schema))
+    if not touched:
+        return None, []
+    predicate = build_partition_predicate(partition_columns, touched)
+    keys = partition_values(rows, partition_columns, schema)
+    return predicate, [row for row, key in zip(rows, keys) if key in touched]
@@ -0,0 +1,120 @@
+# utils/reader.py
+# Streaming reads: record batches come from fetchmany_arrow under a per-request
+# row and byte ceiling, and go to grid records without a pandas copy.
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+
+from utils.background import cancellable, check_cancelled
+from utils.metrics import metrics
+from utils.startup import lazy_module
+
+pa = lazy_module("pyarrow")
+
+FETCH_BATCH_ROWS = int(os.getenv("READ_BATCH_ROWS", "10000"))
+MAX_READ_ROWS = int(os.getenv("READ_MAX_ROWS", "100000"))
+MAX_READ_BYTES = int(os.getenv("READ_MAX_MB", "256")) * 1024 * 1024
+
+# Stats of the most recent reads, for sizing workers
+_recent_reads = deque(maxlen=100)
+_recent_lock = threading.Lock()
+
+
+def iter_batches(cursor, batch_rows: int = None):
+    # Yields non-empty pa.Table chunks; the first chunk may be empty (schema only)
+    batch_rows = batch_rows or FETCH_BATCH_ROWS
+    first = True
+    while True:
+        check_cancelled()
+        chunk = cursor.fetchmany_arrow(batch_rows)
+        if chunk.num_rows == 0:
+            if first:
+                yield chunk
+            return
+        first = False
+        yield chunk
+
+
+def read_arrow(cursor, max_rows: int = None, max_bytes: int = None, progress=None):
+    # Reads the executed statement's result up to the ceilings.
+    # Returns (pa.Table, stats); stats['truncated'] says whether rows were left behind.
+    max_rows = MAX_READ_ROWS if max_rows is None else max_rows
+    max_bytes = MAX_READ_BYTES if max_bytes is None else max_bytes
+    started = time.perf_counter()
+    batches = []
+    schema = None
+    rows = 0
+    nbytes = 0
+    peak = 0
+    truncated = False
+    for chunk in iter_batches(cursor):
+        schema = schema or chunk.schema
+        peak = max(peak, nbytes + chunk.nbytes)
+        if max_rows and rows + chunk.num_rows > max_rows:
+            chunk = chunk.slice(0, max_rows - rows)
+            truncated = True
+        batches.extend(chunk.to_batches())
+        rows += chunk.num_rows
+        nbytes += chunk.nbytes
+        if progress is not None:
+            progress(rows)
+        if truncated:
+            break
+        if max_bytes and nbytes >= max_bytes:
+            # Over budget: only report truncation if anything is left to read
+            truncated = cursor.fetchmany_arrow(1).num_rows > 0
+            break
+    table = pa.Table.from_batches(batches, schema=schema) if schema is not None else pa.table({})
+    stats = {
+        "rows": rows,
+        "bytes": nbytes,
+        "peak_bytes": peak,
+        "arrow_pool_max_bytes": pa.default_memory_pool().max_memory(),
+        "truncated": truncated,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    with _recent_lock:
+        _recent_reads.append(stats)
+    metrics.count("bti_rows_read_total", rows)
+    metrics.count("bti_bytes_read_total", nbytes)
+    return table, stats
+
+
+def read_query(conn, query: str, parameters=None, max_rows: int = None, max_bytes: int = None, progress=None):
+    # Executes query with LIMIT max_rows + 1 so the warehouse stops early
+    max_rows = MAX_READ_ROWS if max_rows is None else max_rows
+    if max_rows:
+        query = f"{query} LIMIT {int(max_rows) + 1}"
+    with conn.cursor() as cursor, cancellable(cursor):
+        with metrics.timer("execute"):
+            cursor.execute(query, parameters=parameters or None)
+        with metrics.timer("fetch"):
+            return read_arrow(cursor, max_rows, max_bytes, progress)
+
+
+def arrow_to_records(table: pa.Table) -> list:
+    # Grid records straight from Arrow; nulls become None
+    with metrics.timer("serialize"):
+        return table.to_pylist()
+
+
+def recent_read_stats() -> list:
+    with _recent_lock:
+        return list(_recent_reads)
+
+
+def read_stats() -> dict:
+    # Gauges over the recent reads, for sizing workers
+    recent = recent_read_stats()
+    return {
+        "recent": len(recent),
+        "peak_bytes": max((s["peak_bytes"] for s in recent), default=0),
+        "max_bytes": max((s["bytes"] for s in recent), default=0),
+        "arrow_pool_max_bytes": max((s["arrow_pool_max_bytes"] for s in recent), default=0),
+    }
+
+
+metrics.register_collector("bti_read", read_stats)
@@ -0,0 +1,193 @@
+# utils/schema_cache.py
+# Column, primary-key and partition metadata per table, cached with a TTL. The first
+# table opened in a schema fetches every table of that schema in one query.
+import os
+import threading
+import time
+
+from utils.metrics import metrics
+from utils.single_flight import single_flight
+
+COLUMNS_WITH_KEYS_QUERY = (
+    "SELECT c.table_name, c.column_name, c.data_type, c.is_nullable, k.ordinal_position, c.partition_index "
+    "FROM system.information_schema.columns c "
+    "LEFT JOIN ("
+    "SELECT kcu.table_name, kcu.column_name, kcu.ordinal_position "
+    "FROM system.information_schema.table_constraints tc "
+    "JOIN system.information_schema.key_column_usage kcu "
+    "ON tc.constraint_catalog = kcu.constraint_catalog "
+    "AND tc.constraint_schema = kcu.constraint_schema "
+    "AND tc.constraint_name = kcu.constraint_name "
+    "WHERE tc.constraint_type = 'PRIMARY KEY' "
+    "AND tc.table_catalog = :catalog AND tc.table_schema = :schema"
+    ") k ON c.table_name = k.table_name AND c.column_name = k.column_name "
+    "WHERE c.table_catalog = :catalog AND c.table_schema = :schema"
+)
+
+COLUMNS_QUERY = (
+    "SELECT c.table_name, c.column_name, c.data_type, c.is_nullable, NULL, c.partition_index "
+    "FROM system.information_schema.columns c "
+    "WHERE c.table_catalog = :catalog AND c.table_schema = :schema"
+)
+
+
+def split_table_name(table_name: str):
+    parts = (table_name or "").split(".")
+    if len(parts) != 3:
+        return None
+    return tuple(p.strip("`").lower() for p in parts)
+
+
+def _fetch_schema(conn, catalog: str, schema: str, table: str | None = None):
+    # Returns {table: {'columns': [...], 'key_columns': [...], 'partition_columns': [...]}}
+    # from information_schema
+    params = {"catalog": catalog, "schema": schema}
+    table_filter = ""
+    if table is not None:
+        table_filter = " AND c.table_name = :table"
+        params["table"] = table
+    order = " ORDER BY c.table_name, c.ordinal_position"
+    rows = None
+    for query in (COLUMNS_WITH_KEYS_QUERY, COLUMNS_QUERY):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query + table_filter + order, parameters=params)
+                rows = cursor.fetchall()
+            break
+        except Exception:
+            # Constraint views can be restricted while columns are readable
+            continue
+    if rows is None:
+        return None
+    tables = {}
+    for table_name, column_name, data_type, is_nullable, key_position, partition_index in rows:
+        meta = tables.setdefault(table_name, {'columns': [], 'keys': [], 'partitions': []})
+        meta['columns'].append({
+            "name": column_name,
+            "type": data_type,
+            "nullable": str(is_nullable).upper() != "NO",
+        })
+        if key_position is not None:
+            meta['keys'].append((int(key_position), column_name))
+        if partition_index is not None:
+            meta['partitions'].append((int(partition_index), column_name))
+    return {
+        name: {'columns': meta['columns'],
+               'key_columns': [c for _, c in sorted(meta['keys'])],
+               'partition_columns': [c for _, c in sorted(meta['partitions'])]}
+        for name, meta in tables.items()
+    }
+
+
+def _describe_table(conn, table_name: str):
+    # Fallback to DESCRIBE TABLE if information_schema not accessible
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DESCRIBE TABLE {table_name}")
+            rows = cursor.fetchall()
+        columns = []
+        partition_columns = []
+        section = "columns"
+        for r in rows:
+            col = r[0]
+            dtype = r[1]
+            if not col or col.startswith("#"):
+                # Sections after the columns; only partition columns are kept
+                if col == "# Partition Information":
+                    section = "partitions"
+                elif col != "# col_name":
+                    section = None
+                continue
+            if section == "columns" and dtype:
+                columns.append({"name": col, "type": dtype, "nullable": True})
+            elif section == "partitions":
+                partition_columns.append(col)
+        return {'columns': columns, 'key_columns': [], 'partition_columns': partition_columns}
+    except Exception:
+        return None
+
+
+class SchemaCache:
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._schemas = {}   # (identity, catalog, schema) -> (fetched_at, {table: metadata})
+        self._stats = {"hits": 0, "misses": 0, "batch_queries": 0, "table_queries": 0}
+
+    def _lookup(self, key, table):
+        with self._lock:
+            cached = self._schemas.get(key)
+            if cached is None or time.monotonic() - cached[0] > self.ttl:
+                return None, False
+            meta = cached[1].get(table)
+            if meta is not None:
+                self._stats["hits"] += 1
+            return meta, True
+
+    def get_table(self, identity, table_name: str, conn):
+        # Returns {'columns': [{'name', 'type', 'nullable'}], 'key_columns': [...], 'partition_columns': [...]}
+        parts = split_table_name(table_name)
+        if parts is None:
+            return {'columns': [], 'key_columns': [], 'partition_columns': []}
+        catalog, schema, table = parts
+        key = (identity, catalog, schema)
+        meta, schema_cached = self._lookup(key, table)
+        if meta is not None:
+            return meta
+        with self._lock:
+            self._stats["misses"] += 1
+        # Sessions opening tables of the same schema at once share one query
+        if not schema_cached:
+            # First table of this schema: fetch the whole schema at once
+            fetched = single_flight.do(("schema",) + key, lambda: self._fetch_batch(key, conn))
+        else:
+            # Schema batch is fresh but this table was invalidated or created since
+            fetched = single_flight.do(("schema",) + key + (table,), lambda: self._fetch_one(key, table, conn))
+        meta = (fetched or {}).get(table)
+        if meta is None:
+            meta = _describe_table(conn, table_name)
+        if meta is None:
+            return {'columns': [], 'key_columns': [], 'partition_columns': []}
+        with self._lock:
+            cached = self._schemas.get(key)
+            if cached is not None:
+                cached[1][table] = meta
+        return meta
+
+    def _fetch_batch(self, key, conn):
+        fetched = _fetch_schema(conn, key[1], key[2])
+        with self._lock:
+            self._stats["batch_queries"] += 1
+            self._schemas[key] = (time.monotonic(), fetched or {})
+        return fetched
+
+    def _fetch_one(self, key, table, conn):
+        fetched = _fetch_schema(conn, key[1], key[2], table)
+        with self._lock:
+            self._stats["table_queries"] += 1
+        return fetched
+
+    def invalidate(self, identity=None, table_name: str | None = None):
+        # Drops one table, or everything for an identity, or everything
+        with self._lock:
+            if table_name is None:
+                for key in [k for k in self._schemas if identity is None or k[0] == identity]:
+                    del self._schemas[key]
+                return
+            parts = split_table_name(table_name)
+            if parts is None:
+                return
+            catalog, schema, table = parts
+            for key, (_, tables) in self._schemas.items():
+                if key[1:] == (catalog, schema) and (identity is None or key[0] == identity):
+                    tables.pop(table, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["schemas"] = len(self._schemas)
+        return stats
+
+
+schema_cache = SchemaCache(ttl=float(os.getenv("SCHEMA_CACHE_TTL", "300")))
+metrics.register_collector("bti_schema_cache", schema_cache.stats)
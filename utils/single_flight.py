@@ -0,0 +1,77 @@
+# utils/single_flight.py
+# Coalesces concurrent identical warehouse queries: the first caller for a key
+# runs the query, callers arriving while it is in flight wait for its result.
+# Nothing is kept once the call finishes, and keys always carry the credential
+# identity, so results are never shared across tokens.
+import threading
+
+from utils.background import QueryCancelled, check_cancelled
+from utils.metrics import metrics
+
+# How often a waiting caller checks whether its own job was cancelled
+WAIT_POLL_SECONDS = 0.2
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}   # key -> _Call
+        self._stats = {"leaders": 0, "shared": 0, "retries": 0}
+
+    def do(self, key, fn):
+        # Returns fn()'s result, running fn at most once per key at a time
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._stats["leaders"] += 1
+                else:
+                    call.waiters += 1
+                    self._stats["shared"] += 1
+            if leader:
+                try:
+                    call.result = fn()
+                    return call.result
+                except BaseException as e:
+                    call.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        self._calls.pop(key, None)
+                    call.done.set()
+            while not call.done.wait(WAIT_POLL_SECONDS):
+                check_cancelled()
+            if isinstance(call.error, QueryCancelled):
+                # The leader's job was cancelled, not ours: run it again
+                with self._lock:
+                    self._stats["retries"] += 1
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+
+single_flight = SingleFlight()
+metrics.register_collector("bti_single_flight", single_flight.stats)
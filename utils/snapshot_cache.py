@@ -0,0 +1,112 @@
+# utils/snapshot_cache.py
+# Server-side cache of loaded tables (Arrow table + schema) keyed by
+# credential identity, table name and loaded slice (columns and filters),
+# valid only for one Delta version.
+import os
+import threading
+from collections import OrderedDict
+
+from utils.metrics import metrics
+
+
+def get_table_version(table_name: str, conn):
+    # Latest Delta version, or None when the table has no history (views, non-Delta)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DESCRIBE HISTORY {table_name} LIMIT 1")
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
+    except Exception:
+        return None
+
+
+class SnapshotEntry:
+    __slots__ = ("version", "table", "schema", "key_columns", "truncated", "nbytes", "index")
+
+    def __init__(self, version, table, schema, key_columns, truncated=False):
+        self.version = version
+        self.table = table
+        self.schema = schema
+        self.key_columns = key_columns
+        # True when the read ceiling cut the table short
+        self.truncated = truncated
+        self.nbytes = int(getattr(table, "nbytes", 0) or 0)
+        # Sort / filter / search index (utils/arrow_query.py), built on demand
+        self.index = None
+
+
+class SnapshotCache:
+    def __init__(self, max_entries: int = 16, max_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> SnapshotEntry, least recently used first
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if version is None or entry.version != version:
+                self._stats["stale"] += 1
+                self._drop_locked(key)
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def cached_version(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.version if entry is not None else None
+
+    def put(self, key, version, table, schema, key_columns=None, truncated=False):
+        # Returns the entry; it is only kept when it has a version and fits the budget
+        entry = SnapshotEntry(version, table, schema, key_columns or [], truncated)
+        if version is None or entry.nbytes > self.max_bytes:
+            return entry
+        with self._lock:
+            self._drop_locked(key)
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._drop_locked(oldest)
+                self._stats["evictions"] += 1
+        return entry
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._drop_locked(key):
+                self._stats["invalidations"] += 1
+
+    def invalidate_table(self, identity, table_name: str):
+        # Every cached slice of the table; keys start with (identity, table_name)
+        with self._lock:
+            for key in [k for k in self._entries if tuple(k[:2]) == (identity, table_name)]:
+                self._drop_locked(key)
+                self._stats["invalidations"] += 1
+
+    def _drop_locked(self, key) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.nbytes
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        return stats
+
+
+snapshot_cache = SnapshotCache(
+    max_entries=int(os.getenv("SNAPSHOT_CACHE_MAX_ENTRIES", "16")),
+    max_bytes=int(os.getenv("SNAPSHOT_CACHE_MAX_MB", "512")) * 1024 * 1024,
+)
+metrics.register_collector("bti_snapshot_cache", snapshot_cache.stats)
@@ -0,0 +1,163 @@
+# utils/startup.py
+# Cold start. pandas, numpy, pyarrow and the Databricks SQL connector are bound
+# as lazy modules that import on first use, so the Introduction and
+# Configuration pages answer without loading them. Once the server listens, a
+# background thread imports them anyway, builds the SDK config and opens a
+# pooled connection, so the first table load does not pay for them either.
+# Import and warm-up times and the time to first response make up the startup
+# report (logged once, and as bti_startup_* gauges on /metrics).
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import types
+
+from utils.metrics import metrics
+
+LAZY_IMPORTS = os.getenv("LAZY_IMPORTS", "true").lower() in ("1", "true", "yes")
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() in ("1", "true", "yes")
+# Imported by the warm-up thread, in this order
+WARM_MODULES = ("numpy", "pyarrow", "pandas", "databricks.sql")
+
+logger = logging.getLogger(__name__)
+
+
+def _process_age() -> float:
+    # Seconds since this process started (Linux); 0 where /proc is not available
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
+
+
+# Reference point of the report: interpreter start, or this import as a fallback
+_started = time.perf_counter() - _process_age()
+_lock = threading.Lock()
+_report = {"imports": {}, "warmup": {}, "marks": {}, "errors": {}}
+
+
+def mark(name: str):
+    # Seconds from process start to the first time `name` happened
+    with _lock:
+        _report["marks"].setdefault(name, round(time.perf_counter() - _started, 3))
+
+
+def import_timed(name: str):
+    # importlib.import_module, recording how long the first import took
+    loaded = name in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    if not loaded:
+        with _lock:
+            _report["imports"].setdefault(name, round(time.perf_counter() - started, 3))
+    return module
+
+
+class _LazyModule(types.ModuleType):
+    # Bound in place of the module; the real import runs on first attribute
+    # access, in whichever thread gets there first
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = import_timed(self.__name__)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_module(name: str):
+    # `pd = lazy_module("pandas")` in place of `import pandas as pd`. Modules
+    # that annotate with the lazy name need `from __future__ import annotations`.
+    if not LAZY_IMPORTS:
+        return import_timed(name)
+    return _LazyModule(name)
+
+
+def _step(name: str, fn):
+    started = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        with _lock:
+            _report["errors"][name] = str(e)[:200]
+        logger.warning("Startup warm-up step %s failed: %s", name, e)
+        return
+    with _lock:
+        _report["warmup"][name] = round(time.perf_counter() - started, 3)
+
+
+def warm_up(http_path: str | None = None):
+    # Imports the heavy modules, then resolves credentials and opens one pooled
+    # connection for the environment's warehouse (if DATABRICKS_SQL_HTTP_PATH is set)
+    from utils import connections
+
+    for name in WARM_MODULES:
+        _step(f"import_{name}", lambda name=name: import_timed(name))
+    if not (os.getenv("DATABRICKS_HOST") and os.getenv("DATABRICKS_TOKEN")):
+        # Unified auth: building the SDK config reads profiles / the Apps environment
+        _step("sdk_config", connections.get_config)
+    if http_path:
+        def connect():
+            with connections.borrow_connection(http_path, None, None):
+                pass
+        _step("sql_connection", connect)
+    mark("warm")
+
+
+def start_warm_up():
+    # Call once the server is listening (gunicorn post_worker_init, or before
+    # app.run for the development server); never in a process that will fork
+    if not STARTUP_WARMUP:
+        return None
+    thread = threading.Thread(target=warm_up, args=(os.getenv("DATABRICKS_SQL_HTTP_PATH"),),
+                              name="startup-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def startup_report() -> dict:
+    with _lock:
+        return json.loads(json.dumps(_report))
+
+
+def startup_stats() -> dict:
+    # Flat gauges for /metrics
+    report = startup_report()
+    stats = {}
+    for name, seconds in report["imports"].items():
+        stats[f"import_{name.replace('.', '_')}_seconds"] = seconds
+    for name, seconds in report["warmup"].items():
+        stats[f"warmup_{name.replace('.', '_')}_seconds"] = seconds
+    for name, seconds in report["marks"].items():
+        stats[f"{name}_seconds"] = seconds
+    stats["warmup_errors"] = len(report["errors"])
+    return stats
+
+
+def register_startup_report(server):
+    # Marks the first response and logs the report at that point
+    @server.after_request
+    def record_first_response(response):
+        if "first_response" not in _report["marks"]:
+            mark("first_response")
+            logger.info("Startup report: %s", json.dumps(startup_report()))
+        return response
+
+
+metrics.register_collector("bti_startup", startup_stats)
@@ -0,0 +1,125 @@
+# utils/table_diff.py
+# Tracks inserted / updated / deleted grid rows against the loaded snapshot
+# and describes them as MERGE INTO source rows.
+from __future__ import annotations
+
+from utils.grid_query import quote_identifier
+from utils.startup import lazy_module
+
+pd = lazy_module("pandas")
+
+# Hidden field carried in every grid record (not shown as a column)
+ROW_ID = "__row_id"
+OP_FIELD = "__op"
+
+CASTABLE_TYPES = {"tinyint", "byte", "smallint", "short", "int", "integer", "bigint", "long",
+                  "float", "double", "boolean", "date", "timestamp", "timestamp_ntz", "string"}
+
+
+def attach_row_ids(records, start: int = 0):
+    for i, r in enumerate(records, start=start):
+        r[ROW_ID] = i
+    return records
+
+
+def _same(a, b) -> bool:
+    # Edited cells come back as strings, untouched ones keep their JSON type
+    if a is None or b is None:
+        return a is None and b is None
+    return a == b or str(a) == str(b)
+
+
+def _key_of(row, key_columns):
+    return tuple(None if row.get(k) is None else str(row.get(k)) for k in key_columns)
+
+
+def diff_records(snapshot, current, columns, key_columns):
+    # Returns {'inserted': [...], 'updated': [...], 'deleted': [...]}.
+    # Editing a key column is a delete of the old key plus an insert.
+    by_id = {r.get(ROW_ID): r for r in (snapshot or []) if r.get(ROW_ID) is not None}
+    seen = set()
+    inserted, updated, deleted = [], [], []
+    for row in current or []:
+        rid = row.get(ROW_ID)
+        original = by_id.get(rid) if rid is not None else None
+        if original is None:
+            inserted.append(row)
+            continue
+        seen.add(rid)
+        if all(_same(row.get(c), original.get(c)) for c in columns):
+            continue
+        if _key_of(row, key_columns) != _key_of(original, key_columns):
+            deleted.append(original)
+            inserted.append(row)
+        else:
+            updated.append(row)
+    for rid, original in by_id.items():
+        if rid not in seen:
+            deleted.append(original)
+    # A key that is deleted and re-inserted is an update; MERGE rejects two
+    # source rows matching the same target row
+    deleted_keys = {_key_of(r, key_columns) for r in deleted}
+    if key_columns and deleted_keys:
+        reinserted = [r for r in inserted if _key_of(r, key_columns) in deleted_keys]
+        reinserted_keys = {_key_of(r, key_columns) for r in reinserted}
+        updated.extend(reinserted)
+        inserted = [r for r in inserted if _key_of(r, key_columns) not in reinserted_keys]
+        deleted = [r for r in deleted if _key_of(r, key_columns) not in reinserted_keys]
+    return {'inserted': inserted, 'updated': updated, 'deleted': deleted}
+
+
+def diff_is_empty(diff) -> bool:
+    return not (diff['inserted'] or diff['updated'] or diff['deleted'])
+
+
+def diff_keys(diff, key_columns) -> set:
+    # Keys of every row the diff touches
+    return {_key_of(r, key_columns) for part in ('inserted', 'updated', 'deleted') for r in diff[part]}
+
+
+def combine_diffs(diffs):
+    # One diff from several with disjoint keys (sessions saved in one MERGE)
+    return {part: [r for diff in diffs for r in diff[part]] for part in ('inserted', 'updated', 'deleted')}
+
+
+def _castable(dtype) -> bool:
+    # Parameterised types (decimal(p,s), varchar(n), complex types) keep their
+    # literal type and rely on MERGE's assignment cast instead
+    dt = (dtype or '').lower()
+    return dt in CASTABLE_TYPES
+
+
+def diff_frame(diff, columns, key_columns) -> pd.DataFrame:
+    # One row per change with its operation in OP_FIELD; deletes only carry their key
+    tagged = ([('D', r) for r in diff['deleted']]
+              + [('U', r) for r in diff['updated']]
+              + [('I', r) for r in diff['inserted']])
+    records = []
+    for op, row in tagged:
+        record = {c: row.get(c) for c in (key_columns if op == 'D' else columns)}
+        record[OP_FIELD] = op
+        records.append(record)
+    return pd.DataFrame(records, columns=[OP_FIELD] + list(columns))
+
+
+def merge_source_projection(columns, type_map=None) -> str:
+    # Cast the staged values to the table types so MERGE assignments line up
+    type_map = type_map or {}
+    return ", ".join([quote_identifier(OP_FIELD)] + [
+        f"CAST({quote_identifier(c)} AS {type_map[c]}) AS {quote_identifier(c)}" if _castable(type_map.get(c)) else quote_identifier(c)
+        for c in columns
+    ])
+
+
+def merge_statement(table_name: str, source: str, columns, key_columns) -> str:
+    # source: a relation producing OP_FIELD plus every column, e.g. "(SELECT ...)"
+    on = " AND ".join(f"t.{quote_identifier(k)} <=> s.{quote_identifier(k)}" for k in key_columns)
+    update_set = ", ".join(f"t.{quote_identifier(c)} = s.{quote_identifier(c)}" for c in columns if c not in key_columns)
+    insert_cols = ", ".join(quote_identifier(c) for c in columns)
+    insert_vals = ", ".join(f"s.{quote_identifier(c)}" for c in columns)
+    op = quote_identifier(OP_FIELD)
+    clauses = [f"WHEN MATCHED AND s.{op} = 'D' THEN DELETE"]
+    if update_set:
+        clauses.append(f"WHEN MATCHED AND s.{op} IN ('U', 'I') THEN UPDATE SET {update_set}")
+    clauses.append(f"WHEN NOT MATCHED AND s.{op} IN ('U', 'I') THEN INSERT ({insert_cols}) VALUES ({insert_vals})")
+    return f"MERGE INTO {table_name} AS t USING {source} AS s ON {on} " + " ".join(clauses)
@@ -0,0 +1,203 @@
+# utils/write_queue.py
+# Per-table write queue. Saves to the same table run one at a time instead of
+# racing each other into Delta's optimistic concurrency check. MERGE saves that
+# share credentials and columns and arrive within WRITE_COALESCE_MS of the first
+# one waiting are written together as one MERGE, so one commit instead of one
+# per session. Like single_flight, there are no worker threads: the caller at
+# the head of a table's queue writes its batch while the rest wait for their
+# results, and a conflict with a writer outside this process is retried with
+# backoff. The queue is per process; the app runs one worker (gunicorn.conf.py).
+import os
+import random
+import threading
+import time
+
+from utils.metrics import metrics
+
+WRITE_COALESCE_MS = int(os.getenv("WRITE_COALESCE_MS", "250"))
+WRITE_MAX_RETRIES = int(os.getenv("WRITE_MAX_RETRIES", "4"))
+WRITE_RETRY_BASE_SECONDS = float(os.getenv("WRITE_RETRY_BASE_SECONDS", "0.5"))
+# Most sessions written together in one commit
+WRITE_MAX_BATCH = int(os.getenv("WRITE_MAX_BATCH", "32"))
+# How often a waiting caller re-checks its place in the queue
+WAIT_POLL_SECONDS = 0.5
+# Error text of a lost Delta optimistic concurrency race
+CONFLICT_MARKERS = ("concurrentappend", "concurrentdelete", "concurrenttransaction", "concurrentmodification",
+                    "metadatachanged", "protocolchanged", "delta_concurrent")
+
+
+def is_conflict(error) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in CONFLICT_MARKERS)
+
+
+class _Request:
+    __slots__ = ("write", "payload", "group", "keys", "retry_conflicts", "enqueued", "together", "done",
+                 "result", "error")
+
+    def __init__(self, write, payload, group, keys, retry_conflicts):
+        self.write = write
+        self.payload = payload
+        self.group = group
+        self.keys = frozenset(keys or ())
+        self.retry_conflicts = retry_conflicts
+        self.enqueued = time.monotonic()
+        self.together = 0    # size of the batch once it is being written
+        self.done = False
+        self.result = None
+        self.error = None
+
+
+class _TableQueue:
+    __slots__ = ("pending", "busy", "writing")
+
+    def __init__(self):
+        self.pending = []
+        self.busy = False      # a caller leads: coalescing, then writing
+        self.writing = False   # its batch has left pending
+
+
+class WriteQueue:
+    def __init__(self, coalesce_seconds: float, max_retries: int, retry_base_seconds: float, max_batch: int):
+        self.coalesce_seconds = coalesce_seconds
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._queues = {}   # table key -> _TableQueue
+        self._stats = {"requests": 0, "commits": 0, "coalesced": 0, "retries": 0, "split": 0}
+
+    def run(self, table_key, write, payload=None, group=None, keys=(), retry_conflicts=True, waiting=None) -> dict:
+        # write(payloads) -> report writes a list of payloads in one commit. With a
+        # group, requests of the same group may be batched; their keys must not
+        # overlap, so a batch never touches a row twice. Without one the write
+        # runs alone. waiting(ahead, together) reports the caller's place: writes
+        # ahead of it, then how many sessions its batch holds. Returns the report
+        # with 'sessions' (batch size) and 'retries' added.
+        request = _Request(write, payload, group, keys, retry_conflicts)
+        with self._cond:
+            queue = self._queues.setdefault(table_key, _TableQueue())
+            queue.pending.append(request)
+            self._stats["requests"] += 1
+        reported = None
+        while True:
+            with self._cond:
+                if request.done:
+                    break
+                lead = not queue.busy and queue.pending[0] is request
+                if lead:
+                    queue.busy = True
+                else:
+                    ahead = queue.pending.index(request) + queue.writing if not request.together else 0
+                    status = (ahead, request.together)
+                    if status == reported:
+                        self._cond.wait(WAIT_POLL_SECONDS)
+                        continue
+            if lead:
+                self._lead(table_key, queue)
+                continue
+            reported = status
+            if waiting is not None:
+                waiting(*status)
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _lead(self, table_key, queue):
+        first = queue.pending[0]
+        if first.group is not None:
+            # Later saves of the window join this one
+            delay = first.enqueued + self.coalesce_seconds - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        with self._cond:
+            batch = self._take(queue)
+            queue.writing = True
+            for request in batch:
+                request.together = len(batch)
+            self._cond.notify_all()
+        try:
+            self._write(batch)
+        finally:
+            with self._cond:
+                for request in batch:
+                    if request.result is None and request.error is None:
+                        request.error = RuntimeError("The write was interrupted")
+                    request.done = True
+                queue.busy = queue.writing = False
+                if not queue.pending:
+                    self._queues.pop(table_key, None)
+                self._cond.notify_all()
+
+    def _take(self, queue) -> list:
+        # The head of the queue plus the compatible requests right behind it;
+        # stopping at the first that isn't keeps commits in arrival order
+        batch = [queue.pending.pop(0)]
+        group = batch[0].group
+        if group is None:
+            return batch
+        keys = set(batch[0].keys)
+        while queue.pending and len(batch) < self.max_batch:
+            request = queue.pending[0]
+            if request.group != group or keys & request.keys:
+                break
+            keys |= request.keys
+            batch.append(queue.pending.pop(0))
+        return batch
+
+    def _write(self, batch):
+        try:
+            report = self._attempt(batch[0].write, [r.payload for r in batch], batch[0].retry_conflicts)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+                return
+            # One session's rows can fail the shared commit; the others still save
+            with self._cond:
+                self._stats["split"] += 1
+            for request in batch:
+                try:
+                    request.result = {**self._attempt(request.write, [request.payload], request.retry_conflicts),
+                                      "sessions": 1}
+                except Exception as single:
+                    request.error = single
+            return
+        with self._cond:
+            self._stats["coalesced"] += len(batch) - 1
+        for request in batch:
+            request.result = {**report, "sessions": len(batch)}
+
+    def _attempt(self, write, payloads, retry_conflicts) -> dict:
+        retries = 0
+        while True:
+            try:
+                report = write(payloads)
+            except Exception as e:
+                if not retry_conflicts or retries >= self.max_retries or not is_conflict(e):
+                    raise
+                retries += 1
+                with self._cond:
+                    self._stats["retries"] += 1
+                metrics.count("bti_write_conflict_retries_total")
+                # Exponential backoff with jitter, so racing writers spread out
+                time.sleep(self.retry_base_seconds * 2 ** (retries - 1) * random.uniform(0.5, 1.5))
+                continue
+            with self._cond:
+                self._stats["commits"] += 1
+            return {**report, "retries": retries}
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = sum(len(q.pending) for q in self._queues.values())
+            stats["writing"] = sum(1 for q in self._queues.values() if q.busy)
+        return stats
+
+
+write_queue = WriteQueue(
+    coalesce_seconds=WRITE_COALESCE_MS / 1000,
+    max_retries=WRITE_MAX_RETRIES,
+    retry_base_seconds=WRITE_RETRY_BASE_SECONDS,
+    max_batch=WRITE_MAX_BATCH,
+)
+metrics.register_collector("bti_write_queue", write_queue.stats)
@@ -0,0 +1,228 @@
+# utils/writer.py
+# Chunked write pipeline: rows go out as native parameterized statements in
+# batches bounded by parameter count and bytes. Multi-batch writes are staged
+# in a scratch table so the final INSERT / INSERT OVERWRITE / MERGE is one commit.
+from __future__ import annotations
+
+import os
+import time
+import uuid
+
+from utils.encoding import parameter_column
+from utils.grid_query import quote_identifier
+from utils.metrics import metrics
+from utils.startup import lazy_module
+from utils.table_diff import OP_FIELD, merge_source_projection, merge_statement
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+MAX_STATEMENT_PARAMS = int(os.getenv("WRITE_MAX_PARAMS", "1000"))
+MAX_STATEMENT_BYTES = int(os.getenv("WRITE_MAX_BYTES", str(1024 * 1024)))
+# Text per placeholder (":p123456, ") on top of the value itself
+PLACEHOLDER_BYTES = 10
+
+
+def plan_batches(frame: pd.DataFrame, max_params: int = None, max_bytes: int = None):
+    # Returns [(start, end), ...] row ranges; each batch stays under both limits
+    max_params = max_params or MAX_STATEMENT_PARAMS
+    max_bytes = max_bytes or MAX_STATEMENT_BYTES
+    n_rows, n_cols = len(frame), max(len(frame.columns), 1)
+    if not n_rows:
+        return []
+    rows_by_params = max(max_params // n_cols, 1)
+    row_bytes = np.full(n_rows, n_cols * PLACEHOLDER_BYTES, dtype=np.int64)
+    for name in frame.columns:
+        # Missing values stay missing through astype(str) under pandas 3; they send no text
+        row_bytes += frame[name].astype(str).str.len().to_numpy(dtype=np.int64, na_value=0)
+    cum = np.concatenate([[0], np.cumsum(row_bytes)])
+    batches = []
+    start = 0
+    while start < n_rows:
+        by_bytes = int(np.searchsorted(cum, cum[start] + max_bytes, side="right")) - 1
+        end = max(start + 1, min(start + rows_by_params, by_bytes, n_rows))
+        batches.append((start, end))
+        start = end
+    return batches
+
+
+def _values_clause(param_columns, start: int, end: int):
+    # "(:p0, :p1), (:p2, :p3)" plus the matching parameters dict
+    params = {}
+    rows = []
+    k = 0
+    for r in range(start, end):
+        names = []
+        for col in param_columns:
+            name = f"p{k}"
+            params[name] = col[r]
+            names.append(":" + name)
+            k += 1
+        rows.append("(" + ", ".join(names) + ")")
+    return ", ".join(rows), params
+
+
+def _stage_name(table_name: str) -> str:
+    # Scratch table next to the target so the same grants apply
+    prefix = table_name.rsplit(".", 1)[0] + "." if "." in table_name else ""
+    return f"{prefix}__bti_stage_{uuid.uuid4().hex[:12]}"
+
+
+class _Progress:
+    def __init__(self, total_rows: int, batch_count: int, callback=None):
+        self.total_rows = total_rows
+        self.batch_count = batch_count
+        self.callback = callback
+        self.rows_done = 0
+        self.batches_done = 0
+        self.bytes_sent = 0
+        self.started = time.perf_counter()
+
+    def batch_done(self, rows: int, sql_bytes: int):
+        self.rows_done += rows
+        self.batches_done += 1
+        self.bytes_sent += sql_bytes
+        if self.callback is not None:
+            self.callback(self.report())
+
+    def report(self, **extra) -> dict:
+        seconds = time.perf_counter() - self.started
+        report = {
+            "rows": self.rows_done,
+            "total_rows": self.total_rows,
+            "batches": self.batches_done,
+            "total_batches": self.batch_count,
+            "bytes": self.bytes_sent,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows_done / seconds, 1) if seconds > 0 else None,
+        }
+        report.update(extra)
+        return report
+
+
+def _send_batches(cursor, statement_for, param_columns, batches, progress: _Progress):
+    # statement_for(values_sql, batch_index) -> SQL text for one batch, or
+    # (SQL text, extra parameters) when the statement has its own markers
+    for i, (start, end) in enumerate(batches):
+        with metrics.timer("encode"):
+            values_sql, params = _values_clause(param_columns, start, end)
+            statement = statement_for(values_sql, i)
+            if isinstance(statement, tuple):
+                statement, extra = statement
+                params = {**params, **extra}
+        with metrics.timer("write_execute"):
+            cursor.execute(statement, parameters=params)
+        sql_bytes = len(statement) + sum(len(str(v)) for v in params.values())
+        metrics.count("bti_rows_written_total", end - start)
+        metrics.count("bti_bytes_sent_total", sql_bytes)
+        progress.batch_done(end - start, sql_bytes)
+
+
+def write_rows(conn, table_name: str, frame: pd.DataFrame, plan, mode: str = "append", progress=None,
+               predicate=None) -> dict:
+    # mode: "append" (INSERT INTO), "overwrite" (INSERT OVERWRITE) or "replace"
+    # (INSERT INTO ... REPLACE WHERE; predicate is build_predicate() output and
+    # plan must list every table column in table order)
+    names = [name for name, _ in plan]
+    col_list = ", ".join(quote_identifier(n) for n in names)
+    with metrics.timer("coerce"):
+        param_columns = [parameter_column(frame[name], kind, name) for name, kind in plan]
+    batches = plan_batches(frame[names] if names else frame)
+    tracker = _Progress(len(frame), len(batches), progress)
+    predicate_sql, predicate_params = predicate or ("", {})
+    if mode == "replace":
+        target = f"INSERT INTO {table_name} REPLACE WHERE {predicate_sql}"
+    else:
+        target = f"{'INSERT OVERWRITE' if mode == 'overwrite' else 'INSERT INTO'} {table_name} ({col_list})"
+    with conn.cursor() as cursor:
+        if not batches:
+            if mode == "overwrite":
+                cursor.execute(f"TRUNCATE TABLE {table_name}")
+            elif mode == "replace":
+                cursor.execute(f"DELETE FROM {table_name} WHERE {predicate_sql}", parameters=predicate_params or None)
+            return tracker.report(staged=False, atomic=True)
+        if len(batches) == 1:
+            _send_batches(cursor, lambda values, i: (f"{target} VALUES {values}", predicate_params),
+                          param_columns, batches, tracker)
+            return tracker.report(staged=False, atomic=True)
+        stage = _stage_name(table_name)
+        try:
+            cursor.execute(f"CREATE TABLE {stage} AS SELECT {col_list} FROM {table_name} LIMIT 0")
+        except Exception as e:
+            if mode != "append":
+                # Overwriting batch by batch would leave the table half written if a
+                # later batch failed, so the table is not touched at all
+                raise RuntimeError(
+                    f"Writing {len(frame):,} rows takes {len(batches)} statements, and without CREATE TABLE "
+                    "on the schema they can't be staged into one commit. Nothing was written; "
+                    "raise WRITE_MAX_PARAMS / WRITE_MAX_BYTES or grant CREATE TABLE."
+                ) from e
+            # No CREATE TABLE on the schema: appends go in batch by batch
+            _send_batches(cursor, lambda values, i: f"{target} VALUES {values}",
+                          param_columns, batches, tracker)
+            return tracker.report(staged=False, atomic=False)
+        try:
+            _send_batches(cursor, lambda values, i: f"INSERT INTO {stage} ({col_list}) VALUES {values}",
+                          param_columns, batches, tracker)
+            cursor.execute(f"{target} SELECT {col_list} FROM {stage}", parameters=predicate_params or None)
+        finally:
+            cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+    return tracker.report(staged=True, atomic=True)
+
+
+def merge_rows(conn, table_name: str, frame: pd.DataFrame, plan, key_columns, type_map=None, progress=None) -> dict:
+    # frame: diff_frame() output; plan covers the table columns (not OP_FIELD)
+    names = [name for name, _ in plan]
+    src_cols = ", ".join(quote_identifier(n) for n in [OP_FIELD] + names)
+    projection = merge_source_projection(names, type_map)
+    with metrics.timer("coerce"):
+        param_columns = [parameter_column(frame[OP_FIELD], "string", OP_FIELD)] + [
+            parameter_column(frame[name], kind, name) for name, kind in plan
+        ]
+    batches = plan_batches(frame[[OP_FIELD] + names])
+    tracker = _Progress(len(frame), len(batches), progress)
+
+    def inline_merge(values, i):
+        source = f"(SELECT {projection} FROM VALUES {values} AS src({src_cols}))"
+        return merge_statement(table_name, source, names, key_columns)
+
+    with conn.cursor() as cursor:
+        if not batches:
+            return tracker.report(staged=False, atomic=True)
+        if len(batches) == 1:
+            _send_batches(cursor, inline_merge, param_columns, batches, tracker)
+            return tracker.report(staged=False, atomic=True)
+        stage = _stage_name(table_name)
+        try:
+            cursor.execute(
+                f"CREATE TABLE {stage} AS SELECT CAST(NULL AS STRING) AS {quote_identifier(OP_FIELD)}, "
+                f"{', '.join(quote_identifier(n) for n in names)} FROM {table_name} LIMIT 0"
+            )
+        except Exception:
+            # No CREATE TABLE on the schema: one MERGE commit per batch
+            _send_batches(cursor, inline_merge, param_columns, batches, tracker)
+            return tracker.report(staged=False, atomic=False)
+        try:
+            _send_batches(cursor, lambda values, i: f"INSERT INTO {stage} ({src_cols}) VALUES {values}",
+                          param_columns, batches, tracker)
+            cursor.execute(merge_statement(table_name, f"(SELECT {projection} FROM {stage})", names, key_columns))
+        finally:
+            cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+    return tracker.report(staged=True, atomic=True)
+
+
+def describe_report(report: dict) -> str:
+    # "1,200 rows in 3 batches, 2.1s (571 rows/s), staged, one commit with 2 other saves"
+    text = f"{report['rows']:,} rows in {report['batches']} batch{'es' if report['batches'] != 1 else ''}, {report['seconds']}s"
+    if report.get("rows_per_second"):
+        text += f" ({report['rows_per_second']:,.0f} rows/s)"
+    if report.get("staged"):
+        text += ", staged"
+    if not report.get("atomic", True):
+        text += ", not atomic"
+    if report.get("sessions", 1) > 1:
+        others = report["sessions"] - 1
+        text += f", one commit with {others} other save{'s' if others != 1 else ''}"
+    if report.get("retries"):
+        text += f", {report['retries']} conflict retr{'ies' if report['retries'] != 1 else 'y'}"
+    return text